@@ -0,0 +1,861 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+In-memory stand-ins for the AWS services used by the deployment scenario lambda functions.
+
+These are used by the benchmarks under `<scenario_name>/tests` to exercise the lambda handlers locally, without a
+deployed stack. Only the subset of the boto3 API used by the lambda functions is supported. Consumed capacity is
+estimated with the DynamoDB sizing rules, so benchmarks can compare the read and write units of different access
+patterns.
+"""
+
+import bisect
+import copy
+import itertools
+import json
+import math
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+
+READ_UNIT_SIZE_IN_BYTES = 4 * 1024
+WRITE_UNIT_SIZE_IN_BYTES = 1024
+MAX_PAGE_SIZE_IN_BYTES = 1024 * 1024
+PROJECTION_ALL = 'ALL'
+# Home region of the fleets of the GameLift stand-in
+LOCAL_HOME_REGION = 'us-west-2'
+
+
+class LocalIndex:
+    """Definition of a global secondary index on a LocalTable"""
+
+    def __init__(self, hash_key, range_key=None, non_key_attributes=PROJECTION_ALL):
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.non_key_attributes = non_key_attributes
+
+
+class LocalTable:
+    """
+    Subset of the boto3 DynamoDB Table resource, backed by memory.
+    :param name: table name
+    :param hash_key: name of the partition key attribute
+    :param range_key: name of the sort key attribute, if any
+    :param indexes: mapping of index name to LocalIndex
+    :param latency_in_seconds: latency injected in every request, outside of the table lock
+    :param write_capacity_units: write requests accepted per second, each counted as a single unit, before the next
+     ones are throttled, or None if unbounded
+    """
+
+    def __init__(self, name, hash_key, range_key=None, indexes=None, latency_in_seconds=0, write_capacity_units=None):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.indexes = indexes or {}
+        self.latency_in_seconds = latency_in_seconds
+        self.write_capacity_units = write_capacity_units
+        self._write_second = None
+        self._write_count = 0
+        self._lock = threading.RLock()
+        self._items = {}
+        self._scan_positions = {}
+        self._scan_order = []
+        self._partitions = {}
+        self._index_partitions = {index_name: {} for index_name in self.indexes}
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self._lock:
+            self.consumed_read_units = 0.0
+            self.consumed_write_units = 0.0
+            self.request_counts = {}
+
+    def load_items(self, items):
+        """Bulk loads items without consuming capacity or evaluating conditions"""
+        with self._lock:
+            for item in items:
+                self._store(to_dynamodb_types(item))
+
+    def item_count(self):
+        with self._lock:
+            return len(self._items)
+
+    def put_item(self, Item, ConditionExpression=None, Expected=None, ConditionalOperator='AND', **kwargs):
+        self._simulate_latency()
+        with self._lock:
+            self._count_request('PutItem')
+            self._throttle_write('PutItem')
+            item = to_dynamodb_types(Item)
+            key = self._key_of(item)
+            existing = self._items.get(key)
+            self._consume_write(existing, item)
+            self._check_condition('PutItem', existing, ConditionExpression, Expected, ConditionalOperator)
+            self._store(item)
+            return {}
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, ConsistentRead=False,
+                 **kwargs):
+        self._simulate_latency()
+        with self._lock:
+            self._count_request('GetItem')
+            item = self._items.get(self._key_of(Key))
+            self._consume_read(item_size(item) if item else 0, ConsistentRead)
+            if item is None:
+                return {}
+            return {'Item': project(item, ProjectionExpression, ExpressionAttributeNames)}
+
+    def delete_item(self, Key, ConditionExpression=None, Expected=None, ConditionalOperator='AND', **kwargs):
+        self._simulate_latency()
+        with self._lock:
+            self._count_request('DeleteItem')
+            self._throttle_write('DeleteItem')
+            key = self._key_of(Key)
+            existing = self._items.get(key)
+            self._consume_write(existing, None)
+            self._check_condition('DeleteItem', existing, ConditionExpression, Expected, ConditionalOperator)
+            if existing is not None:
+                self._unstore(key)
+            return {}
+
+    def update_item(self, Key, AttributeUpdates=None, Expected=None, ConditionalOperator='AND',
+                    ConditionExpression=None, ReturnValues='NONE', **kwargs):
+        self._simulate_latency()
+        with self._lock:
+            self._count_request('UpdateItem')
+            self._throttle_write('UpdateItem')
+            key = self._key_of(Key)
+            existing = self._items.get(key)
+            self._check_condition('UpdateItem', existing, ConditionExpression, Expected, ConditionalOperator,
+                                  consume_write=True)
+            updated = copy.deepcopy(existing) if existing is not None else to_dynamodb_types(Key)
+            for name, update in (AttributeUpdates or {}).items():
+                action = update.get('Action', 'PUT')
+                value = to_dynamodb_types(update.get('Value'))
+                if action == 'PUT':
+                    updated[name] = value
+                elif action == 'DELETE':
+                    updated.pop(name, None)
+                elif action == 'ADD':
+                    if isinstance(value, set):
+                        updated[name] = updated.get(name, set()) | value
+                    else:
+                        updated[name] = updated.get(name, Decimal(0)) + value
+                else:
+                    raise ValueError(f'Unsupported AttributeUpdates action: {action}')
+            self._consume_write(existing, updated)
+            self._store(updated)
+            if ReturnValues == 'ALL_NEW':
+                return {'Attributes': copy.deepcopy(updated)}
+            if ReturnValues == 'ALL_OLD' and existing is not None:
+                return {'Attributes': copy.deepcopy(existing)}
+            return {}
+
+    def query(self, KeyConditionExpression, IndexName=None, Limit=None, ScanIndexForward=True,
+              ExclusiveStartKey=None, FilterExpression=None, ProjectionExpression=None,
+              ExpressionAttributeNames=None, Select=None, ConsistentRead=False, **kwargs):
+        self._simulate_latency()
+        with self._lock:
+            self._count_request('Query')
+            hash_key, range_key, non_key_attributes = self._schema_of(IndexName)
+            hash_value = find_equality_value(KeyConditionExpression, hash_key)
+            if IndexName:
+                entries = self._index_partitions[IndexName].get(hash_value, [])
+            else:
+                entries = self._partitions.get(hash_value, [])
+            if ExclusiveStartKey:
+                # The start key does not need to exist, the query resumes from its position in the sort order
+                start_entry = (to_dynamodb_types(ExclusiveStartKey.get(range_key)), self._key_of(ExclusiveStartKey))
+                if ScanIndexForward:
+                    entries = entries[bisect.bisect_right(entries, start_entry):]
+                else:
+                    entries = entries[:bisect.bisect_left(entries, start_entry)]
+            entries = entries if ScanIndexForward else list(reversed(entries))
+
+            def candidates():
+                for _, table_key in entries:
+                    item = self._items[table_key]
+                    if evaluate(KeyConditionExpression, item):
+                        yield project_index(item, self, IndexName, non_key_attributes)
+
+            return self._read_page(candidates(), Limit, FilterExpression, ProjectionExpression,
+                                   ExpressionAttributeNames, Select, ConsistentRead, IndexName)
+
+    def scan(self, Limit=None, ExclusiveStartKey=None, FilterExpression=None, ProjectionExpression=None,
+             ExpressionAttributeNames=None, Select=None, ConsistentRead=False, **kwargs):
+        self._simulate_latency()
+        with self._lock:
+            self._count_request('Scan')
+            position = 0
+            if ExclusiveStartKey:
+                position = self._scan_positions[self._key_of(ExclusiveStartKey)] + 1
+
+            def candidates():
+                scan_order = itertools.islice(self._scan_order, position, None)
+                for scan_position, table_key in enumerate(scan_order, start=position):
+                    # Keys deleted and then re-inserted are moved to the end of the scan order
+                    if self._scan_positions.get(table_key) == scan_position:
+                        yield self._items[table_key]
+
+            return self._read_page(candidates(), Limit, FilterExpression, ProjectionExpression,
+                                   ExpressionAttributeNames, Select, ConsistentRead, None)
+
+    def _read_page(self, candidates, limit, filter_expression, projection_expression, expression_attribute_names,
+                   select, consistent_read, index_name):
+        items = []
+        scanned_count = 0
+        page_size = 0
+        last_evaluated = None
+        for item in candidates:
+            if limit is not None and scanned_count >= limit or page_size >= MAX_PAGE_SIZE_IN_BYTES:
+                break
+            scanned_count += 1
+            page_size += item_size(item)
+            last_evaluated = item
+            if filter_expression is None or evaluate(filter_expression, item):
+                items.append(project(item, projection_expression, expression_attribute_names))
+        else:
+            last_evaluated = None
+        self._consume_read(page_size, consistent_read)
+        response = {
+            'Count': len(items),
+            'ScannedCount': scanned_count
+        }
+        if select != 'COUNT':
+            response['Items'] = items
+        if last_evaluated is not None:
+            response['LastEvaluatedKey'] = self._evaluated_key_of(last_evaluated, index_name)
+        return response
+
+    def _schema_of(self, index_name):
+        if index_name is None:
+            return self.hash_key, self.range_key, PROJECTION_ALL
+        index = self.indexes[index_name]
+        return index.hash_key, index.range_key, index.non_key_attributes
+
+    def _evaluated_key_of(self, item, index_name):
+        key_names = [self.hash_key, self.range_key]
+        if index_name:
+            key_names += [self.indexes[index_name].hash_key, self.indexes[index_name].range_key]
+        return {name: item[name] for name in key_names if name and name in item}
+
+    def _key_of(self, item):
+        if self.range_key:
+            return item[self.hash_key], to_dynamodb_types(item[self.range_key])
+        return item[self.hash_key], None
+
+    def _store(self, item):
+        key = self._key_of(item)
+        if key in self._items:
+            self._unindex(key)
+        else:
+            self._scan_positions[key] = len(self._scan_order)
+            self._scan_order.append(key)
+            bisect.insort(self._partitions.setdefault(key[0], []), (key[1], key))
+        self._items[key] = item
+        for index_name, index in self.indexes.items():
+            if index.hash_key in item and (index.range_key is None or index.range_key in item):
+                range_value = item[index.range_key] if index.range_key else None
+                bisect.insort(self._index_partitions[index_name].setdefault(item[index.hash_key], []),
+                              (range_value, key))
+
+    def _unstore(self, key):
+        self._unindex(key)
+        del self._items[key]
+        del self._scan_positions[key]
+        partition = self._partitions[key[0]]
+        partition.remove((key[1], key))
+        if not partition:
+            del self._partitions[key[0]]
+
+    def _unindex(self, key):
+        item = self._items[key]
+        for index_name, index in self.indexes.items():
+            if index.hash_key in item and (index.range_key is None or index.range_key in item):
+                range_value = item[index.range_key] if index.range_key else None
+                partition = self._index_partitions[index_name][item[index.hash_key]]
+                partition.remove((range_value, key))
+
+    def _check_condition(self, operation, existing, condition_expression, expected, conditional_operator,
+                         consume_write=False):
+        if condition_expression is not None:
+            passed = evaluate(condition_expression, existing or {})
+        elif expected:
+            passed = evaluate_expected(expected, existing or {}, conditional_operator)
+        else:
+            passed = True
+        if not passed:
+            if consume_write:
+                self._consume_write(existing, None)
+            raise ClientError({
+                'Error': {
+                    'Code': 'ConditionalCheckFailedException',
+                    'Message': 'The conditional request failed'
+                }
+            }, operation)
+
+    def _consume_read(self, size, consistent_read):
+        units = max(1, math.ceil(size / READ_UNIT_SIZE_IN_BYTES))
+        self.consumed_read_units += units if consistent_read else units / 2
+
+    def _consume_write(self, old_item, new_item):
+        size = max(item_size(old_item) if old_item else 0, item_size(new_item) if new_item else 0)
+        units = max(1, math.ceil(size / WRITE_UNIT_SIZE_IN_BYTES))
+        # Each index containing the old or new image of the item is written as well
+        for index in self.indexes.values():
+            if any(item and index.hash_key in item for item in (old_item, new_item)):
+                units += 1
+        self.consumed_write_units += units
+
+    def _throttle_write(self, operation):
+        if self.write_capacity_units is None:
+            return
+        second = math.floor(time.time())
+        if second != self._write_second:
+            self._write_second = second
+            self._write_count = 0
+        if self._write_count >= self.write_capacity_units:
+            self._count_request('Throttled' + operation)
+            raise ClientError({
+                'Error': {
+                    'Code': 'ProvisionedThroughputExceededException',
+                    'Message': 'The level of configured provisioned throughput for the table was exceeded'
+                }
+            }, operation)
+        self._write_count += 1
+
+    def _count_request(self, operation):
+        self.request_counts[operation] = self.request_counts.get(operation, 0) + 1
+
+    def _simulate_latency(self):
+        if self.latency_in_seconds:
+            time.sleep(self.latency_in_seconds)
+
+
+class LocalDynamoDbResource:
+    """Subset of boto3.resource('dynamodb')"""
+
+    def __init__(self, tables):
+        self._tables = {table.name: table for table in tables}
+
+    def Table(self, name):
+        return self._tables[name]
+
+
+class LocalGameLift:
+    """
+    Subset of boto3.client('gamelift') for FlexMatch and game sessions. Tickets are registered with `add_ticket`, or
+    started with `start_matchmaking`, and `describe_matchmaking` returns them as-is. StartMatchmaking calls over
+    `start_matchmaking_tps` in a second of the clock are throttled, and calls reusing a ticket id are rejected. Game
+    sessions are created ACTIVATING, and become ACTIVE, and searchable, after `game_session_activation_time_in_seconds`.
+    Players leave with `remove_player_session`, and a game session terminates when its last player leaves. Aliases
+    resolve to a single fleet of `server_process_count` server processes in its home region, each hosting one game
+    session, or unbounded if None.
+    :param clock: function returning the current time in seconds, for simulations running on a simulated clock
+    :param start_matchmaking_tps: StartMatchmaking calls accepted per second, or None if unbounded
+    :param locations: mapping of the remote locations of the fleet to their server process count, or None if unbounded
+    """
+
+    def __init__(self, latency_in_seconds=0, game_session_activation_time_in_seconds=0, server_process_count=None,
+                 clock=time.time, home_region=LOCAL_HOME_REGION, locations=None, start_matchmaking_tps=None):
+        self.latency_in_seconds = latency_in_seconds
+        self.game_session_activation_time_in_seconds = game_session_activation_time_in_seconds
+        self.home_region = home_region
+        self.server_process_counts = {home_region: server_process_count, **(locations or {})}
+        self.clock = clock
+        self.start_matchmaking_tps = start_matchmaking_tps
+        self.tickets = {}
+        self.game_sessions = {}
+        self.request_counts = {}
+        self._lock = threading.Lock()
+        # Game sessions with available player sessions, so that searches skip the full ones
+        self._available_game_sessions = {}
+        self._active_game_session_counts = {location: 0 for location in self.server_process_counts}
+        self._player_session_count = 0
+        self._start_matchmaking_second = None
+        self._start_matchmaking_count = 0
+
+    def add_ticket(self, ticket_id, status='SEARCHING', **fields):
+        self.tickets[ticket_id] = dict(TicketId=ticket_id, Status=status, **fields)
+
+    def remove_player_session(self, game_session_id):
+        """Ends a player session of a game session, terminating the game session if it was the last one"""
+        with self._lock:
+            game_session = self.game_sessions[game_session_id]
+            game_session['CurrentPlayerSessionCount'] -= 1
+            if game_session['CurrentPlayerSessionCount'] > 0:
+                self._available_game_sessions[game_session_id] = game_session
+                return
+            game_session['TerminationTime'] = self.clock()
+            self._available_game_sessions.pop(game_session_id, None)
+            self._active_game_session_counts[game_session['Location']] -= 1
+
+    def start_matchmaking(self, ConfigurationName, Players, TicketId=None, **kwargs):
+        self._call('StartMatchmaking')
+        with self._lock:
+            second = math.floor(self.clock())
+            if second != self._start_matchmaking_second:
+                self._start_matchmaking_second = second
+                self._start_matchmaking_count = 0
+            if self.start_matchmaking_tps is not None and self._start_matchmaking_count >= self.start_matchmaking_tps:
+                self.request_counts['ThrottledStartMatchmaking'] = (
+                    self.request_counts.get('ThrottledStartMatchmaking', 0) + 1)
+                raise ClientError({'Error': {'Code': 'ThrottlingException'}}, 'StartMatchmaking')
+            self._start_matchmaking_count += 1
+            ticket_id = TicketId or str(uuid.uuid4())
+            if ticket_id in self.tickets:
+                raise ClientError({'Error': {'Code': 'InvalidRequestException'}}, 'StartMatchmaking')
+            self.tickets[ticket_id] = dict(TicketId=ticket_id, ConfigurationName=ConfigurationName,
+                                           Players=copy.deepcopy(Players), Status='QUEUED', StartTime=self.clock())
+            return {'MatchmakingTicket': copy.deepcopy(self.tickets[ticket_id])}
+
+    def describe_matchmaking(self, TicketIds):
+        self._call('DescribeMatchmaking')
+        if len(TicketIds) > 10:
+            raise ClientError({'Error': {'Code': 'InvalidRequestException'}}, 'DescribeMatchmaking')
+        return {
+            'TicketList': [copy.deepcopy(self.tickets[ticket_id]) for ticket_id in TicketIds
+                           if ticket_id in self.tickets]
+        }
+
+    def describe_alias(self, AliasId):
+        self._call('DescribeAlias')
+        return {
+            'Alias': {
+                'AliasId': AliasId,
+                'RoutingStrategy': {
+                    'Type': 'SIMPLE',
+                    'FleetId': self._fleet_id_of(AliasId)
+                }
+            }
+        }
+
+    def describe_fleet_location_attributes(self, FleetId, Locations=None, Limit=None, NextToken=None):
+        """Describes the remote locations of the fleet, on a single page"""
+        self._call('DescribeFleetLocationAttributes')
+        remote_locations = [location for location in self.server_process_counts if location != self.home_region
+                            and (not Locations or location in Locations)]
+        return {
+            'FleetId': FleetId,
+            'LocationAttributes': [{
+                'LocationState': {
+                    'Location': location,
+                    'Status': 'ACTIVE'
+                }
+            } for location in remote_locations]
+        }
+
+    def describe_fleet_utilization(self, FleetIds):
+        """Describes the utilization of the home region of the fleets"""
+        self._call('DescribeFleetUtilization')
+        return {
+            'FleetUtilization': [self._utilization_of(fleet_id, self.home_region) for fleet_id in FleetIds]
+        }
+
+    def describe_fleet_location_utilization(self, FleetId, Location):
+        self._call('DescribeFleetLocationUtilization')
+        if Location not in self.server_process_counts:
+            raise ClientError({'Error': {'Code': 'InvalidRequestException'}}, 'DescribeFleetLocationUtilization')
+        return {'FleetUtilization': self._utilization_of(FleetId, Location)}
+
+    def create_game_session(self, MaximumPlayerSessionCount, AliasId=None, FleetId=None, Location=None, **kwargs):
+        self._call('CreateGameSession')
+        location = Location or self.home_region
+        if location not in self.server_process_counts:
+            raise ClientError({'Error': {'Code': 'InvalidRequestException'}}, 'CreateGameSession')
+        with self._lock:
+            server_process_count = self.server_process_counts[location]
+            if server_process_count is not None and self._active_game_session_counts[location] >= server_process_count:
+                raise ClientError({'Error': {'Code': 'FleetCapacityExceededException'}}, 'CreateGameSession')
+            fleet_id = FleetId or self._fleet_id_of(AliasId)
+            game_session_id = f'arn:aws:gamelift:{location}::gamesession/{fleet_id}/{len(self.game_sessions)}'
+            game_session = {
+                'GameSessionId': game_session_id,
+                'FleetId': fleet_id,
+                'CreationTime': self.clock(),
+                'CurrentPlayerSessionCount': 0,
+                'MaximumPlayerSessionCount': MaximumPlayerSessionCount,
+                'IpAddress': '127.0.0.1',
+                'DnsName': 'localhost',
+                'Port': 33430,
+                'PlayerSessionCreationPolicy': 'ACCEPT_ALL',
+                'Location': location
+            }
+            self.game_sessions[game_session_id] = game_session
+            self._available_game_sessions[game_session_id] = game_session
+            self._active_game_session_counts[location] += 1
+            return {'GameSession': self._describe_game_session(game_session)}
+
+    def describe_game_sessions(self, AliasId=None, FleetId=None, GameSessionId=None, StatusFilter=None, Location=None,
+                               Limit=None, NextToken=None, **kwargs):
+        self._call('DescribeGameSessions')
+        with self._lock:
+            game_sessions = [game_session for game_session in self.game_sessions.values()
+                             if GameSessionId in (None, game_session['GameSessionId'])
+                             and StatusFilter in (None, self._status_of(game_session))
+                             and Location in (None, game_session['Location'])]
+            return self._page(game_sessions, Limit, NextToken)
+
+    def search_game_sessions(self, AliasId=None, FleetId=None, FilterExpression=None, SortExpression=None,
+                             Location=None, Limit=None, NextToken=None, **kwargs):
+        """
+        Supports the `hasAvailablePlayerSessions=true` filter, and sorts on a single `creationTimeMillis` or
+         `playerSessionCount` attribute, ties being sorted by creation time
+        """
+        self._call('SearchGameSessions')
+        if FilterExpression not in (None, 'hasAvailablePlayerSessions=true'):
+            raise ValueError(f'Unsupported FilterExpression: {FilterExpression}')
+        sort_attribute, _, sort_order = (SortExpression or 'creationTimeMillis ASC').partition(' ')
+        if sort_attribute not in SORT_ATTRIBUTES or sort_order not in ('ASC', 'DESC'):
+            raise ValueError(f'Unsupported SortExpression: {SortExpression}')
+        with self._lock:
+            candidates = self._available_game_sessions if FilterExpression else self.game_sessions
+            game_sessions = [game_session for game_session in candidates.values()
+                             if self._status_of(game_session) == 'ACTIVE'
+                             and Location in (None, game_session['Location'])]
+            game_sessions.sort(key=lambda game_session: game_session['CreationTime'])
+            game_sessions.sort(key=lambda game_session: game_session[SORT_ATTRIBUTES[sort_attribute]],
+                               reverse=sort_order == 'DESC')
+            return self._page(game_sessions, Limit, NextToken)
+
+    def create_player_session(self, GameSessionId, PlayerId, **kwargs):
+        self._call('CreatePlayerSession')
+        with self._lock:
+            game_session = self._describe_game_session(self.game_sessions[GameSessionId])
+            if game_session['Status'] != 'ACTIVE':
+                raise ClientError({'Error': {'Code': 'InvalidGameSessionStatusException'}}, 'CreatePlayerSession')
+            if game_session['CurrentPlayerSessionCount'] >= game_session['MaximumPlayerSessionCount']:
+                raise ClientError({'Error': {'Code': 'GameSessionFullException'}}, 'CreatePlayerSession')
+            self.game_sessions[GameSessionId]['CurrentPlayerSessionCount'] += 1
+            if game_session['CurrentPlayerSessionCount'] + 1 >= game_session['MaximumPlayerSessionCount']:
+                del self._available_game_sessions[GameSessionId]
+            self._player_session_count += 1
+            return {
+                'PlayerSession': {
+                    'PlayerSessionId': f'psess-{self._player_session_count}',
+                    'PlayerId': PlayerId,
+                    'GameSessionId': GameSessionId,
+                    'IpAddress': game_session['IpAddress'],
+                    'DnsName': game_session['DnsName'],
+                    'Port': game_session['Port'],
+                    'Status': 'RESERVED'
+                }
+            }
+
+    def _utilization_of(self, fleet_id, location):
+        with self._lock:
+            game_session_count = self._active_game_session_counts[location]
+            player_session_count = sum(game_session['CurrentPlayerSessionCount']
+                                       for game_session in self.game_sessions.values()
+                                       if game_session['Location'] == location)
+        server_process_count = self.server_process_counts[location]
+        if server_process_count is None:
+            server_process_count = game_session_count + 1_000_000
+        return {
+            'FleetId': fleet_id,
+            'Location': location,
+            'ActiveServerProcessCount': server_process_count,
+            'ActiveGameSessionCount': game_session_count,
+            'CurrentPlayerSessionCount': player_session_count
+        }
+
+    def _page(self, game_sessions, limit, next_token):
+        start = int(next_token or 0)
+        end = start + (limit or 20)
+        response = {'GameSessions': [self._describe_game_session(game_session)
+                                     for game_session in game_sessions[start:end]]}
+        if end < len(game_sessions):
+            response['NextToken'] = str(end)
+        return response
+
+    def _describe_game_session(self, game_session):
+        game_session = copy.deepcopy(game_session)
+        game_session['Status'] = self._status_of(game_session)
+        return game_session
+
+    def _status_of(self, game_session):
+        if 'TerminationTime' in game_session:
+            return 'TERMINATED'
+        activated = self.clock() - game_session['CreationTime'] >= self.game_session_activation_time_in_seconds
+        return 'ACTIVE' if activated else 'ACTIVATING'
+
+    @staticmethod
+    def _fleet_id_of(alias_id):
+        return f"fleet-{alias_id.rpartition('alias-')[2]}"
+
+    def _call(self, operation):
+        with self._lock:
+            self.request_counts[operation] = self.request_counts.get(operation, 0) + 1
+        if self.latency_in_seconds:
+            time.sleep(self.latency_in_seconds)
+
+
+# SearchGameSessions sort attributes, mapped to the game session field they sort on
+SORT_ATTRIBUTES = {
+    'creationTimeMillis': 'CreationTime',
+    'playerSessionCount': 'CurrentPlayerSessionCount'
+}
+
+
+class LocalSqs:
+    """
+    Subset of boto3.client('sqs') for standard queues, backed by memory. `receive_event` stands in for a lambda event
+    source mapping, handing the messages to the function in batches.
+    :param latency_in_seconds: latency injected in every request, outside of the queue lock
+    """
+
+    def __init__(self, latency_in_seconds=0):
+        self.latency_in_seconds = latency_in_seconds
+        self.request_counts = {}
+        self._condition = threading.Condition()
+        self._messages = {}
+        self._message_count = 0
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        if self.latency_in_seconds:
+            time.sleep(self.latency_in_seconds)
+        with self._condition:
+            self.request_counts['SendMessage'] = self.request_counts.get('SendMessage', 0) + 1
+            self._message_count += 1
+            message_id = str(self._message_count)
+            self._messages.setdefault(QueueUrl, []).append({
+                'messageId': message_id,
+                'body': MessageBody,
+                'attributes': {
+                    'ApproximateReceiveCount': '1',
+                    'SentTimestamp': str(round(time.time() * 1000))
+                }
+            })
+            self._condition.notify_all()
+            return {'MessageId': message_id}
+
+    def receive_event(self, QueueUrl, BatchSize=10, MaximumBatchingWindowInSeconds=0, WaitTimeInSeconds=None):
+        """
+        Waits for a first message, up to `WaitTimeInSeconds` or forever if None, then gathers messages until the batch
+         is full or the batching window ends, and returns them as the event of a lambda function invocation.
+        :return: the event, with no records if no message arrived in time
+        """
+        with self._condition:
+            messages = self._messages.setdefault(QueueUrl, [])
+            if not self._condition.wait_for(lambda: messages, WaitTimeInSeconds):
+                return {'Records': []}
+            self._condition.wait_for(lambda: len(messages) >= BatchSize, MaximumBatchingWindowInSeconds)
+            records = messages[:BatchSize]
+            del messages[:BatchSize]
+        return {'Records': [dict(record, eventSource='aws:sqs') for record in records]}
+
+    def queue_length(self, QueueUrl):
+        with self._condition:
+            return len(self._messages.get(QueueUrl, []))
+
+
+class LocalLambdaContext:
+    """Subset of the lambda context object, counting down from the function timeout"""
+
+    def __init__(self, timeout_in_seconds=3):
+        self._deadline = time.time() + timeout_in_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, round((self._deadline - time.time()) * 1000))
+
+
+class LocalBoto3:
+    """
+    Stand-in for the boto3 module, to be assigned to the `boto3` attribute of a lambda function module.
+    :param resources: mapping of service name to the object returned by `boto3.resource`
+    :param clients: mapping of service name to the object returned by `boto3.client`
+    """
+
+    def __init__(self, resources=None, clients=None):
+        self._resources = resources or {}
+        self._clients = clients or {}
+
+    def resource(self, service_name, **kwargs):
+        return self._resources[service_name]
+
+    def client(self, service_name, **kwargs):
+        return self._clients[service_name]
+
+
+class LocalHttpEndpoint:
+    """
+    Answers the HTTP requests of real boto3 clients with canned JSON responses, so that the cost of building clients,
+    serializing requests and parsing responses can be measured without network calls or credentials.
+    :param responses: mapping of operation name, e.g. `SearchGameSessions`, to the JSON response body
+    """
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.request_counts = {}
+
+    def attach(self, boto3_module, region_name='us-west-2'):
+        """Sets up the default session of the boto3 module, so that the clients it creates send requests here"""
+        boto3_module.setup_default_session(aws_access_key_id='local', aws_secret_access_key='local',
+                                           region_name=region_name)
+        boto3_module.DEFAULT_SESSION.events.register('before-send', self._send)
+
+    def _send(self, request, event_name, **kwargs):
+        operation_name = event_name.rsplit('.', 1)[-1]
+        self.request_counts[operation_name] = self.request_counts.get(operation_name, 0) + 1
+        body = json.dumps(self.responses[operation_name]).encode('utf-8')
+        return AWSResponse(request.url, 200, {'Content-Type': 'application/x-amz-json-1.0'}, _LocalHttpBody(body))
+
+
+class _LocalHttpBody:
+    def __init__(self, body):
+        self._body = body
+
+    def stream(self, **kwargs):
+        yield self._body
+
+
+def to_dynamodb_types(value):
+    """Converts a python value to the types returned by the boto3 DynamoDB resource"""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes, Decimal)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, dict):
+        return {k: to_dynamodb_types(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamodb_types(v) for v in value]
+    if isinstance(value, set):
+        return {to_dynamodb_types(v) for v in value}
+    raise TypeError(f'Unsupported type: {type(value)}')
+
+
+def item_size(item):
+    """Approximate DynamoDB item size in bytes"""
+    return sum(len(name.encode()) + value_size(value) for name, value in item.items())
+
+
+def value_size(value):
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, Decimal):
+        return 1 + math.ceil(len(value.as_tuple().digits) / 2)
+    if isinstance(value, dict):
+        return 3 + sum(1 + len(k.encode()) + value_size(v) for k, v in value.items())
+    if isinstance(value, (list, set)):
+        return 3 + sum(1 + value_size(v) for v in value)
+    raise TypeError(f'Unsupported type: {type(value)}')
+
+
+def project(item, projection_expression, expression_attribute_names):
+    if not projection_expression:
+        return copy.deepcopy(item)
+    names = [(expression_attribute_names or {}).get(name.strip(), name.strip())
+             for name in projection_expression.split(',')]
+    return {name: copy.deepcopy(item[name]) for name in names if name in item}
+
+
+def project_index(item, table, index_name, non_key_attributes):
+    if non_key_attributes == PROJECTION_ALL:
+        return item
+    index = table.indexes[index_name]
+    names = {table.hash_key, table.range_key, index.hash_key, index.range_key, *non_key_attributes}
+    return {name: value for name, value in item.items() if name in names}
+
+
+def find_equality_value(condition, attribute_name):
+    expression = condition.get_expression()
+    if expression['operator'] == '=' and expression['values'][0].name == attribute_name:
+        return to_dynamodb_types(expression['values'][1])
+    if expression['operator'] == 'AND':
+        for value in expression['values']:
+            found = find_equality_value(value, attribute_name)
+            if found is not None:
+                return found
+    return None
+
+
+def evaluate(condition, item):
+    """Evaluates a boto3.dynamodb.conditions condition against an item"""
+    expression = condition.get_expression()
+    operator = expression['operator']
+    values = expression['values']
+    if operator == 'AND':
+        return all(evaluate(value, item) for value in values)
+    if operator == 'OR':
+        return any(evaluate(value, item) for value in values)
+    if operator == 'NOT':
+        return not evaluate(values[0], item)
+    name = values[0].name
+    if operator == 'attribute_exists':
+        return name in item
+    if operator == 'attribute_not_exists':
+        return name not in item
+    if name not in item:
+        return False
+    return compare(item[name], operator, [to_dynamodb_types(value) for value in values[1:]])
+
+
+def evaluate_expected(expected, item, conditional_operator):
+    """Evaluates the legacy `Expected` conditional parameter against an item"""
+    results = []
+    for name, condition in expected.items():
+        if 'ComparisonOperator' in condition:
+            operator = condition['ComparisonOperator']
+            operands = condition.get('AttributeValueList') or [condition.get('Value')]
+            operands = [to_dynamodb_types(operand) for operand in operands]
+            if operator == 'NULL':
+                results.append(name not in item)
+            elif operator == 'NOT_NULL':
+                results.append(name in item)
+            else:
+                results.append(name in item and compare(item[name], LEGACY_OPERATORS[operator], operands))
+        elif condition.get('Exists') is False:
+            results.append(name not in item)
+        else:
+            results.append(name in item and item[name] == to_dynamodb_types(condition['Value']))
+    return any(results) if conditional_operator == 'OR' else all(results)
+
+
+LEGACY_OPERATORS = {
+    'EQ': '=',
+    'NE': '<>',
+    'LT': '<',
+    'LE': '<=',
+    'GT': '>',
+    'GE': '>=',
+    'IN': 'IN',
+    'BETWEEN': 'BETWEEN',
+    'BEGINS_WITH': 'begins_with'
+}
+
+
+def compare(value, operator, operands):
+    try:
+        if operator == '=':
+            return value == operands[0]
+        if operator == '<>':
+            return value != operands[0]
+        if operator == '<':
+            return value < operands[0]
+        if operator == '<=':
+            return value <= operands[0]
+        if operator == '>':
+            return value > operands[0]
+        if operator == '>=':
+            return value >= operands[0]
+        if operator == 'IN':
+            return value in (operands[0] if len(operands) == 1 and isinstance(operands[0], list) else operands)
+        if operator == 'BETWEEN':
+            return operands[0] <= value <= operands[1]
+        if operator == 'begins_with':
+            return value.startswith(operands[0])
+        if operator == 'contains':
+            return operands[0] in value
+    except TypeError:
+        return False
+    raise ValueError(f'Unsupported condition operator: {operator}')
@@ -0,0 +1,69 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# AWS clients and environment variables are loaded once per lambda container, on first use, and reused by the warm
+# invocations that follow, since building a client costs more than most of the requests made with it. A container runs
+# one invocation at a time, so the state functions keep across invocations, such as their caches, needs no lock. Only
+# state shared with the worker threads of an invocation, such as these clients, is synchronized.
+
+import boto3
+from botocore.config import Config
+import os
+import threading
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10  # botocore default
+
+_lock = threading.Lock()
+_clients = {}
+_tables = {}
+_environment_variables = {}
+_MISSING = object()
+
+
+def get_client(service_name, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+    """Returns the client of a service, shared by all invocations and threads of the container"""
+    key = (service_name, max_pool_connections)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = boto3.client(service_name, config=Config(max_pool_connections=max_pool_connections))
+                _clients[key] = client
+    return client
+
+
+def get_table(table_name, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+    """
+    Returns a DynamoDB table, shared by all invocations and threads of the container. Only the stateless actions of
+     the table are used, so it can be shared.
+    """
+    key = (table_name, max_pool_connections)
+    table = _tables.get(key)
+    if table is None:
+        with _lock:
+            table = _tables.get(key)
+            if table is None:
+                dynamodb = boto3.resource('dynamodb', config=Config(max_pool_connections=max_pool_connections))
+                table = dynamodb.Table(table_name)
+                _tables[key] = table
+    return table
+
+
+def get_environment_variable(name, default=_MISSING):
+    """Returns an environment variable of the function, raising KeyError if it is not set and has no default"""
+    value = _environment_variables.get(name, _MISSING)
+    if value is _MISSING:
+        value = os.environ.get(name, default)
+        if value is _MISSING:
+            raise KeyError(name)
+        _environment_variables[name] = value
+    return value
+
+
+def reset():
+    """Drops the loaded clients and environment variables, so that the next invocation loads them again"""
+    with _lock:
+        _clients.clear()
+        _tables.clear()
+        _environment_variables.clear()
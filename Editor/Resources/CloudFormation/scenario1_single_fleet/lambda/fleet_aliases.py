@@ -0,0 +1,30 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Fleet aliases are resolved to the fleet they route to once per container and time to live, rather than on every
+# game session search, location lookup or warm pool run.
+
+import time
+
+# Aliases are rarely pointed to another fleet
+FLEET_ID_TTL_IN_SECONDS = 5 * 60  # 5 minutes
+
+
+class FleetAliases:
+    """Fleets the fleet aliases route to, kept for `FLEET_ID_TTL_IN_SECONDS`"""
+
+    def __init__(self):
+        self._fleet_ids = {}
+
+    def get_fleet_id(self, gamelift, fleet_alias):
+        """Returns the fleet the alias routes to, or None if it does not route to a fleet"""
+        expiration_time, fleet_id = self._fleet_ids.get(fleet_alias, (None, None))
+        if expiration_time is None or expiration_time <= time.monotonic():
+            routing_strategy = gamelift.describe_alias(AliasId=fleet_alias)['Alias']['RoutingStrategy']
+            fleet_id = routing_strategy.get('FleetId')
+            self._fleet_ids[fleet_alias] = (time.monotonic() + FLEET_ID_TTL_IN_SECONDS, fleet_id)
+        return fleet_id
+
+
+# Fleets of the fleet aliases, kept by the warm container for all the modules resolving them
+fleet_aliases = FleetAliases()
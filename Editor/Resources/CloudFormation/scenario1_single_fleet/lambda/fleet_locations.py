@@ -0,0 +1,139 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Game sessions are searched for and created in the locations of the fleet, its home region and the remote locations
+# it is deployed to, ranked by the latency the player reported to each of them. The game request keeps the latencies
+# of the player in the GameSessionReservation table, so that the results requests of clients that only send them with
+# the game request rank the locations the same way.
+
+from botocore.exceptions import ClientError
+import json
+import time
+
+from aws_clients import get_environment_variable
+from fleet_aliases import fleet_aliases
+
+# Fleets are rarely deployed to other locations
+FLEET_LOCATIONS_TTL_IN_SECONDS = 5 * 60  # 5 minutes
+UTILIZATION_TTL_IN_SECONDS = 5
+# Fleet aliases never contain '#'
+PLAYER_LATENCIES_KEY_INFIX = '#PlayerLatencies#'
+# Players are expected to connect within minutes of starting a game, and send their latencies again with the next one
+PLAYER_LATENCIES_TTL_IN_SECONDS = 15 * 60  # 15 minutes
+
+
+class FleetLocations:
+    """
+    Active locations of the fleets of fleet aliases, home region first, and their utilization, kept for a while per
+     container.
+    :param aliases: fleets of the fleet aliases, see `fleet_aliases`
+    """
+
+    def __init__(self, aliases=fleet_aliases):
+        self._aliases = aliases
+        self._locations = {}
+        self._utilizations = {}
+
+    def rank(self, gamelift, fleet_alias, region_to_latency_mapping):
+        """
+        Returns the locations of the fleet alias, lowest latency first. Locations the player reported no latency to
+         come last, home region first.
+        """
+        _, locations = self._get_locations(gamelift, fleet_alias)
+        return rank_locations(locations, region_to_latency_mapping)
+
+    def count_locations(self, gamelift, fleet_alias):
+        _, locations = self._get_locations(gamelift, fleet_alias)
+        return len(locations)
+
+    def has_idle_server_processes(self, gamelift, fleet_alias, location):
+        """Returns whether the location has server processes free to host a new game session"""
+        fleet_id, _ = self._get_locations(gamelift, fleet_alias)
+        expiration_time, utilization = self._utilizations.get((fleet_id, location), (None, None))
+        if expiration_time is None or expiration_time <= time.monotonic():
+            utilization = gamelift.describe_fleet_location_utilization(
+                FleetId=fleet_id,
+                Location=location
+            )['FleetUtilization']
+            self._utilizations[(fleet_id, location)] = (time.monotonic() + UTILIZATION_TTL_IN_SECONDS, utilization)
+        return utilization['ActiveServerProcessCount'] > utilization['ActiveGameSessionCount']
+
+    def _get_locations(self, gamelift, fleet_alias):
+        expiration_time, fleet_id, locations = self._locations.get(fleet_alias, (None, None, None))
+        if expiration_time is None or expiration_time <= time.monotonic():
+            fleet_id = self._aliases.get_fleet_id(gamelift, fleet_alias)
+            locations = [get_home_region()]
+            describe_fleet_location_attributes_parameters = {'FleetId': fleet_id}
+            while True:
+                describe_fleet_location_attributes_response = gamelift.describe_fleet_location_attributes(
+                    **describe_fleet_location_attributes_parameters)
+                for location_attributes in describe_fleet_location_attributes_response['LocationAttributes']:
+                    location_state = location_attributes['LocationState']
+                    if location_state['Status'] == 'ACTIVE' and location_state['Location'] not in locations:
+                        locations.append(location_state['Location'])
+                if 'NextToken' not in describe_fleet_location_attributes_response:
+                    break
+                describe_fleet_location_attributes_parameters['NextToken'] = \
+                    describe_fleet_location_attributes_response['NextToken']
+            print(f"Found fleet locations: {fleet_alias}, FleetId: {fleet_id}, Locations: {locations}")
+            self._locations[fleet_alias] = (time.monotonic() + FLEET_LOCATIONS_TTL_IN_SECONDS, fleet_id, locations)
+        return fleet_id, locations
+
+
+def rank_locations(locations, region_to_latency_mapping):
+    """Sorts the locations by the latency of the player, keeping the order of those the player reported none to"""
+    region_to_latency_mapping = region_to_latency_mapping or {}
+    return sorted(locations, key=lambda location: (location not in region_to_latency_mapping,
+                                                   region_to_latency_mapping.get(location, 0)))
+
+
+def get_home_region():
+    """Returns the home region of the fleet, which is the region of the stack"""
+    return get_environment_variable('AWS_REGION')
+
+
+def get_region_to_latency_mapping(event):
+    request_body = event.get("body")
+    if not request_body:
+        return None
+
+    try:
+        request_body_json = json.loads(request_body)
+    except ValueError:
+        print(f"Error parsing request body: {request_body}")
+        return None
+
+    if request_body_json and request_body_json.get('regionToLatencyMapping'):
+        return request_body_json.get('regionToLatencyMapping')
+
+
+def record_player_latencies(reservation_table, fleet_alias, player_id, region_to_latency_mapping, now):
+    """Keeps the latencies the player sent with the game request, for the results requests that follow"""
+    try:
+        reservation_table.put_item(
+            Item={
+                'FleetAlias': to_player_latencies_key(fleet_alias, player_id),
+                'RegionToLatencyMapping': json.dumps(region_to_latency_mapping),
+                'ExpirationTime': now + PLAYER_LATENCIES_TTL_IN_SECONDS
+            }
+        )
+    except ClientError as e:
+        # Locations are then ranked home region first by the results requests
+        print(f'Error occurred when recording latencies of {player_id}. Exception: {e}')
+
+
+def get_player_latencies(reservation_table, fleet_alias, player_id, now):
+    """Returns the latencies the player sent with the last game request, or None if there are none"""
+    player_latencies = reservation_table.get_item(
+        Key={
+            'FleetAlias': to_player_latencies_key(fleet_alias, player_id)
+        }
+    ).get('Item')
+    # Expired items are deleted within days, not right away
+    if player_latencies is None or player_latencies['ExpirationTime'] <= now:
+        return None
+    return json.loads(player_latencies['RegionToLatencyMapping'])
+
+
+def to_player_latencies_key(fleet_alias, player_id):
+    return f'{fleet_alias}{PLAYER_LATENCIES_KEY_INFIX}{player_id}'
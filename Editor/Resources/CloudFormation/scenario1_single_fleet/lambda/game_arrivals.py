@@ -0,0 +1,87 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Game requests of the players, counted per minute and fleet alias in the GameSessionReservation table, from which the
+# game session warm pool forecasts the arrival rate of the next minutes. They are counted by the game session
+# provisioning function as it receives them from the queue, with one write per interval per batch, so that the game
+# request makes no write for them and bursts of game requests do not all write the same item. The counts only size the
+# warm pool, so they are best effort: game requests whose count failed are not counted again.
+
+from botocore.exceptions import ClientError
+import math
+
+# Fleet aliases never contain '#'
+GAME_ARRIVALS_KEY_INFIX = '#GameArrivals#'
+ARRIVAL_INTERVAL_IN_SECONDS = 60
+ARRIVAL_RETENTION_IN_SECONDS = 60 * 60  # 1 hour
+FORECAST_INTERVAL_COUNT = 15
+# Smoothing factors of the level and trend of the arrival counts. Recent intervals weigh more, so that the forecast
+# follows a ramp up within a few minutes
+LEVEL_SMOOTHING_FACTOR = 0.5
+TREND_SMOOTHING_FACTOR = 0.3
+
+
+def record_game_arrivals(reservation_table, fleet_alias, request_times):
+    """Counts game requests in the arrivals of the intervals they were made in"""
+    arrival_counts = {}
+    for request_time in request_times:
+        interval_start_time = request_time - request_time % ARRIVAL_INTERVAL_IN_SECONDS
+        arrival_counts[interval_start_time] = arrival_counts.get(interval_start_time, 0) + 1
+    for interval_start_time, arrival_count in arrival_counts.items():
+        try:
+            reservation_table.update_item(
+                Key={
+                    'FleetAlias': to_game_arrivals_key(fleet_alias, interval_start_time)
+                },
+                AttributeUpdates={
+                    'ArrivalCount': {
+                        'Value': arrival_count,
+                        'Action': 'ADD'
+                    },
+                    'ExpirationTime': {
+                        'Value': interval_start_time + ARRIVAL_RETENTION_IN_SECONDS
+                    }
+                }
+            )
+        except ClientError as e:
+            # Arrivals only size the warm pool, the game requests are provisioned without them
+            print(f'Error occurred when recording game arrivals of {fleet_alias}. Exception: {e}')
+
+
+def get_game_arrival_counts(reservation_table, fleet_alias, now, interval_count=FORECAST_INTERVAL_COUNT):
+    """Returns the arrival counts of the last complete intervals, oldest first"""
+    current_interval_start_time = now - now % ARRIVAL_INTERVAL_IN_SECONDS
+    arrival_counts = []
+    for i in range(interval_count, 0, -1):
+        interval_start_time = current_interval_start_time - i * ARRIVAL_INTERVAL_IN_SECONDS
+        arrivals = reservation_table.get_item(
+            Key={
+                'FleetAlias': to_game_arrivals_key(fleet_alias, interval_start_time)
+            }
+        ).get('Item', {})
+        arrival_counts.append(int(arrivals.get('ArrivalCount', 0)))
+    return arrival_counts
+
+
+def forecast_arrival_rate(arrival_counts, horizon_in_seconds):
+    """
+    Forecasts the arrivals per second over the horizon, with Holt's linear trend method: the level and trend of the
+     counts are smoothed exponentially, and the trend extrapolated to the end of the horizon.
+    :param arrival_counts: arrival counts of consecutive intervals, oldest first
+    :param horizon_in_seconds: time after the last interval the forecast covers
+    """
+    if not arrival_counts:
+        return 0.0
+    level = arrival_counts[0]
+    trend = 0.0
+    for arrival_count in arrival_counts[1:]:
+        previous_level = level
+        level = LEVEL_SMOOTHING_FACTOR * arrival_count + (1 - LEVEL_SMOOTHING_FACTOR) * (level + trend)
+        trend = TREND_SMOOTHING_FACTOR * (level - previous_level) + (1 - TREND_SMOOTHING_FACTOR) * trend
+    # The current interval, not yet complete, is part of the horizon
+    horizon_interval_count = math.ceil(horizon_in_seconds / ARRIVAL_INTERVAL_IN_SECONDS) + 1
+    return max(0.0, level + trend * horizon_interval_count) / ARRIVAL_INTERVAL_IN_SECONDS
+
+
+def to_game_arrivals_key(fleet_alias, interval_start_time):
+    return f'{fleet_alias}{GAME_ARRIVALS_KEY_INFIX}{interval_start_time}'
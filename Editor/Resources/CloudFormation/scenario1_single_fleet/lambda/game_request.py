@@ -1,40 +1,59 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
-import boto3
-import os
 import json
+import time
+
+from aws_clients import get_client, get_environment_variable, get_table
+from fleet_locations import get_region_to_latency_mapping, record_player_latencies
+from player_session_reservations import clear_reserved_player_session
 
 
 def handler(event, context):
     """
     Handles requests to start games from the game client.
-     This function first looks for any game session
+     This function sends the request to the GameSessionProvisioning queue, from which the game sessions the player
+     needs are created in batches, and the game arrivals the warm pool is sized from are counted (see
+     `game_session_provisioning`). It answers without waiting for GameLift, and the game client polls the results
+     request until the player is placed in a game session. The player session reserved for the previous game of the
+     player is cleared first, so that the results requests of this game get a new one.
     :param event: lambda event, contains the region to player latency mapping in `regionToLatencyMapping` key, as well
      as the player information from the Cognito id tokens.
     :param context: lambda context, not used by this function
     :return:
-     - 202 (Accepted) if the matchmaking request is accepted and is now being processed
-     - 409 (Conflict) if the another matchmaking request is in progress
-     - 500 (Internal Error) if error occurred when processing the matchmaking request
+     - 202 (Accepted) if the game request is accepted and is now being processed
+     - 500 (Internal Error) if error occurred when processing the game request
     """
 
-    gamelift = boto3.client('gamelift')
-    fleet_alias = os.environ['FleetAlias']
-    max_players_per_game = int(os.environ['MaxPlayersPerGame'])
+    sqs = get_client('sqs')
+    fleet_alias = get_environment_variable('FleetAlias')
+    queue_url = get_environment_variable('GameSessionProvisioningQueueUrl')
+    game_session_reservation_table_name = get_environment_variable('GameSessionReservationTableName')
+    game_session_reservation_table = get_table(game_session_reservation_table_name)
 
+    now = round(time.time())
     player_id = event["requestContext"]["authorizer"]["claims"]["sub"]
     print(f'Handling start game request. PlayerId: {player_id}')
 
-    # NOTE: latency mapping is not used in this deployment scenario
     region_to_latency_mapping = get_region_to_latency_mapping(event)
     if region_to_latency_mapping:
         print(f"Region to latency mapping: {region_to_latency_mapping}")
+        record_player_latencies(game_session_reservation_table, fleet_alias, player_id, region_to_latency_mapping,
+                                now)
     else:
         print("No regionToLatencyMapping mapping provided")
 
-    if not has_viable_game_sessions(gamelift, fleet_alias):
-        create_game_session(gamelift, fleet_alias, max_players_per_game)
+    clear_reserved_player_session(game_session_reservation_table, fleet_alias, player_id)
+
+    send_message_response = sqs.send_message(
+        QueueUrl=queue_url,
+        MessageBody=json.dumps({
+            'PlayerId': player_id,
+            'RegionToLatencyMapping': region_to_latency_mapping,
+            'RequestTime': now
+        })
+    )
+    print(f"Sent game request to provisioning queue. MessageId: {send_message_response['MessageId']}")
 
     return {
         'headers': {
@@ -43,37 +62,3 @@ def handler(event, context):
         'statusCode': 202
     }
 
-
-def has_viable_game_sessions(gamelift, fleet_alias):
-    print(f"Checking for viable game sessions: {fleet_alias}")
-
-    # NOTE: SortExpression="creationTimeMillis ASC" is not needed because we are looking for any viable game sessions,
-    # hence the order does not matter.
-    search_game_sessions_response = gamelift.search_game_sessions(
-        AliasId=fleet_alias,
-        FilterExpression="hasAvailablePlayerSessions=true",
-    )
-    return len(search_game_sessions_response['GameSessions']) != 0
-
-
-def create_game_session(gamelift, fleet_alias, max_players_per_game):
-    print(f"Creating game session: {fleet_alias}")
-    gamelift.create_game_session(
-        AliasId=fleet_alias,
-        MaximumPlayerSessionCount=max_players_per_game,
-    )
-
-
-def get_region_to_latency_mapping(event):
-    request_body = event.get("body")
-    if not request_body:
-        return None
-
-    try:
-        request_body_json = json.loads(request_body)
-    except ValueError:
-        print(f"Error parsing request body: {request_body}")
-        return None
-
-    if request_body_json and request_body_json.get('regionToLatencyMapping'):
-        return request_body_json.get('regionToLatencyMapping')
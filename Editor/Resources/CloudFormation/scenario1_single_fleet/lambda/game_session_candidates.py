@@ -0,0 +1,117 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Viable game sessions are searched for once per container and time to live, and handed out to the players the
+# container serves, instead of being searched for on every results request.
+
+from botocore.exceptions import ClientError
+import time
+
+from fleet_aliases import fleet_aliases
+from placement_policies import OldestFirstPlacementPolicy
+
+DEFAULT_CANDIDATE_TTL_IN_SECONDS = 5
+EMPTY_CANDIDATES_TTL_IN_SECONDS = 1
+SEARCH_GAME_SESSIONS_LIMIT = 20  # GameLift maximum
+# Errors of CreatePlayerSession after which the next candidate game session is tried
+UNAVAILABLE_GAME_SESSION_ERROR_CODES = ['GameSessionFullException', 'InvalidGameSessionStatusException']
+
+
+class CandidateGameSessions:
+    """
+    Viable game sessions of fleet aliases, per location, in the order of a placement policy, searched across all pages
+     and kept for `ttl_in_seconds`. Players are placed in the first candidate, which is sorted again after counting the
+     player session created in it. A candidate is dropped once full, or when GameLift reports it full, and the next
+     candidate is tried without another search.
+    :param ttl_in_seconds: time during which the game sessions found by a search are handed out
+    :param aliases: fleets of the fleet aliases, see `fleet_aliases`
+    """
+
+    def __init__(self, ttl_in_seconds=DEFAULT_CANDIDATE_TTL_IN_SECONDS, aliases=fleet_aliases):
+        self.ttl_in_seconds = ttl_in_seconds
+        self._aliases = aliases
+        self._candidates = {}
+
+    def create_player_session(self, gamelift, fleet_alias, player_id, placement_policy=OldestFirstPlacementPolicy(),
+                              location=None):
+        """
+        Creates a player session in the first candidate game session of the fleet alias. Game sessions are searched for
+         at most once per call, when the candidates expired or ran out.
+        :param placement_policy: order of the candidate game sessions, see `placement_policies`
+        :param location: fleet location of the game sessions, or None for all the locations of the fleet
+        :return: the player session, or None if there is no viable game session
+        """
+        key = (fleet_alias, location)
+        searched = False
+        while True:
+            expiration_time, candidates = self._candidates.get(key, (None, None))
+            if candidates is None or expiration_time <= time.monotonic():
+                if searched:
+                    return None
+                candidates = self._search(gamelift, fleet_alias, location, placement_policy)
+                searched = True
+            if not candidates:
+                return None
+
+            game_session = candidates[0]
+            print(f"Creating PlayerSession session on GameSession: {game_session['GameSessionId']}, "
+                  f"PlayerId: {player_id}")
+            try:
+                create_player_session_response = gamelift.create_player_session(
+                    GameSessionId=game_session['GameSessionId'],
+                    PlayerId=player_id
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] not in UNAVAILABLE_GAME_SESSION_ERROR_CODES:
+                    raise e
+                print(f"GameSession is no longer viable: {game_session['GameSessionId']}. "
+                      f"Error: {e.response['Error']['Code']}")
+                self._discard(key, candidates)
+                continue
+
+            print(f"Received create player session response: {create_player_session_response}")
+            game_session['CurrentPlayerSessionCount'] += 1
+            if game_session['CurrentPlayerSessionCount'] >= game_session['MaximumPlayerSessionCount']:
+                self._discard(key, candidates)
+            else:
+                candidates.sort(key=placement_policy.sort_key)
+            return create_player_session_response['PlayerSession']
+
+    def _search(self, gamelift, fleet_alias, location, placement_policy):
+        fleet_id = self._aliases.get_fleet_id(gamelift, fleet_alias)
+        print(f"Searching for viable game sessions: {fleet_alias}, FleetId: {fleet_id}, Location: {location}")
+        search_game_sessions_parameters = {
+            'FilterExpression': "hasAvailablePlayerSessions=true",
+            'SortExpression': placement_policy.sort_expression,
+            'Limit': SEARCH_GAME_SESSIONS_LIMIT
+        }
+        if fleet_id:
+            search_game_sessions_parameters['FleetId'] = fleet_id
+        else:
+            search_game_sessions_parameters['AliasId'] = fleet_alias
+        if location:
+            search_game_sessions_parameters['Location'] = location
+
+        candidates = []
+        while True:
+            search_game_sessions_response = gamelift.search_game_sessions(**search_game_sessions_parameters)
+            candidates += search_game_sessions_response['GameSessions']
+            if 'NextToken' not in search_game_sessions_response:
+                break
+            search_game_sessions_parameters['NextToken'] = search_game_sessions_response['NextToken']
+        # Pages are sorted by GameLift, ties between them by the policy
+        candidates.sort(key=placement_policy.sort_key)
+        print(f"Found viable game sessions: {len(candidates)}")
+
+        # Finding none is reused for less time, so that players see new game sessions soon after they activate
+        ttl_in_seconds = self.ttl_in_seconds
+        if not candidates:
+            ttl_in_seconds = min(ttl_in_seconds, EMPTY_CANDIDATES_TTL_IN_SECONDS)
+        self._candidates[(fleet_alias, location)] = (time.monotonic() + ttl_in_seconds, candidates)
+        return candidates
+
+    def _discard(self, key, candidates):
+        candidates.pop(0)
+        # Running out of candidates is not cached, the next player searches again
+        if not candidates:
+            self._candidates.pop(key, None)
@@ -0,0 +1,172 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Game requests only record the demand of the players in the GameSessionProvisioning queue, so that they are answered
+# without waiting for GameLift. This function consumes the queue in batches, in up to `MaxConcurrency` concurrent
+# invocations, and creates the game sessions the players of a batch need, at most `MaxGameSessionCreationsPerSecond`
+# across the invocations, so that GameLift is called at a steady rate whatever the arrival rate of the players.
+# The game requests of a location that could not be provisioned are reported as batch item failures, so that only
+# they are retried, and moved to the dead-letter queue after a few attempts.
+
+from botocore.exceptions import ClientError
+import json
+import time
+
+from aws_clients import get_client, get_environment_variable, get_table
+from fleet_locations import FleetLocations, get_home_region
+from game_arrivals import record_game_arrivals
+from game_session_reservations import add_pending_player, release_game_session, reserve_game_session
+from game_session_warm_pool import list_game_sessions
+
+DEFAULT_MAX_GAME_SESSION_CREATIONS_PER_SECOND = 10
+DEFAULT_MAX_CONCURRENCY = 2
+# Players who are not placed within minutes have given up, or started another game
+MAX_GAME_REQUEST_AGE_IN_SECONDS = 5 * 60  # 5 minutes
+SEARCH_GAME_SESSIONS_LIMIT = 20
+
+
+class CreationPacer:
+    """Spaces game session creations, across the invocations of the container"""
+
+    def __init__(self):
+        self._next_creation_time = 0.0
+
+    def wait(self, creations_per_second):
+        """Sleeps until the next creation is due, and schedules the one after it"""
+        now = time.monotonic()
+        if self._next_creation_time > now:
+            time.sleep(self._next_creation_time - now)
+            now = self._next_creation_time
+        self._next_creation_time = now + 1 / creations_per_second
+
+
+# Locations of the fleet, and pace of the game session creations, kept by the warm container
+fleet_locations = FleetLocations()
+creation_pacer = CreationPacer()
+
+
+def handler(event, context):
+    """
+    Handles batches of game requests from the GameSessionProvisioning queue.
+     The players of the batch are grouped by the location of the fleet they reported the lowest latency to. For each
+     location, the players are counted in the game session reservation lease of the fleet alias in the location, and
+     the game sessions it reserves for the players the free player slots of its viable game sessions do not cover are
+     created (see `game_session_reservations`). If the location has no capacity left for a new game session, its
+     players are provisioned in their next location by latency (see `fleet_locations`), and the game requests of the
+     players with no location left are retried, until they are moved to the dead-letter queue.
+
+    Each of the `MaxConcurrency` concurrent invocations creates game sessions at its share of
+     `MaxGameSessionCreationsPerSecond`. Game requests older than a few minutes are dropped, since their players have
+     moved on.
+
+    Game requests received for the first time are counted in the game arrivals the warm pool is sized from (see
+     `game_arrivals`).
+
+    :param event: lambda event, contains the game requests recorded by the game request function in `Records` key
+    :param context: lambda context, not used by this function
+    :return: the batch item failures, listing the message ids of the game requests to retry
+    """
+
+    gamelift = get_client('gamelift')
+    fleet_alias = get_environment_variable('FleetAlias')
+    max_players_per_game = int(get_environment_variable('MaxPlayersPerGame'))
+    reservation_lease_time = int(get_environment_variable('ReservationLeaseInSeconds'))
+    max_concurrency = int(get_environment_variable('MaxConcurrency', DEFAULT_MAX_CONCURRENCY))
+    creations_per_second = float(get_environment_variable('MaxGameSessionCreationsPerSecond',
+                                                          DEFAULT_MAX_GAME_SESSION_CREATIONS_PER_SECOND)) \
+        / max_concurrency
+    game_session_reservation_table_name = get_environment_variable('GameSessionReservationTableName')
+    game_session_reservation_table = get_table(game_session_reservation_table_name)
+
+    now = round(time.time())
+    # Ranked locations left to try, and message id, per player
+    player_locations = []
+    failed_message_ids = set()
+    oldest_request_time = now
+    arrival_times = []
+    for record in event['Records']:
+        message_id = record['messageId']
+        try:
+            game_request = json.loads(record['body'])
+            request_time = game_request.get('RequestTime', now)
+            # Game requests retried after a batch item failure were counted when first received
+            if record['attributes']['ApproximateReceiveCount'] == '1':
+                arrival_times.append(request_time)
+            if now - request_time > MAX_GAME_REQUEST_AGE_IN_SECONDS:
+                print(f"Dropping game request of player: {game_request['PlayerId']}, made {now - request_time}s ago")
+                continue
+            locations = fleet_locations.rank(gamelift, fleet_alias, game_request.get('RegionToLatencyMapping'))
+            player_locations.append((game_request['PlayerId'], locations, message_id))
+            oldest_request_time = min(oldest_request_time, request_time)
+        except Exception as ex:
+            print(f'Error occurred when parsing game request. MessageId: {message_id}. Exception: {ex}')
+            failed_message_ids.add(message_id)
+    print(f"Provisioning game sessions: {fleet_alias}, Players: {len(player_locations)}, "
+          f"Oldest request: {now - oldest_request_time}s ago")
+    record_game_arrivals(game_session_reservation_table, fleet_alias, arrival_times)
+
+    while player_locations:
+        location = player_locations[0][1][0]
+        location_players = [player for player in player_locations if player[1][0] == location]
+        player_locations = [player for player in player_locations if player[1][0] != location]
+
+        try:
+            viable_player_slot_count = count_viable_player_slots(gamelift, fleet_alias, location)
+            lease = add_pending_player(game_session_reservation_table, fleet_alias, location, now,
+                                       reservation_lease_time, len(location_players), viable_player_slot_count)
+            create_reserved_game_sessions(gamelift, game_session_reservation_table, lease, fleet_alias, location,
+                                          max_players_per_game, creations_per_second)
+        except Exception as ex:
+            if isinstance(ex, ClientError) and ex.response['Error']['Code'] == 'FleetCapacityExceededException':
+                print(f"No capacity left for game sessions in location: {location}")
+                player_locations += [(player_id, locations[1:], message_id)
+                                     for player_id, locations, message_id in location_players if len(locations) > 1]
+                failed_message_ids.update(message_id for _, locations, message_id in location_players
+                                          if len(locations) == 1)
+                continue
+            print(f'Error occurred when provisioning game sessions in location: {location}. Exception: {ex}')
+            failed_message_ids.update(message_id for _, _, message_id in location_players)
+
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in sorted(failed_message_ids)]
+    }
+
+
+def count_viable_player_slots(gamelift, fleet_alias, location):
+    """Returns the free player slots of the viable game sessions of the fleet alias in the location"""
+    viable_game_sessions = list_game_sessions(gamelift.search_game_sessions, AliasId=fleet_alias,
+                                              FilterExpression="hasAvailablePlayerSessions=true",
+                                              Location=location, Limit=SEARCH_GAME_SESSIONS_LIMIT)
+    return sum(game_session['MaximumPlayerSessionCount'] - game_session['CurrentPlayerSessionCount']
+               for game_session in viable_game_sessions)
+
+
+def create_reserved_game_sessions(gamelift, game_session_reservation_table, lease, fleet_alias, location,
+                                  max_players_per_game, creations_per_second):
+    """
+    Creates game sessions while fewer are reserved in the lease than its pending players need, at most
+     `creations_per_second`
+    """
+    while True:
+        lease = reserve_game_session(game_session_reservation_table, lease, max_players_per_game)
+        if lease is None:
+            return
+        creation_pacer.wait(creations_per_second)
+        try:
+            create_game_session(gamelift, fleet_alias, max_players_per_game, location)
+        except Exception as ex:
+            release_game_session(game_session_reservation_table, lease)
+            raise ex
+
+
+def create_game_session(gamelift, fleet_alias, max_players_per_game, location=None):
+    """Creates a game session in the location, or in the home region of the fleet if None"""
+    print(f"Creating game session: {fleet_alias}, Location: {location}")
+    create_game_session_parameters = {}
+    if location and location != get_home_region():
+        create_game_session_parameters['Location'] = location
+    gamelift.create_game_session(
+        AliasId=fleet_alias,
+        MaximumPlayerSessionCount=max_players_per_game,
+        **create_game_session_parameters
+    )
@@ -0,0 +1,159 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Game sessions are created on demand when players find no viable game session. Players arriving together would all
+# find none, so the creations are coalesced with a lease item per fleet alias and location in the
+# GameSessionReservation table: it counts the players who found no viable game session in the location since the lease
+# started, and the game sessions reserved for them, and a game session is only created after reserving it, while fewer
+# than ceil((pending - viable) / MaxPlayersPerGame) are, where viable is the free player slots of the viable game
+# sessions when the lease started. Those are only counted once: the slots of the game sessions created for the lease
+# are taken by its pending players, not by the players counted in after them. The lease lasts about the time a new
+# game session takes to become viable, after which players find the game sessions of the lease, or start a new lease
+# if those are full.
+
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+import math
+
+DEFAULT_LEASE_TIME_IN_SECONDS = 60
+# Fleet aliases never contain '#'
+LEASE_KEY_INFIX = '#Location#'
+# Lease items are kept a while after they end, then expire
+LEASE_TTL_IN_SECONDS = 60 * 60  # 1 hour
+MAX_LEASE_ATTEMPTS = 5
+
+
+def add_pending_player(reservation_table, fleet_alias, location, now, lease_time=DEFAULT_LEASE_TIME_IN_SECONDS,
+                       player_count=1, viable_player_slot_count=0):
+    """
+    Counts players who found no viable game session in the current lease of the fleet alias in the location, starting
+     a new lease if it has ended, and returns the lease
+    :param player_count: players counted in together, by the batches of the game session provisioning function
+    :param viable_player_slot_count: free player slots of the viable game sessions, which the players of a new lease
+     take before the game sessions it reserves
+    """
+    lease_key = to_lease_key(fleet_alias, location)
+    for _ in range(MAX_LEASE_ATTEMPTS):
+        try:
+            return reservation_table.update_item(
+                Key={
+                    'FleetAlias': lease_key
+                },
+                AttributeUpdates={
+                    'PendingPlayerCount': {
+                        'Value': player_count,
+                        'Action': 'ADD'
+                    }
+                },
+                Expected={
+                    'LeaseExpirationTime': {
+                        'Value': now,
+                        'ComparisonOperator': 'GT'
+                    }
+                },
+                ReturnValues='ALL_NEW'
+            )['Attributes']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise e
+
+        lease = {
+            'FleetAlias': lease_key,
+            'LeaseExpirationTime': now + lease_time,
+            'PendingPlayerCount': player_count,
+            'ReservedGameSessionCount': 0,
+            'ViablePlayerSlotCount': viable_player_slot_count,
+            'ExpirationTime': now + lease_time + LEASE_TTL_IN_SECONDS
+        }
+        try:
+            reservation_table.put_item(
+                Item=lease,
+                ConditionExpression=Attr('LeaseExpirationTime').not_exists() | Attr('LeaseExpirationTime').lte(now)
+            )
+            print(f"Started game session reservation lease of fleet alias: {fleet_alias}, Location: {location}")
+            return lease
+        except ClientError as e:
+            # Another player started the new lease first, which is counted in on the next attempt
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise e
+
+    raise RuntimeError(f'Failed to count pending players in game session reservation lease of: {lease_key}')
+
+
+def reserve_game_session(reservation_table, lease, max_players_per_game):
+    """
+    Reserves a game session in the lease, if fewer game sessions are reserved than its pending players need.
+    :return: the lease with the reservation, or None if enough game sessions are reserved, or the lease ended
+    """
+    while True:
+        unplaced_player_count = lease['PendingPlayerCount'] - lease.get('ViablePlayerSlotCount', 0)
+        required_game_session_count = math.ceil(max(0, unplaced_player_count) / max_players_per_game)
+        if lease['ReservedGameSessionCount'] >= required_game_session_count:
+            return None
+
+        try:
+            return reservation_table.update_item(
+                Key={
+                    'FleetAlias': lease['FleetAlias']
+                },
+                AttributeUpdates={
+                    'ReservedGameSessionCount': {
+                        'Value': 1,
+                        'Action': 'ADD'
+                    }
+                },
+                Expected={
+                    'LeaseExpirationTime': {
+                        'Value': lease['LeaseExpirationTime'],
+                        'ComparisonOperator': 'EQ'
+                    },
+                    'ReservedGameSessionCount': {
+                        'Value': lease['ReservedGameSessionCount'],
+                        'ComparisonOperator': 'EQ'
+                    }
+                },
+                ReturnValues='ALL_NEW'
+            )['Attributes']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise e
+
+        # Another player reserved a game session, or counted in, since the lease was read
+        current_lease = reservation_table.get_item(
+            Key={
+                'FleetAlias': lease['FleetAlias']
+            },
+            ConsistentRead=True
+        ).get('Item')
+        if current_lease is None or current_lease['LeaseExpirationTime'] != lease['LeaseExpirationTime']:
+            return None
+        lease = current_lease
+
+
+def release_game_session(reservation_table, lease):
+    """Releases a game session reserved in the lease, after failing to create it"""
+    try:
+        reservation_table.update_item(
+            Key={
+                'FleetAlias': lease['FleetAlias']
+            },
+            AttributeUpdates={
+                'ReservedGameSessionCount': {
+                    'Value': -1,
+                    'Action': 'ADD'
+                }
+            },
+            Expected={
+                'LeaseExpirationTime': {
+                    'Value': lease['LeaseExpirationTime'],
+                    'ComparisonOperator': 'EQ'
+                }
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise e
+
+
+def to_lease_key(fleet_alias, location):
+    return f'{fleet_alias}{LEASE_KEY_INFIX}{location}'
@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import itertools
+import math
+import time
+
+from aws_clients import get_client, get_environment_variable, get_table
+from fleet_aliases import fleet_aliases
+from fleet_locations import get_home_region
+from game_arrivals import forecast_arrival_rate, get_game_arrival_counts
+
+DEFAULT_MIN_WARM_GAME_SESSION_COUNT = 1
+# Time between runs of the function, set by the WarmPoolScheduledRule
+SCHEDULE_INTERVAL_IN_SECONDS = 60
+# Share of free player slots kept over the forecast arrivals, as the forecast lags sudden bursts
+WARM_POOL_HEADROOM_RATIO = 0.2
+DESCRIBE_GAME_SESSIONS_LIMIT = 100
+SEARCH_GAME_SESSIONS_LIMIT = 20
+
+
+def handler(event, context):
+    """
+    Keeps enough game sessions with free player slots ahead of demand, so that players find a viable game session as
+     soon as they start a game, instead of waiting for one to be created and activated.
+
+    The arrival rate of game requests is forecast from the arrivals of the last minutes (see `game_arrivals`), and
+     game sessions are created until the free player slots of the active and activating game sessions cover the
+     arrivals forecast until the game sessions created by the next run are active, with `WARM_POOL_HEADROOM_RATIO`
+     more. At least `MinWarmGameSessionCount` game sessions are kept free, and no more are created than the fleet
+     has idle server processes for. Game sessions are kept in the home region of the fleet only.
+
+    :param event: lambda event, not used by this function
+    :param context: lambda context, not used by this function
+    :return: None
+    """
+    now = round(time.time())
+
+    gamelift = get_client('gamelift')
+    fleet_alias = get_environment_variable('FleetAlias')
+    max_players_per_game = int(get_environment_variable('MaxPlayersPerGame'))
+    # Game sessions are expected to activate within a lease
+    activation_time = int(get_environment_variable('ReservationLeaseInSeconds'))
+    min_warm_game_session_count = int(get_environment_variable('MinWarmGameSessionCount',
+                                                               DEFAULT_MIN_WARM_GAME_SESSION_COUNT))
+    game_session_reservation_table_name = get_environment_variable('GameSessionReservationTableName')
+    game_session_reservation_table = get_table(game_session_reservation_table_name)
+
+    arrival_counts = get_game_arrival_counts(game_session_reservation_table, fleet_alias, now)
+    horizon = SCHEDULE_INTERVAL_IN_SECONDS + activation_time
+    arrival_rate = forecast_arrival_rate(arrival_counts, horizon)
+    target_free_player_slots = max(min_warm_game_session_count * max_players_per_game,
+                                   math.ceil(arrival_rate * horizon * (1 + WARM_POOL_HEADROOM_RATIO)))
+
+    free_player_slots = count_free_player_slots(gamelift, fleet_alias)
+    missing_game_session_count = math.ceil(max(0, target_free_player_slots - free_player_slots) / max_players_per_game)
+    idle_server_process_count = count_idle_server_processes(gamelift, fleet_alias)
+    game_session_count = min(missing_game_session_count, idle_server_process_count)
+
+    print(f"Warming game sessions: {fleet_alias}. Arrivals: {arrival_counts}, Forecast rate: {arrival_rate:.2f}/s, "
+          f"Target free player slots: {target_free_player_slots}, Free player slots: {free_player_slots}, "
+          f"Idle server processes: {idle_server_process_count}, Game sessions to create: {game_session_count}")
+
+    for _ in range(game_session_count):
+        gamelift.create_game_session(
+            AliasId=fleet_alias,
+            MaximumPlayerSessionCount=max_players_per_game,
+        )
+
+
+def count_free_player_slots(gamelift, fleet_alias):
+    """Returns the free player slots of the viable and activating game sessions of the fleet alias in its home region"""
+    home_region = get_home_region()
+    viable_game_sessions = list_game_sessions(gamelift.search_game_sessions, AliasId=fleet_alias,
+                                              FilterExpression="hasAvailablePlayerSessions=true",
+                                              Location=home_region, Limit=SEARCH_GAME_SESSIONS_LIMIT)
+    activating_game_sessions = list_game_sessions(gamelift.describe_game_sessions, AliasId=fleet_alias,
+                                                  StatusFilter='ACTIVATING', Location=home_region,
+                                                  Limit=DESCRIBE_GAME_SESSIONS_LIMIT)
+    return sum(game_session['MaximumPlayerSessionCount'] - game_session['CurrentPlayerSessionCount']
+               for game_session in itertools.chain(viable_game_sessions, activating_game_sessions))
+
+
+def list_game_sessions(operation, **parameters):
+    """Returns the game sessions of all pages of a SearchGameSessions or DescribeGameSessions operation"""
+    game_sessions = []
+    while True:
+        response = operation(**parameters)
+        game_sessions += response['GameSessions']
+        if 'NextToken' not in response:
+            return game_sessions
+        parameters['NextToken'] = response['NextToken']
+
+
+def count_idle_server_processes(gamelift, fleet_alias):
+    fleet_id = fleet_aliases.get_fleet_id(gamelift, fleet_alias)
+    fleet_utilization = gamelift.describe_fleet_utilization(FleetIds=[fleet_id])['FleetUtilization'][0]
+    return max(0, fleet_utilization['ActiveServerProcessCount'] - fleet_utilization['ActiveGameSessionCount'])
@@ -0,0 +1,53 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Clients opt in to long polling by sending `waitTimeInSeconds` in the request body. The function then waits for the
+# result within the invocation, re-checking it with backoff, instead of answering 204 (No Content) right away.
+
+import json
+import time
+
+DEFAULT_MAX_WAIT_TIME_IN_SECONDS = 20
+INITIAL_RETRY_DELAY_IN_SECONDS = 0.25
+RETRY_DELAY_MULTIPLIER = 2
+MAX_RETRY_DELAY_IN_SECONDS = 2
+# Time kept to answer after the last check, so that the function does not time out while waiting
+MIN_REMAINING_TIME_IN_MILLIS = 2000
+
+
+def get_wait_time_in_seconds(event, max_wait_time_in_seconds):
+    """Returns the time the client asked to wait for a result, capped to the maximum, or 0 if it did not ask"""
+    request_body = event.get("body")
+    if not request_body:
+        return 0
+
+    try:
+        request_body_json = json.loads(request_body)
+        wait_time_in_seconds = float(request_body_json.get('waitTimeInSeconds', 0))
+    except (AttributeError, TypeError, ValueError):
+        print(f"Error parsing request body: {request_body}")
+        return 0
+
+    return max(0.0, min(wait_time_in_seconds, max_wait_time_in_seconds))
+
+
+def poll_until(poll, is_done, wait_time_in_seconds, context):
+    """
+    Calls `poll` until `is_done` accepts its result, or until the wait time or the function time runs out, sleeping
+     between calls with exponential backoff.
+    :return: the last result of `poll`
+    """
+    deadline = time.monotonic() + wait_time_in_seconds
+    retry_delay = INITIAL_RETRY_DELAY_IN_SECONDS
+    while True:
+        result = poll()
+        if is_done(result):
+            return result
+        remaining_time = deadline - time.monotonic()
+        if remaining_time > 0:
+            remaining_time = min(remaining_time,
+                                 (context.get_remaining_time_in_millis() - MIN_REMAINING_TIME_IN_MILLIS) / 1000)
+        if remaining_time <= 0:
+            return result
+        time.sleep(min(retry_delay, remaining_time))
+        retry_delay = min(retry_delay * RETRY_DELAY_MULTIPLIER, MAX_RETRY_DELAY_IN_SECONDS)
@@ -0,0 +1,59 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Placement policies order the viable game sessions a player can join, the first one being joined. Each policy sorts
+# the game sessions searched for with the matching SearchGameSessions sort expression, and re-sorts the candidate game
+# sessions of a container with its sort key as players join them.
+
+OLDEST_FIRST_POLICY_NAME = 'OldestFirst'
+FULLEST_FIRST_POLICY_NAME = 'FullestFirst'
+LEAST_LOADED_POLICY_NAME = 'LeastLoaded'
+
+
+class OldestFirstPlacementPolicy:
+    """Places players in the oldest viable game session, so that game sessions fill up in creation order"""
+
+    sort_expression = "creationTimeMillis ASC"
+
+    @staticmethod
+    def sort_key(game_session):
+        return game_session['CreationTime']
+
+
+class FullestFirstPlacementPolicy:
+    """
+    Places players in the viable game session with the fewest free player slots, oldest first. Game sessions that
+     players left are filled up again before emptier ones, so that players are packed into as few game sessions, and
+     server processes, as possible, and new game sessions are left free for groups of players.
+    """
+
+    sort_expression = "playerSessionCount DESC"
+
+    @staticmethod
+    def sort_key(game_session):
+        return (game_session['MaximumPlayerSessionCount'] - game_session['CurrentPlayerSessionCount'],
+                game_session['CreationTime'])
+
+
+class LeastLoadedPlacementPolicy:
+    """
+    Places players in the viable game session with the fewest players, oldest first, so that players are spread over
+     the game sessions, for games whose server load grows faster than the number of players.
+    """
+
+    sort_expression = "playerSessionCount ASC"
+
+    @staticmethod
+    def sort_key(game_session):
+        return (game_session['CurrentPlayerSessionCount'] / game_session['MaximumPlayerSessionCount'],
+                game_session['CreationTime'])
+
+
+def create_placement_policy(policy_name):
+    if policy_name == OLDEST_FIRST_POLICY_NAME:
+        return OldestFirstPlacementPolicy()
+    if policy_name == FULLEST_FIRST_POLICY_NAME:
+        return FullestFirstPlacementPolicy()
+    if policy_name == LEAST_LOADED_POLICY_NAME:
+        return LeastLoadedPlacementPolicy()
+    raise ValueError(f'Unknown placement policy: {policy_name}')
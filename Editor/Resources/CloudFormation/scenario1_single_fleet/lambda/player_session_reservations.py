@@ -0,0 +1,112 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Clients retry results requests, and may poll again after being answered, so a player session is only created for
+# a player after claiming the player's item in the GameSessionReservation table. The item then keeps the connection
+# information of the player session for as long as GameLift reserves it for the player, and repeated requests are
+# answered from it, so that each player takes a single player slot. The item is read before it is claimed, so that
+# requests answered from it, or made while another request holds the claim, cost a read rather than a failed write.
+# The game request of the player's next game clears it, so that the next game gets a player session of its own rather
+# than the one of the previous game.
+
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+import json
+
+# Fleet aliases never contain '#'
+PLAYER_SESSION_KEY_INFIX = '#PlayerSession#'
+# GameLift reserves a player slot for a minute, after which a player session the player did not connect to times out
+PLAYER_SESSION_RESERVATION_TIME_IN_SECONDS = 60
+# Longer than the results request function runs, so that the claim of a function that timed out expires on its own
+CLAIM_TIME_IN_SECONDS = 30
+
+
+def get_player_session_reservation(reservation_table, fleet_alias, player_id, now):
+    """
+    Returns the player's item, either the claim of another request or the connection information of the player
+     session reserved for the player in `ConnectionInfo`, or None if there is none
+    """
+    reservation = reservation_table.get_item(
+        Key={
+            'FleetAlias': to_player_session_key(fleet_alias, player_id)
+        }
+    ).get('Item')
+    # Expired items are deleted within days, not right away
+    if reservation is None or reservation['ExpirationTime'] <= now:
+        return None
+    return reservation
+
+
+def claim_player_session(reservation_table, fleet_alias, player_id, now):
+    """
+    Claims the creation of the player's player session, unless another request of the player claimed it, or the
+     player has a player session reserved since the player's item was read.
+    :return: the claim, or None if the player's item is in use
+    """
+    claim = {
+        'FleetAlias': to_player_session_key(fleet_alias, player_id),
+        'ExpirationTime': now + CLAIM_TIME_IN_SECONDS
+    }
+    try:
+        reservation_table.put_item(
+            Item=claim,
+            ConditionExpression=Attr('FleetAlias').not_exists() | Attr('ExpirationTime').lte(now)
+        )
+        return claim
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise e
+        return None
+
+
+def reserve_player_session(reservation_table, claim, connection_info, now):
+    """Keeps the connection information of the player session created under the claim, while GameLift reserves it"""
+    reservation_table.put_item(
+        Item={
+            'FleetAlias': claim['FleetAlias'],
+            'ConnectionInfo': json.dumps(connection_info),
+            'ExpirationTime': now + PLAYER_SESSION_RESERVATION_TIME_IN_SECONDS
+        }
+    )
+
+
+def clear_reserved_player_session(reservation_table, fleet_alias, player_id):
+    """Forgets the player session reserved for the previous game of the player, if any"""
+    try:
+        reservation_table.delete_item(
+            Key={
+                'FleetAlias': to_player_session_key(fleet_alias, player_id)
+            },
+            # A claim of a request creating the player session is left to expire, or to be released, on its own
+            Expected={
+                'ConnectionInfo': {
+                    'ComparisonOperator': 'NOT_NULL'
+                }
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise e
+
+
+def release_claim(reservation_table, claim):
+    """Releases a claim under which no player session was created, so that the next request of the player claims it"""
+    try:
+        reservation_table.delete_item(
+            Key={
+                'FleetAlias': claim['FleetAlias']
+            },
+            Expected={
+                'ExpirationTime': {
+                    'Value': claim['ExpirationTime'],
+                    'ComparisonOperator': 'EQ'
+                }
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise e
+
+
+def to_player_session_key(fleet_alias, player_id):
+    return f'{fleet_alias}{PLAYER_SESSION_KEY_INFIX}{player_id}'
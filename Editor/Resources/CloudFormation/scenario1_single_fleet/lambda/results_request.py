@@ -1,9 +1,22 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
-import boto3
-import os
+from botocore.exceptions import ClientError
 import json
+import time
+
+from aws_clients import get_client, get_environment_variable, get_table
+from fleet_locations import FleetLocations, get_player_latencies, get_region_to_latency_mapping
+from game_session_candidates import CandidateGameSessions
+from long_polling import DEFAULT_MAX_WAIT_TIME_IN_SECONDS, get_wait_time_in_seconds, poll_until
+from placement_policies import OLDEST_FIRST_POLICY_NAME, create_placement_policy
+from player_session_reservations import claim_player_session, get_player_session_reservation, release_claim, \
+    reserve_player_session
+
+# Viable game sessions found by the warm container, handed out to the players polling it
+candidate_game_sessions = CandidateGameSessions()
+# Locations of the fleet, kept by the warm container
+fleet_locations = FleetLocations()
 
 
 def handler(event, context):
@@ -12,61 +25,128 @@ def handler(event, context):
      This function will look up the MatchmakingRequest table to find a pending matchmaking request by
      the player, and if it is QUEUED, look up the GameSessionPlacement table to find the game's
      connection information.
-    :param event: lambda event, contains the region to player latency mapping in `regionToLatencyMapping` key, as well
-     as the player information from the Cognito id tokens.
-    :param context: lambda context, not used by this function
+
+    Viable game sessions are searched for once per container every few seconds, across all pages, and players are
+     placed in the first of them in the order of the `PlacementPolicy` (see `placement_policies`). If a game session
+     filled up since it was found, the player is placed in the next one, without searching again (see
+     `CandidateGameSessions`).
+
+    The locations of the fleet are ranked by the latencies the player sent with this request, or else with the game
+     request, and the player is placed in the first location with a viable game session. Locations with idle server
+     processes are not fallen back from, as the game session provisioning function creates game sessions for the
+     player there (see `fleet_locations`).
+
+    A player session is only created after claiming the player's item in the GameSessionReservation table, which then
+     keeps its connection information while GameLift reserves the player slot. Requests the player repeats meanwhile,
+     such as client retries, are answered from it without calling GameLift, and requests made while another request
+     of the player holds the claim are answered 204 (No Content) (see `player_session_reservations`). Requests
+     throttled by the table are answered 204 (No Content) too, so that the client polls again.
+
+    Clients can opt in to long polling by sending `waitTimeInSeconds` in the request body, up to
+     `MaxWaitTimeInSeconds`. While there is no viable game session, the function then checks again with backoff
+     until one is found or the wait time runs out, and answers 204 (No Content) only then.
+
+    :param event: lambda event, contains the region to player latency mapping in `regionToLatencyMapping` key, and the
+     optional wait time in `waitTimeInSeconds` key, as well as the player information from the Cognito id tokens.
+    :param context: lambda context, used to stop waiting before the function times out
     :return:
-     - 200 (OK) if the game connection is ready, along with server info: "IpAddress", "Port", "DnsName"
+     - 200 (OK) if the game connection is ready, along with server info: "IpAddress", "Port", "DnsName", the same on
+       repeated requests until the player session reservation expires
      - 204 (No Content) if the requested game is still in progress of matchmaking
      - 404 (Not Found) if no game has been started by the player, or if all started game were expired
      - 500 (Internal Error) if errors occurred during matchmaking or placement
     """
 
-    gamelift = boto3.client('gamelift')
-    fleet_alias = os.environ['FleetAlias']
+    gamelift = get_client('gamelift')
+    fleet_alias = get_environment_variable('FleetAlias')
+    placement_policy = create_placement_policy(get_environment_variable('PlacementPolicy', OLDEST_FIRST_POLICY_NAME))
+    game_session_reservation_table_name = get_environment_variable('GameSessionReservationTableName')
+    game_session_reservation_table = get_table(game_session_reservation_table_name)
 
     player_id = event["requestContext"]["authorizer"]["claims"]["sub"]
     print(f'Handling request result request. PlayerId: {player_id}')
 
-    oldest_viable_game_session = get_oldest_viable_game_session(gamelift, fleet_alias)
-    if oldest_viable_game_session:
-        player_session = create_player_session(gamelift, oldest_viable_game_session['GameSessionId'], player_id)
+    try:
+        reservation = get_player_session_reservation(game_session_reservation_table, fleet_alias, player_id,
+                                                     round(time.time()))
+        if reservation is not None and 'ConnectionInfo' in reservation:
+            game_session_connection_info = json.loads(reservation['ConnectionInfo'])
+            print(f"Reserved Connection Info: {game_session_connection_info}")
+            return to_connection_info_response(game_session_connection_info)
+        claim = None
+        if reservation is None:
+            claim = claim_player_session(game_session_reservation_table, fleet_alias, player_id, round(time.time()))
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ProvisionedThroughputExceededException':
+            raise e
+        print(f"Player session reservation is throttled. PlayerId: {player_id}")
+        return to_no_content_response()
+    if claim is None:
+        print(f"Player session is being created by another request. PlayerId: {player_id}")
+        return to_no_content_response()
+
+    max_wait_time = float(get_environment_variable('MaxWaitTimeInSeconds', DEFAULT_MAX_WAIT_TIME_IN_SECONDS))
+    wait_time = get_wait_time_in_seconds(event, max_wait_time)
+    try:
+        region_to_latency_mapping = get_region_to_latency_mapping(event)
+        if region_to_latency_mapping is None and fleet_locations.count_locations(gamelift, fleet_alias) > 1:
+            region_to_latency_mapping = get_player_latencies(game_session_reservation_table, fleet_alias, player_id,
+                                                             round(time.time()))
+        locations = fleet_locations.rank(gamelift, fleet_alias, region_to_latency_mapping)
+        print(f"Ranked fleet locations: {locations}")
+
+        player_session = poll_until(
+            lambda: create_player_session(gamelift, fleet_alias, player_id, placement_policy, locations),
+            lambda created_player_session: created_player_session is not None,
+            wait_time,
+            context
+        )
+    except Exception as ex:
+        release_claim(game_session_reservation_table, claim)
+        raise ex
 
+    if player_session:
         game_session_connection_info = dict((k, player_session[k]) for k in ('IpAddress', 'Port', 'DnsName', 'PlayerSessionId'))
         game_session_connection_info['GameSessionArn'] = player_session['GameSessionId']
         print(f"Connection Info: {game_session_connection_info}")
-
-        return {
-            'body': json.dumps(game_session_connection_info),
-            'headers': {
-                'Content-Type': 'text/plain'
-            },
-            'statusCode': 200
-        }
+        reserve_player_session(game_session_reservation_table, claim, game_session_connection_info,
+                               round(time.time()))
+        return to_connection_info_response(game_session_connection_info)
     else:
-        return {
-            'headers': {
-                'Content-Type': 'text/plain'
-            },
-            'statusCode': 204
-        }
-
-
-def get_oldest_viable_game_session(gamelift, fleet_alias):
-    print("Checking for viable game sessions:", fleet_alias)
-    search_game_sessions_response = gamelift.search_game_sessions(
-        AliasId=fleet_alias,
-        FilterExpression="hasAvailablePlayerSessions=true",
-        SortExpression="creationTimeMillis ASC",
-    )
-    print(f"Received search game session response: {search_game_sessions_response}")
-    return next(iter(search_game_sessions_response['GameSessions']), None)
-
-def create_player_session(gamelift, game_session_id, player_id):
-    print(f"Creating PlayerSession session on GameSession: {game_session_id}, PlayerId: {player_id}")
-    create_player_session_response = gamelift.create_player_session(
-        GameSessionId=game_session_id,
-        PlayerId=player_id
-    )
-    print(f"Received create player session response: {create_player_session_response}")
-    return create_player_session_response['PlayerSession']
+        release_claim(game_session_reservation_table, claim)
+        return to_no_content_response()
+
+
+def create_player_session(gamelift, fleet_alias, player_id, placement_policy, locations):
+    """
+    Creates a player session in the first of the locations with a viable game session, stopping at the first location
+     with idle server processes.
+    :return: the player session, or None if there is no viable game session in the locations searched
+    """
+    for location in locations:
+        player_session = candidate_game_sessions.create_player_session(gamelift, fleet_alias, player_id,
+                                                                       placement_policy, location)
+        if player_session is not None or location == locations[-1]:
+            return player_session
+        if fleet_locations.has_idle_server_processes(gamelift, fleet_alias, location):
+            print(f"Waiting for game sessions in location: {location}")
+            return None
+
+
+def to_connection_info_response(game_session_connection_info):
+    return {
+        'body': json.dumps(game_session_connection_info),
+        'headers': {
+            'Content-Type': 'text/plain'
+        },
+        'statusCode': 200
+    }
+
+
+def to_no_content_response():
+    return {
+        'headers': {
+            'Content-Type': 'text/plain'
+        },
+        'statusCode': 204
+    }
@@ -0,0 +1,159 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario1_single_fleet/tests/benchmark_candidate_game_sessions.py`
+#
+# Replays players starting games at a steady rate, with the game session warm pool running, against the results request
+# lambda function served by several warm containers, with local GameLift, DynamoDB and SQS stand-ins and a simulated
+# clock. It compares searching for game sessions on every request and joining the first one found, with the candidate
+# game sessions cached per container, and reports the GameLift calls of the results requests and failed requests per
+# connected player. Each player's polls are handled by a random container.
+
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from fleet_aliases import FleetAliases
+from fleet_locations import FleetLocations
+from game_session_candidates import CandidateGameSessions
+from local_aws import LOCAL_HOME_REGION, LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalSqs, LocalTable
+from simulate_warm_pool import poisson, provision_game_sessions, reset_game_session_provisioning
+import aws_clients
+import game_request
+import game_session_candidates
+import fleet_locations
+import game_session_warm_pool
+import results_request
+
+TABLE_NAME = 'BenchmarkGameSessionReservationTable'
+QUEUE_URL = 'https://sqs.us-west-2.amazonaws.com/000000000000/BenchmarkGameSessionProvisioningQueue'
+FLEET_ALIAS = 'alias-00000000-0000-0000-0000-000000000000'
+DURATION_IN_SECONDS = 20 * 60  # 20 minutes
+# The warm pool forecasts arrivals from the last minutes, requests are measured once it caught up
+WARM_UP_IN_SECONDS = 5 * 60  # 5 minutes
+ARRIVALS_PER_SECOND = 3
+MAX_PLAYERS_PER_GAME = 10
+GAME_SESSION_ACTIVATION_TIME_IN_SECONDS = 30
+CONTAINER_COUNTS = [1, 10]
+
+
+class FirstResultGameSessions:
+    """Searches for viable game sessions on every request, and joins the first one found"""
+    def create_player_session(self, gamelift, fleet_alias, player_id, placement_policy=None, location=None):
+        search_game_sessions_response = gamelift.search_game_sessions(
+            AliasId=fleet_alias,
+            FilterExpression="hasAvailablePlayerSessions=true",
+            SortExpression="creationTimeMillis ASC",
+            Location=location,
+        )
+        game_session = next(iter(search_game_sessions_response['GameSessions']), None)
+        if game_session is None:
+            return None
+        return gamelift.create_player_session(
+            GameSessionId=game_session['GameSessionId'],
+            PlayerId=player_id
+        )['PlayerSession']
+
+
+def main():
+    os.environ['AWS_REGION'] = LOCAL_HOME_REGION
+    os.environ['FleetAlias'] = FLEET_ALIAS
+    os.environ['GameSessionProvisioningQueueUrl'] = QUEUE_URL
+    os.environ['GameSessionReservationTableName'] = TABLE_NAME
+    os.environ['MaxConcurrency'] = '1'
+    os.environ['MaxPlayersPerGame'] = str(MAX_PLAYERS_PER_GAME)
+    os.environ['ReservationLeaseInSeconds'] = str(GAME_SESSION_ACTIVATION_TIME_IN_SECONDS)
+
+    print(f"{ARRIVALS_PER_SECOND} players/s for {DURATION_IN_SECONDS}s, polling every second, measured after "
+          f"{WARM_UP_IN_SECONDS}s")
+    print(f"{'Containers':>10} | {'Game sessions':>13} | {'Connected':>9} | {'Searches/player':>15} | "
+          f"{'Joins/player':>12} | {'Aliases/player':>14} | {'Failed requests':>15} | {'Mean wait (s)':>13}")
+    for container_count in CONTAINER_COUNTS:
+        for name, create_game_sessions in [('first result', lambda aliases: FirstResultGameSessions()),
+                                           ('cached', lambda aliases: CandidateGameSessions(aliases=aliases))]:
+            random.seed(0)
+            clock = SimpleNamespace(now=0)
+            gamelift = LocalGameLift(game_session_activation_time_in_seconds=GAME_SESSION_ACTIVATION_TIME_IN_SECONDS,
+                                     clock=lambda: clock.now)
+            table = LocalTable(TABLE_NAME, 'FleetAlias')
+            sqs = LocalSqs()
+            aws_clients.reset()
+            aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])},
+                                           clients={'gamelift': gamelift, 'sqs': sqs})
+            game_request.time = SimpleNamespace(time=lambda: clock.now)
+            reset_game_session_provisioning(clock)
+            game_session_warm_pool.time = SimpleNamespace(time=lambda: clock.now)
+            game_session_warm_pool.fleet_aliases = FleetAliases()
+            game_session_candidates.time = SimpleNamespace(monotonic=lambda: clock.now)
+            fleet_locations.time = SimpleNamespace(monotonic=lambda: clock.now)
+            results_request.time = SimpleNamespace(time=lambda: clock.now)
+            containers = []
+            for _ in range(container_count):
+                aliases = FleetAliases()
+                containers.append((create_game_sessions(aliases), FleetLocations(aliases=aliases)))
+
+            pending_players = []
+            wait_times = []
+            failed_request_count = 0
+            player_count = 0
+            # GameLift calls of the results requests alone, the provisioning and warm pool functions call it as well
+            results_request_counts = {}
+            start_time = 1_700_000_000
+            with contextlib.redirect_stdout(io.StringIO()):
+                for now in range(start_time, start_time + DURATION_IN_SECONDS):
+                    clock.now = now
+                    if now == start_time + WARM_UP_IN_SECONDS:
+                        gamelift.request_counts.clear()
+                        failed_request_count = 0
+                        player_count = 0
+                        results_request_counts.clear()
+                        wait_times = []
+                    if now % game_session_warm_pool.SCHEDULE_INTERVAL_IN_SECONDS == 0:
+                        game_session_warm_pool.handler({}, None)
+
+                    for _ in range(poisson(ARRIVALS_PER_SECOND)):
+                        player_count += 1
+                        event = {'requestContext': {'authorizer': {'claims': {'sub': f'player-{now}-{player_count}'}}}}
+                        game_request.handler(event, None)
+                        pending_players.append((event, now))
+                    provision_game_sessions(sqs, QUEUE_URL)
+
+                    request_counts = dict(gamelift.request_counts)
+                    still_pending_players = []
+                    for event, player_start_time in pending_players:
+                        (results_request.candidate_game_sessions,
+                         results_request.fleet_locations) = random.choice(containers)
+                        try:
+                            response = results_request.handler(event, None)
+                        except Exception:
+                            # The player polls again after a 500 (Internal Error)
+                            failed_request_count += 1
+                            response = {'statusCode': 500}
+                        if response['statusCode'] == 200:
+                            wait_times.append(now - player_start_time)
+                        else:
+                            still_pending_players.append((event, player_start_time))
+                    pending_players = still_pending_players
+                    for operation, count in gamelift.request_counts.items():
+                        results_request_counts[operation] = results_request_counts.get(operation, 0) + (
+                            count - request_counts.get(operation, 0))
+
+            search_count = results_request_counts.get('SearchGameSessions', 0)
+            alias_count = results_request_counts.get('DescribeAlias', 0)
+            connected_count = len(wait_times)
+            print(f"{container_count:>10} | {name:>13} | {connected_count:>9} | "
+                  f"{search_count / connected_count:>15.2f} | "
+                  f"{results_request_counts.get('CreatePlayerSession', 0) / connected_count:>12.2f} | "
+                  f"{alias_count / connected_count:>14.4f} | {failed_request_count:>15} | "
+                  f"{statistics.mean(wait_times):>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
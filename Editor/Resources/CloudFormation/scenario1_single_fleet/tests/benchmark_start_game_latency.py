@@ -0,0 +1,137 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario1_single_fleet/tests/benchmark_start_game_latency.py`
+#
+# Starts players at a steady rate against an empty fleet, each in its own thread calling the game request lambda
+# function and then polling the results request lambda function until it gets a player session, against a slow local
+# GameLift stand-in and local DynamoDB and SQS stand-ins. It compares provisioning the game sessions of the player
+# within the game request, as it was done before the GameSessionProvisioning queue, with queueing the game request for
+# the game session provisioning function, and reports the latency of the game requests and the time players take to
+# connect to a game session.
+
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LOCAL_HOME_REGION, LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalSqs, LocalTable
+from simulate_game_session_creation import QUEUE_URL, GameSessionProvisioning
+import aws_clients
+import game_request
+import game_session_provisioning
+import results_request
+
+TABLE_NAME = 'BenchmarkGameSessionReservationTable'
+FLEET_ALIAS = 'alias-00000000-0000-0000-0000-000000000000'
+PLAYER_COUNT = 200
+ARRIVALS_PER_SECOND = 50
+MAX_PLAYERS_PER_GAME = 10
+GAMELIFT_LATENCY_IN_SECONDS = 0.1
+DYNAMODB_LATENCY_IN_SECONDS = 0.005
+SQS_LATENCY_IN_SECONDS = 0.01
+GAME_SESSION_ACTIVATION_TIME_IN_SECONDS = 5
+POLL_INTERVAL_IN_SECONDS = 0.05
+# Game sessions were created without pacing within the game request
+UNPACED_GAME_SESSION_CREATIONS_PER_SECOND = 1000
+
+
+def main():
+    os.environ['AWS_REGION'] = LOCAL_HOME_REGION
+    os.environ['FleetAlias'] = FLEET_ALIAS
+    os.environ['GameSessionProvisioningQueueUrl'] = QUEUE_URL
+    os.environ['GameSessionReservationTableName'] = TABLE_NAME
+    os.environ['MaxConcurrency'] = '1'
+    os.environ['MaxPlayersPerGame'] = str(MAX_PLAYERS_PER_GAME)
+    os.environ['ReservationLeaseInSeconds'] = '60'
+    # Players poll containers of their own, which search for game sessions on every request
+    results_request.candidate_game_sessions.ttl_in_seconds = 0
+
+    print(f"{PLAYER_COUNT} players at {ARRIVALS_PER_SECOND} players/s, GameLift latency: "
+          f"{GAMELIFT_LATENCY_IN_SECONDS}s, game session activation: {GAME_SESSION_ACTIVATION_TIME_IN_SECONDS}s")
+    print(f"{'Game request':>12} | {'p50 latency (ms)':>16} | {'p99 latency (ms)':>16} | {'Max latency (ms)':>16} | "
+          f"{'Mean connect (s)':>16} | {'p95 connect (s)':>15} | {'Sessions':>8}")
+    for name, start_game, creations_per_second in [
+            ('synchronous', start_game_synchronously, UNPACED_GAME_SESSION_CREATIONS_PER_SECOND),
+            ('queued', start_game_queued, game_session_provisioning.DEFAULT_MAX_GAME_SESSION_CREATIONS_PER_SECOND)]:
+        os.environ['MaxGameSessionCreationsPerSecond'] = str(creations_per_second)
+        gamelift = LocalGameLift(GAMELIFT_LATENCY_IN_SECONDS, GAME_SESSION_ACTIVATION_TIME_IN_SECONDS)
+        table = LocalTable(TABLE_NAME, 'FleetAlias', latency_in_seconds=DYNAMODB_LATENCY_IN_SECONDS)
+        sqs = LocalSqs(SQS_LATENCY_IN_SECONDS)
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])},
+                                       clients={'gamelift': gamelift, 'sqs': sqs})
+
+        start_time = time.time() + 0.1
+        players = [Player(f'player-{i}', start_game, start_time + i / ARRIVALS_PER_SECOND)
+                   for i in range(PLAYER_COUNT)]
+        provisioning = GameSessionProvisioning(sqs) if start_game is start_game_queued else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            if provisioning:
+                provisioning.start()
+            for player in players:
+                player.start()
+            for player in players:
+                player.join()
+            if provisioning:
+                provisioning.stop()
+
+        latencies = sorted(player.game_request_latency * 1000 for player in players)
+        connect_times = sorted(player.connect_time for player in players)
+        print(f"{name:>12} | {latencies[len(latencies) // 2]:>16.1f} | "
+              f"{latencies[int(len(latencies) * 0.99)]:>16.1f} | {latencies[-1]:>16.1f} | "
+              f"{statistics.mean(connect_times):>16.2f} | "
+              f"{connect_times[int(len(connect_times) * 0.95)]:>15.2f} | {len(gamelift.game_sessions):>8}")
+
+
+def start_game_synchronously(event):
+    """Handles the game request, then provisions its game sessions before answering, as a single invocation did"""
+    assert game_request.handler(event, None)['statusCode'] == 202
+    # The message the game request queued is left in the queue, which nothing consumes
+    player_id = event['requestContext']['authorizer']['claims']['sub']
+    record = {'messageId': player_id, 'body': json.dumps({'PlayerId': player_id}),
+              'attributes': {'ApproximateReceiveCount': '1'}}
+    game_session_provisioning.handler({'Records': [record]}, None)
+
+
+def start_game_queued(event):
+    assert game_request.handler(event, None)['statusCode'] == 202
+
+
+class Player(threading.Thread):
+    """Game client starting a game at `start_time`, then short polling for its game session connection"""
+
+    def __init__(self, player_id, start_game, start_time):
+        super().__init__()
+        self.event = {'requestContext': {'authorizer': {'claims': {'sub': player_id}}}}
+        self.start_game = start_game
+        self.start_time = start_time
+        self.game_request_latency = None
+        self.connect_time = None
+
+    def run(self):
+        time.sleep(max(0.0, self.start_time - time.time()))
+        started = time.time()
+        self.start_game(self.event)
+        self.game_request_latency = time.time() - started
+        while True:
+            try:
+                response = results_request.handler(self.event, None)
+            except Exception:
+                # Players racing for the last slot of a game session get a 500 (Internal Error), and poll again
+                response = {'statusCode': 500}
+            if response['statusCode'] == 200:
+                self.connect_time = time.time() - started
+                return
+            time.sleep(POLL_INTERVAL_IN_SECONDS)
+
+
+if __name__ == '__main__':
+    main()
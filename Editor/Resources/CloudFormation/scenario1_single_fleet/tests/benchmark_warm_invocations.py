@@ -0,0 +1,63 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario1_single_fleet/tests/benchmark_warm_invocations.py`
+#
+# Measures the per-invocation latency of the results request lambda function, which game clients poll continuously,
+# when every invocation builds its AWS clients, and when warm invocations reuse the clients built by the first one.
+# Real boto3 clients are used, with their HTTP requests answered locally, so the latency excludes the network.
+
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LocalHttpEndpoint
+import aws_clients
+import results_request
+
+INVOCATION_COUNT = 200
+EVENT = {'requestContext': {'authorizer': {'claims': {'sub': 'player-1'}}}}
+
+
+def main():
+    os.environ['AWS_REGION'] = 'us-west-2'
+    os.environ['FleetAlias'] = 'alias-00000000-0000-0000-0000-000000000000'
+    os.environ['GameSessionReservationTableName'] = 'BenchmarkGameSessionReservationTable'
+    LocalHttpEndpoint({
+        'DeleteItem': {},
+        'DescribeAlias': {'Alias': {'RoutingStrategy': {'Type': 'SIMPLE', 'FleetId': 'fleet-1'}}},
+        'DescribeFleetLocationAttributes': {'FleetId': 'fleet-1', 'LocationAttributes': []},
+        'GetItem': {},
+        'PutItem': {},
+        'SearchGameSessions': {'GameSessions': []}
+    }).attach(aws_clients.boto3)
+    # Every invocation searches, as when the candidate game sessions of the container expired
+    results_request.candidate_game_sessions.ttl_in_seconds = 0
+
+    print(f"{INVOCATION_COUNT} invocations of results_request")
+    print(f"{'Clients':>16} | {'Mean (ms)':>10} | {'p50 (ms)':>10} | {'p99 (ms)':>10}")
+    for name, reuse_clients in [('per invocation', False), ('per container', True)]:
+        aws_clients.reset()
+        latencies = []
+        for _ in range(INVOCATION_COUNT):
+            if not reuse_clients:
+                aws_clients.reset()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = results_request.handler(EVENT, None)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response['statusCode'] == 204
+        # The first invocation builds the clients in both cases
+        latencies = latencies[1:]
+        print(f"{name:>16} | {statistics.mean(latencies):>10.2f} | {statistics.median(latencies):>10.2f} | "
+              f"{sorted(latencies)[int(len(latencies) * 0.99)]:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario1_single_fleet/tests/simulate_fleet_locations.py`
+#
+# Replays players from three regions starting games and leaving them, against the game request, game session
+# provisioning and results request lambda functions, with a fleet deployed to three locations, local GameLift, DynamoDB
+# and SQS stand-ins, and a simulated clock. Clients send the latencies they measured to each location with the game
+# request only. The location closest to european players is kept small, so that some of them fall back to the next
+# closest location. It compares clients sending no latencies, with ranking the locations by latency, and reports the
+# latency of players to the location of their game session, the players placed in their closest location, and the time
+# they wait for a connection.
+
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import statistics
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from fleet_locations import FleetLocations
+from game_session_candidates import CandidateGameSessions
+from local_aws import LOCAL_HOME_REGION, LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalSqs, LocalTable
+from simulate_warm_pool import poisson, provision_game_sessions, reset_game_session_provisioning
+import aws_clients
+import fleet_locations
+import game_request
+import game_session_candidates
+import results_request
+
+TABLE_NAME = 'SimulationGameSessionReservationTable'
+QUEUE_URL = 'https://sqs.us-west-2.amazonaws.com/000000000000/SimulationGameSessionProvisioningQueue'
+FLEET_ALIAS = 'alias-00000000-0000-0000-0000-000000000000'
+DURATION_IN_SECONDS = 60 * 60  # 1 hour
+ARRIVALS_PER_SECOND = 1
+MAX_PLAYERS_PER_GAME = 10
+GAME_SESSION_ACTIVATION_TIME_IN_SECONDS = 30
+MEDIAN_PLAY_TIME_IN_SECONDS = 10 * 60  # 10 minutes
+# Server processes of the home region, and of the remote locations of the fleet
+HOME_REGION_SERVER_PROCESS_COUNT = 200
+REMOTE_LOCATION_SERVER_PROCESS_COUNTS = {'us-east-1': 100, 'eu-west-1': 15}
+# Share of the players, and latency in milliseconds they measure to each location, per region they play from
+PLAYER_REGIONS = [
+    (0.4, {'us-west-2': 30, 'us-east-1': 80, 'eu-west-1': 150}),
+    (0.3, {'us-west-2': 70, 'us-east-1': 20, 'eu-west-1': 90}),
+    (0.3, {'us-west-2': 150, 'us-east-1': 90, 'eu-west-1': 25})
+]
+
+
+def main():
+    os.environ['AWS_REGION'] = LOCAL_HOME_REGION
+    os.environ['FleetAlias'] = FLEET_ALIAS
+    os.environ['GameSessionProvisioningQueueUrl'] = QUEUE_URL
+    os.environ['GameSessionReservationTableName'] = TABLE_NAME
+    os.environ['MaxConcurrency'] = '1'
+    os.environ['MaxPlayersPerGame'] = str(MAX_PLAYERS_PER_GAME)
+    os.environ['ReservationLeaseInSeconds'] = str(GAME_SESSION_ACTIVATION_TIME_IN_SECONDS)
+
+    print(f"{ARRIVALS_PER_SECOND} players/s for {DURATION_IN_SECONDS}s, server processes: "
+          f"{dict({LOCAL_HOME_REGION: HOME_REGION_SERVER_PROCESS_COUNT}, **REMOTE_LOCATION_SERVER_PROCESS_COUNTS)}")
+    print(f"{'Latencies':>10} | {'Connected':>9} | {'Mean latency (ms)':>17} | {'p95 latency (ms)':>16} | "
+          f"{'Closest location':>16} | {'Mean wait (s)':>13} | {'p95 wait (s)':>12} | Game sessions per location")
+    for name, send_latencies in [('not sent', False), ('ranked', True)]:
+        random.seed(0)
+        clock = SimpleNamespace(now=0)
+        gamelift = LocalGameLift(game_session_activation_time_in_seconds=GAME_SESSION_ACTIVATION_TIME_IN_SECONDS,
+                                 server_process_count=HOME_REGION_SERVER_PROCESS_COUNT, clock=lambda: clock.now,
+                                 locations=REMOTE_LOCATION_SERVER_PROCESS_COUNTS)
+        table = LocalTable(TABLE_NAME, 'FleetAlias')
+        sqs = LocalSqs()
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])},
+                                       clients={'gamelift': gamelift, 'sqs': sqs})
+        game_request.time = SimpleNamespace(time=lambda: clock.now)
+        reset_game_session_provisioning(clock)
+        results_request.time = SimpleNamespace(time=lambda: clock.now)
+        game_session_candidates.time = SimpleNamespace(monotonic=lambda: clock.now)
+        fleet_locations.time = SimpleNamespace(monotonic=lambda: clock.now)
+        results_request.fleet_locations = FleetLocations()
+        results_request.candidate_game_sessions = CandidateGameSessions()
+
+        departures = {}
+        pending_players = []
+        wait_times = []
+        latencies = []
+        closest_location_count = 0
+        player_count = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            for elapsed_time in range(DURATION_IN_SECONDS):
+                clock.now = 1_700_000_000 + elapsed_time
+                for game_session_id in departures.pop(elapsed_time, []):
+                    gamelift.remove_player_session(game_session_id)
+
+                for _ in range(poisson(ARRIVALS_PER_SECOND)):
+                    player_count += 1
+                    region_to_latency_mapping = choose_player_region()
+                    event = {'requestContext': {'authorizer': {'claims': {'sub': f'player-{player_count}'}}}}
+                    if send_latencies:
+                        game_request_event = dict(event, body=json.dumps(
+                            {'regionToLatencyMapping': region_to_latency_mapping}))
+                    else:
+                        game_request_event = event
+                    game_request.handler(game_request_event, None)
+                    pending_players.append((event, elapsed_time, region_to_latency_mapping))
+                provision_game_sessions(sqs, QUEUE_URL)
+
+                still_pending_players = []
+                for event, arrival_time, region_to_latency_mapping in pending_players:
+                    response = results_request.handler(event, None)
+                    if response['statusCode'] != 200:
+                        still_pending_players.append((event, arrival_time, region_to_latency_mapping))
+                        continue
+                    wait_times.append(elapsed_time - arrival_time)
+                    game_session_id = json.loads(response['body'])['GameSessionArn']
+                    location = gamelift.game_sessions[game_session_id]['Location']
+                    latencies.append(region_to_latency_mapping[location])
+                    if location == min(region_to_latency_mapping, key=region_to_latency_mapping.get):
+                        closest_location_count += 1
+                    play_time = max(1, round(random.lognormvariate(math.log(MEDIAN_PLAY_TIME_IN_SECONDS), 0.5)))
+                    departures.setdefault(elapsed_time + play_time, []).append(game_session_id)
+                pending_players = still_pending_players
+
+        location_counts = {}
+        for game_session in gamelift.game_sessions.values():
+            location_counts[game_session['Location']] = location_counts.get(game_session['Location'], 0) + 1
+        latencies.sort()
+        wait_times.sort()
+        print(f"{name:>10} | {len(latencies):>9} | {statistics.mean(latencies):>17.1f} | "
+              f"{latencies[int(len(latencies) * 0.95)]:>16} | {closest_location_count / len(latencies):>16.1%} | "
+              f"{statistics.mean(wait_times):>13.2f} | {wait_times[int(len(wait_times) * 0.95)]:>12} | "
+              f"{location_counts}")
+
+
+def choose_player_region():
+    threshold = random.random()
+    for share, region_to_latency_mapping in PLAYER_REGIONS:
+        threshold -= share
+        if threshold < 0:
+            return region_to_latency_mapping
+    return PLAYER_REGIONS[-1][1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario1_single_fleet/tests/simulate_game_session_creation.py`
+#
+# Starts a burst of players together against an empty fleet, each in its own thread calling the game request lambda
+# function and then polling the results request lambda function until it gets a player session, against local
+# GameLift, DynamoDB and SQS stand-ins. It compares creating a game session for every player finding no viable one,
+# with the game session provisioning function creating the game sessions reserved in the shared lease for the batches
+# of queued game requests, and reports the game sessions created and how full they are.
+
+import contextlib
+import io
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LOCAL_HOME_REGION, LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalSqs, LocalTable
+from simulate_warm_pool import PROVISIONING_BATCH_SIZE
+import aws_clients
+import game_request
+import game_session_provisioning
+import results_request
+
+TABLE_NAME = 'SimulationGameSessionReservationTable'
+QUEUE_URL = 'https://sqs.us-west-2.amazonaws.com/000000000000/SimulationGameSessionProvisioningQueue'
+FLEET_ALIAS = 'alias-00000000-0000-0000-0000-000000000000'
+PLAYER_COUNTS = [20, 200]
+MAX_PLAYERS_PER_GAME = 10
+# Players start their game within this time of each other
+BURST_DURATION_IN_SECONDS = 0.2
+GAMELIFT_LATENCY_IN_SECONDS = 0.02
+DYNAMODB_LATENCY_IN_SECONDS = 0.005
+GAME_SESSION_ACTIVATION_TIME_IN_SECONDS = 0.5
+POLL_INTERVAL_IN_SECONDS = 0.05
+PROVISIONING_BATCHING_WINDOW_IN_SECONDS = 0.05
+
+
+def main():
+    os.environ['AWS_REGION'] = LOCAL_HOME_REGION
+    os.environ['FleetAlias'] = FLEET_ALIAS
+    os.environ['GameSessionProvisioningQueueUrl'] = QUEUE_URL
+    os.environ['GameSessionReservationTableName'] = TABLE_NAME
+    os.environ['MaxConcurrency'] = '1'
+    os.environ['MaxPlayersPerGame'] = str(MAX_PLAYERS_PER_GAME)
+    os.environ['ReservationLeaseInSeconds'] = '60'
+    # Players poll containers of their own, which search for game sessions on every request
+    results_request.candidate_game_sessions.ttl_in_seconds = 0
+
+    print(f"Max players per game: {MAX_PLAYERS_PER_GAME}, game session activation: "
+          f"{GAME_SESSION_ACTIVATION_TIME_IN_SECONDS}s")
+    print(f"{'Players':>7} | {'Creation':>11} | {'Sessions':>8} | {'Needed':>6} | {'Players/session':>15} | "
+          f"{'Empty':>5} | {'Retries':>7} | {'Mean connect (s)':>16}")
+    for player_count in PLAYER_COUNTS:
+        for name, start_game in [('per player', start_game_per_player), ('queued', start_game_queued)]:
+            gamelift = LocalGameLift(GAMELIFT_LATENCY_IN_SECONDS, GAME_SESSION_ACTIVATION_TIME_IN_SECONDS)
+            table = LocalTable(TABLE_NAME, 'FleetAlias', latency_in_seconds=DYNAMODB_LATENCY_IN_SECONDS)
+            sqs = LocalSqs()
+            aws_clients.reset()
+            aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])},
+                                           clients={'gamelift': gamelift, 'sqs': sqs})
+
+            burst_start_time = time.time() + 0.1
+            players = [Player(f'player-{i}', start_game,
+                              burst_start_time + i * BURST_DURATION_IN_SECONDS / player_count)
+                       for i in range(player_count)]
+            provisioning = GameSessionProvisioning(sqs)
+            with contextlib.redirect_stdout(io.StringIO()):
+                provisioning.start()
+                for player in players:
+                    player.start()
+                for player in players:
+                    player.join()
+                provisioning.stop()
+
+            assert all(player.connect_time is not None for player in players)
+            player_counts = [game_session['CurrentPlayerSessionCount']
+                             for game_session in gamelift.game_sessions.values()]
+            print(f"{player_count:>7} | {name:>11} | {len(player_counts):>8} | "
+                  f"{math.ceil(player_count / MAX_PLAYERS_PER_GAME):>6} | "
+                  f"{statistics.mean(player_counts):>15.1f} | {player_counts.count(0):>5} | "
+                  f"{sum(player.retry_count for player in players):>7} | "
+                  f"{statistics.mean(player.connect_time for player in players):>16.2f}")
+
+
+def start_game_per_player(event):
+    gamelift = aws_clients.get_client('gamelift')
+    search_game_sessions_response = gamelift.search_game_sessions(
+        AliasId=FLEET_ALIAS,
+        FilterExpression="hasAvailablePlayerSessions=true",
+        Location=LOCAL_HOME_REGION,
+    )
+    if not search_game_sessions_response['GameSessions']:
+        game_session_provisioning.create_game_session(gamelift, FLEET_ALIAS, MAX_PLAYERS_PER_GAME)
+
+
+def start_game_queued(event):
+    assert game_request.handler(event, None)['statusCode'] == 202
+
+
+class GameSessionProvisioning(threading.Thread):
+    """Event source mapping handing the queued game requests to the game session provisioning function, in batches"""
+
+    def __init__(self, sqs):
+        super().__init__()
+        self.sqs = sqs
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            event = self.sqs.receive_event(QUEUE_URL, BatchSize=PROVISIONING_BATCH_SIZE,
+                                           MaximumBatchingWindowInSeconds=PROVISIONING_BATCHING_WINDOW_IN_SECONDS,
+                                           WaitTimeInSeconds=POLL_INTERVAL_IN_SECONDS)
+            if event['Records']:
+                game_session_provisioning.handler(event, None)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class Player(threading.Thread):
+    """
+    Game client starting a game at `start_time`, then short polling for its game session connection
+    :param start_game: function handling the game request event
+    """
+
+    def __init__(self, player_id, start_game, start_time):
+        super().__init__()
+        self.event = {'requestContext': {'authorizer': {'claims': {'sub': player_id}}}}
+        self.start_game = start_game
+        self.start_time = start_time
+        self.connect_time = None
+        self.retry_count = 0
+
+    def run(self):
+        time.sleep(max(0.0, self.start_time - time.time()))
+        started = time.time()
+        self.start_game(self.event)
+        while True:
+            try:
+                response = results_request.handler(self.event, None)
+            except Exception:
+                # Players racing for the last slot of a game session get a 500 (Internal Error), and poll again
+                self.retry_count += 1
+                response = {'statusCode': 500}
+            if response['statusCode'] == 200:
+                self.connect_time = time.time() - started
+                return
+            time.sleep(POLL_INTERVAL_IN_SECONDS)
+
+
+if __name__ == '__main__':
+    main()
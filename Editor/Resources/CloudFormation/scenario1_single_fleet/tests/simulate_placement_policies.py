@@ -0,0 +1,159 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario1_single_fleet/tests/simulate_placement_policies.py [trace.csv]`
+#
+# Replays a trace of players starting games and leaving them, against the game request and results request lambda
+# functions, with the game session warm pool and provisioning running, local GameLift, DynamoDB and SQS stand-ins, and a
+# simulated clock.
+# Game sessions terminate when their last player leaves. For each placement policy, it reports the game sessions
+# created, the active game sessions and the share of their player slots in use, sampled every 10 seconds, and the
+# time players wait for a connection.
+#
+# The trace is a CSV file of `arrival time in seconds,play time in seconds` lines. Without one, a two hour trace is
+# generated, with a rate of arrivals going up and down twice, and log-normal play times.
+
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import random
+import statistics
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from game_session_candidates import CandidateGameSessions
+from local_aws import LOCAL_HOME_REGION, LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalSqs, LocalTable
+from placement_policies import FULLEST_FIRST_POLICY_NAME, LEAST_LOADED_POLICY_NAME, OLDEST_FIRST_POLICY_NAME
+from simulate_warm_pool import poisson, provision_game_sessions, reset_game_session_provisioning
+import aws_clients
+import game_request
+import game_session_candidates
+import game_session_warm_pool
+import results_request
+
+TABLE_NAME = 'SimulationGameSessionReservationTable'
+QUEUE_URL = 'https://sqs.us-west-2.amazonaws.com/000000000000/SimulationGameSessionProvisioningQueue'
+FLEET_ALIAS = 'alias-00000000-0000-0000-0000-000000000000'
+PLACEMENT_POLICY_NAMES = [OLDEST_FIRST_POLICY_NAME, FULLEST_FIRST_POLICY_NAME, LEAST_LOADED_POLICY_NAME]
+MAX_PLAYERS_PER_GAME = 10
+GAME_SESSION_ACTIVATION_TIME_IN_SECONDS = 30
+CONTAINER_COUNT = 4
+SAMPLE_INTERVAL_IN_SECONDS = 10
+TRACE_DURATION_IN_SECONDS = 2 * 60 * 60  # 2 hours
+MIN_ARRIVAL_RATE = 0.5
+MAX_ARRIVAL_RATE = 3
+MEDIAN_PLAY_TIME_IN_SECONDS = 10 * 60  # 10 minutes
+
+
+def main():
+    os.environ['AWS_REGION'] = LOCAL_HOME_REGION
+    os.environ['FleetAlias'] = FLEET_ALIAS
+    os.environ['GameSessionProvisioningQueueUrl'] = QUEUE_URL
+    os.environ['GameSessionReservationTableName'] = TABLE_NAME
+    os.environ['MaxConcurrency'] = '1'
+    os.environ['MaxPlayersPerGame'] = str(MAX_PLAYERS_PER_GAME)
+    os.environ['ReservationLeaseInSeconds'] = str(GAME_SESSION_ACTIVATION_TIME_IN_SECONDS)
+
+    trace = read_trace(sys.argv[1]) if len(sys.argv) > 1 else generate_trace()
+    duration = max(arrival_time + play_time for arrival_time, play_time in trace) + 1
+
+    print(f"{len(trace)} players over {duration}s, max players per game: {MAX_PLAYERS_PER_GAME}")
+    print(f"{'Policy':>12} | {'Sessions created':>16} | {'Mean active sessions':>20} | {'Slots in use':>12} | "
+          f"{'Mean wait (s)':>13} | {'p95 wait (s)':>12} | {'Never connected':>15}")
+    for policy_name in PLACEMENT_POLICY_NAMES:
+        os.environ['PlacementPolicy'] = policy_name
+        random.seed(0)
+        clock = SimpleNamespace(now=0)
+        gamelift = LocalGameLift(game_session_activation_time_in_seconds=GAME_SESSION_ACTIVATION_TIME_IN_SECONDS,
+                                 clock=lambda: clock.now)
+        table = LocalTable(TABLE_NAME, 'FleetAlias')
+        sqs = LocalSqs()
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])},
+                                       clients={'gamelift': gamelift, 'sqs': sqs})
+        game_request.time = SimpleNamespace(time=lambda: clock.now)
+        reset_game_session_provisioning(clock)
+        game_session_warm_pool.time = SimpleNamespace(time=lambda: clock.now)
+        game_session_candidates.time = SimpleNamespace(monotonic=lambda: clock.now)
+        results_request.time = SimpleNamespace(time=lambda: clock.now)
+        containers = [CandidateGameSessions() for _ in range(CONTAINER_COUNT)]
+
+        arrivals = {}
+        for player_index, (arrival_time, play_time) in enumerate(trace):
+            arrivals.setdefault(arrival_time, []).append((player_index, play_time))
+        departures = {}
+        pending_players = []
+        wait_times = []
+        active_game_session_counts = []
+        slot_utilizations = []
+        start_time = 1_700_000_000
+        with contextlib.redirect_stdout(io.StringIO()):
+            for elapsed_time in range(duration):
+                clock.now = now = start_time + elapsed_time
+                if now % game_session_warm_pool.SCHEDULE_INTERVAL_IN_SECONDS == 0:
+                    game_session_warm_pool.handler({}, None)
+
+                for game_session_id in departures.pop(elapsed_time, []):
+                    gamelift.remove_player_session(game_session_id)
+
+                for player_index, play_time in arrivals.get(elapsed_time, []):
+                    event = {'requestContext': {'authorizer': {'claims': {'sub': f'player-{player_index}'}}}}
+                    game_request.handler(event, None)
+                    pending_players.append((event, elapsed_time, play_time))
+                provision_game_sessions(sqs, QUEUE_URL)
+
+                still_pending_players = []
+                for event, arrival_time, play_time in pending_players:
+                    results_request.candidate_game_sessions = random.choice(containers)
+                    response = results_request.handler(event, None)
+                    if response['statusCode'] == 200:
+                        wait_times.append(elapsed_time - arrival_time)
+                        game_session_id = json.loads(response['body'])['GameSessionArn']
+                        departures.setdefault(elapsed_time + play_time, []).append(game_session_id)
+                    else:
+                        still_pending_players.append((event, arrival_time, play_time))
+                pending_players = still_pending_players
+
+                if elapsed_time % SAMPLE_INTERVAL_IN_SECONDS == 0:
+                    active_game_sessions = [game_session for game_session in gamelift.game_sessions.values()
+                                            if 'TerminationTime' not in game_session]
+                    if active_game_sessions:
+                        active_game_session_counts.append(len(active_game_sessions))
+                        slot_utilizations.append(
+                            sum(game_session['CurrentPlayerSessionCount'] for game_session in active_game_sessions)
+                            / (len(active_game_sessions) * MAX_PLAYERS_PER_GAME))
+
+        wait_times.sort()
+        print(f"{policy_name:>12} | {len(gamelift.game_sessions):>16} | "
+              f"{statistics.mean(active_game_session_counts):>20.1f} | "
+              f"{statistics.mean(slot_utilizations):>12.1%} | {statistics.mean(wait_times):>13.2f} | "
+              f"{wait_times[int(len(wait_times) * 0.95)]:>12} | {len(pending_players):>15}")
+
+
+def read_trace(path):
+    with open(path, newline='') as trace_file:
+        return [(round(float(arrival_time)), round(float(play_time)))
+                for arrival_time, play_time in csv.reader(trace_file)]
+
+
+def generate_trace():
+    random.seed(0)
+    trace = []
+    for elapsed_time in range(TRACE_DURATION_IN_SECONDS):
+        # Two cycles of the arrival rate, as players come and go during a day
+        phase = math.sin(4 * math.pi * elapsed_time / TRACE_DURATION_IN_SECONDS)
+        arrival_rate = MIN_ARRIVAL_RATE + (MAX_ARRIVAL_RATE - MIN_ARRIVAL_RATE) * (1 + phase) / 2
+        for _ in range(poisson(arrival_rate)):
+            play_time = round(random.lognormvariate(math.log(MEDIAN_PLAY_TIME_IN_SECONDS), 0.5))
+            trace.append((elapsed_time, max(1, play_time)))
+    return trace
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario1_single_fleet/tests/simulate_repeated_results_requests.py`
+#
+# Starts players together against a fleet with room for all of their requests, each player's client sending every
+# results request twice at once, as when it retries a request that timed out on its side, and sending one more request
+# after getting its connection, as when the response was lost. Each player then starts its next game, within the time
+# its player session stays reserved, and polls for the connection of that game. Each request runs in its own thread,
+# against local GameLift, DynamoDB and SQS stand-ins. It compares creating a player session on every request, with
+# claiming the player's reservation first, and reports the player slots taken and CreatePlayerSession calls per player,
+# including the calls failing on game sessions other players filled, the players answered with more than one player
+# session in a game, the players whose next game got a player session of its own, and the table reads and writes per
+# results request.
+
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LOCAL_HOME_REGION, LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalSqs, LocalTable
+import aws_clients
+import game_request
+import player_session_reservations
+import results_request
+
+TABLE_NAME = 'SimulationGameSessionReservationTable'
+QUEUE_URL = 'https://sqs.us-west-2.amazonaws.com/000000000000/SimulationGameSessionProvisioningQueue'
+FLEET_ALIAS = 'alias-00000000-0000-0000-0000-000000000000'
+PLAYER_COUNT = 100
+MAX_PLAYERS_PER_GAME = 10
+# Requests sent at once by each client
+DUPLICATE_REQUEST_COUNT = 2
+# Game sessions created ahead of the players, with room for every request of the players, and for their next game
+GAME_SESSION_COUNT = math.ceil(PLAYER_COUNT * (DUPLICATE_REQUEST_COUNT + 2) / MAX_PLAYERS_PER_GAME)
+# Players start their game within this time of each other
+BURST_DURATION_IN_SECONDS = 0.2
+GAMELIFT_LATENCY_IN_SECONDS = 0.02
+DYNAMODB_LATENCY_IN_SECONDS = 0.005
+POLL_INTERVAL_IN_SECONDS = 0.05
+
+
+class UnreservedPlayerSessions:
+    """Claims every request of the player, so that a player session is created on every request, as before claims"""
+
+    @staticmethod
+    def get_player_session_reservation(reservation_table, fleet_alias, player_id, now):
+        return None
+
+    @staticmethod
+    def claim_player_session(reservation_table, fleet_alias, player_id, now):
+        return {}
+
+    @staticmethod
+    def release_claim(reservation_table, claim):
+        pass
+
+    @staticmethod
+    def reserve_player_session(reservation_table, claim, connection_info, now):
+        pass
+
+
+def main():
+    os.environ['AWS_REGION'] = LOCAL_HOME_REGION
+    os.environ['FleetAlias'] = FLEET_ALIAS
+    os.environ['GameSessionProvisioningQueueUrl'] = QUEUE_URL
+    os.environ['GameSessionReservationTableName'] = TABLE_NAME
+    # Requests run in containers of their own, which search for game sessions on every request
+    results_request.candidate_game_sessions.ttl_in_seconds = 0
+
+    print(f"{PLAYER_COUNT} players, {DUPLICATE_REQUEST_COUNT} requests at once per poll and one after connecting, "
+          f"{GAME_SESSION_COUNT * MAX_PLAYERS_PER_GAME} player slots")
+    print(f"{'Player sessions':>15} | {'Slots/player':>12} | {'Joins/player':>12} | {'Players with several':>20} | "
+          f"{'Mean connect (s)':>16} | {'New session next game':>21} | {'Reads/request':>13} | "
+          f"{'Writes/request':>14}")
+    for name, reservations in [('per request', UnreservedPlayerSessions), ('reserved', player_session_reservations)]:
+        gamelift = LocalGameLift(GAMELIFT_LATENCY_IN_SECONDS)
+        for _ in range(GAME_SESSION_COUNT):
+            gamelift.create_game_session(MAX_PLAYERS_PER_GAME, AliasId=FLEET_ALIAS)
+        gamelift.request_counts.clear()
+        table = LocalTable(TABLE_NAME, 'FleetAlias', latency_in_seconds=DYNAMODB_LATENCY_IN_SECONDS)
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])},
+                                       clients={'gamelift': gamelift, 'sqs': LocalSqs()})
+        results_request.get_player_session_reservation = reservations.get_player_session_reservation
+        results_request.claim_player_session = reservations.claim_player_session
+        results_request.release_claim = reservations.release_claim
+        results_request.reserve_player_session = reservations.reserve_player_session
+        Player.results_request_count = 0
+
+        burst_start_time = time.time() + 0.1
+        players = [Player(f'player-{i}', burst_start_time + i * BURST_DURATION_IN_SECONDS / PLAYER_COUNT)
+                   for i in range(PLAYER_COUNT)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for player in players:
+                player.start()
+            for player in players:
+                player.join()
+
+        assert all(player.connect_time is not None for player in players)
+        slot_count = sum(game_session['CurrentPlayerSessionCount'] for game_session in gamelift.game_sessions.values())
+        connect_times = [player.connect_time for player in players]
+        new_player_session_count = sum(player.next_player_session_id not in player.player_session_ids
+                                       for player in players)
+        # The game requests of the next games write to the table too
+        read_count = table.request_counts.get('GetItem', 0)
+        write_count = sum(table.request_counts.get(operation, 0) for operation in ('PutItem', 'DeleteItem'))
+        print(f"{name:>15} | {slot_count / PLAYER_COUNT:>12.2f} | "
+              f"{gamelift.request_counts.get('CreatePlayerSession', 0) / PLAYER_COUNT:>12.2f} | "
+              f"{sum(len(player.player_session_ids) > 1 for player in players):>20} | "
+              f"{sum(connect_times) / len(connect_times):>16.2f} | {new_player_session_count:>21} | "
+              f"{read_count / Player.results_request_count:>13.2f} | "
+              f"{write_count / Player.results_request_count:>14.2f}")
+        assert new_player_session_count == PLAYER_COUNT, "Expect the next game of each player to get a new session"
+
+    results_request.get_player_session_reservation = player_session_reservations.get_player_session_reservation
+    results_request.claim_player_session = player_session_reservations.claim_player_session
+    results_request.release_claim = player_session_reservations.release_claim
+    results_request.reserve_player_session = player_session_reservations.reserve_player_session
+
+
+class Player(threading.Thread):
+    """
+    Game client short polling for its game session connection from `start_time`, sending each request several times
+     at once, and once more after connecting, then starting its next game and polling for its connection
+    """
+
+    results_request_count = 0
+    _count_lock = threading.Lock()
+
+    def __init__(self, player_id, start_time):
+        super().__init__()
+        self.event = {'requestContext': {'authorizer': {'claims': {'sub': player_id}}}}
+        self.start_time = start_time
+        self.connect_time = None
+        self.player_session_ids = set()
+        self.next_player_session_id = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        time.sleep(max(0.0, self.start_time - time.time()))
+        started = time.time()
+        while not self.player_session_ids:
+            requests = [threading.Thread(target=self.request) for _ in range(DUPLICATE_REQUEST_COUNT)]
+            for request in requests:
+                request.start()
+            for request in requests:
+                request.join()
+            if not self.player_session_ids:
+                time.sleep(POLL_INTERVAL_IN_SECONDS)
+        self.connect_time = time.time() - started
+        self.request()
+
+        assert game_request.handler(self.event, None)['statusCode'] == 202
+        while self.next_player_session_id is None:
+            response = self.send_results_request()
+            if response['statusCode'] == 200:
+                self.next_player_session_id = json.loads(response['body'])['PlayerSessionId']
+            else:
+                time.sleep(POLL_INTERVAL_IN_SECONDS)
+
+    def request(self):
+        response = self.send_results_request()
+        if response['statusCode'] == 200:
+            with self._lock:
+                self.player_session_ids.add(json.loads(response['body'])['PlayerSessionId'])
+
+
+    def send_results_request(self):
+        with Player._count_lock:
+            Player.results_request_count += 1
+        return results_request.handler(self.event, None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario1_single_fleet/tests/simulate_warm_pool.py`
+#
+# Replays an hour of players starting games, at a rate that ramps up and down, against the game request and results
+# request lambda functions, with local GameLift, DynamoDB and SQS stand-ins and a simulated clock. The queued game
+# requests are handed to the game session provisioning function every second. Players poll for their game session
+# connection every second. It compares creating game sessions on demand only, with running the game
+# session warm pool every minute, and reports the time players wait for a connection, the players still waiting at the
+# end, the results requests they make, and the game sessions created.
+
+import contextlib
+import io
+import math
+import os
+import random
+import statistics
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from fleet_aliases import FleetAliases
+from fleet_locations import FleetLocations
+from game_session_candidates import CandidateGameSessions
+from game_session_provisioning import CreationPacer
+from local_aws import LOCAL_HOME_REGION, LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalSqs, LocalTable
+import aws_clients
+import fleet_aliases
+import game_request
+import game_session_candidates
+import game_session_provisioning
+import game_session_warm_pool
+import results_request
+
+TABLE_NAME = 'SimulationGameSessionReservationTable'
+QUEUE_URL = 'https://sqs.us-west-2.amazonaws.com/000000000000/SimulationGameSessionProvisioningQueue'
+# Batch size of the event source mapping of the game session provisioning function
+PROVISIONING_BATCH_SIZE = 100
+FLEET_ALIAS = 'alias-00000000-0000-0000-0000-000000000000'
+DURATION_IN_SECONDS = 60 * 60  # 1 hour
+MAX_PLAYERS_PER_GAME = 10
+GAME_SESSION_ACTIVATION_TIME_IN_SECONDS = 30
+SERVER_PROCESS_COUNT = 2000
+# Arrivals per second: quiet, ramping up over 15 minutes, peak, then dropping suddenly
+ARRIVAL_RATE_PROFILE = [(0, 0.2), (10 * 60, 0.2), (25 * 60, 3.0), (45 * 60, 3.0), (46 * 60, 0.5), (60 * 60, 0.5)]
+
+
+def main():
+    os.environ['AWS_REGION'] = LOCAL_HOME_REGION
+    os.environ['FleetAlias'] = FLEET_ALIAS
+    os.environ['GameSessionProvisioningQueueUrl'] = QUEUE_URL
+    os.environ['GameSessionReservationTableName'] = TABLE_NAME
+    os.environ['MaxConcurrency'] = '1'
+    os.environ['MaxPlayersPerGame'] = str(MAX_PLAYERS_PER_GAME)
+    os.environ['ReservationLeaseInSeconds'] = str(GAME_SESSION_ACTIVATION_TIME_IN_SECONDS)
+
+    print(f"Max players per game: {MAX_PLAYERS_PER_GAME}, game session activation: "
+          f"{GAME_SESSION_ACTIVATION_TIME_IN_SECONDS}s, peak arrivals: "
+          f"{max(rate for _, rate in ARRIVAL_RATE_PROFILE)}/s")
+    print(f"{'Game sessions':>13} | {'Players':>7} | {'Mean wait (s)':>13} | {'p50 wait (s)':>12} | "
+          f"{'p95 wait (s)':>12} | {'Still waiting':>13} | {'Requests/player':>15} | {'Sessions':>8} | "
+          f"{'Empty sessions':>14}")
+    for name, warm_pool in [('on demand', False), ('warm pool', True)]:
+        random.seed(0)
+        clock = SimpleNamespace(now=0)
+        gamelift = LocalGameLift(game_session_activation_time_in_seconds=GAME_SESSION_ACTIVATION_TIME_IN_SECONDS,
+                                 server_process_count=SERVER_PROCESS_COUNT, clock=lambda: clock.now)
+        table = LocalTable(TABLE_NAME, 'FleetAlias')
+        sqs = LocalSqs()
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])},
+                                       clients={'gamelift': gamelift, 'sqs': sqs})
+        game_request.time = SimpleNamespace(time=lambda: clock.now)
+        reset_game_session_provisioning(clock)
+        game_session_warm_pool.time = SimpleNamespace(time=lambda: clock.now)
+        game_session_candidates.time = SimpleNamespace(monotonic=lambda: clock.now)
+        results_request.time = SimpleNamespace(time=lambda: clock.now)
+        results_request.candidate_game_sessions = CandidateGameSessions()
+
+        pending_players = []
+        wait_times = []
+        request_count = 0
+        player_count = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            for now in range(1_700_000_000, 1_700_000_000 + DURATION_IN_SECONDS):
+                clock.now = now
+                if warm_pool and now % game_session_warm_pool.SCHEDULE_INTERVAL_IN_SECONDS == 0:
+                    game_session_warm_pool.handler({}, None)
+
+                for _ in range(poisson(arrival_rate(now - 1_700_000_000))):
+                    player_count += 1
+                    event = {'requestContext': {'authorizer': {'claims': {'sub': f'player-{player_count}'}}}}
+                    game_request.handler(event, None)
+                    request_count += 1
+                    pending_players.append((event, now))
+                provision_game_sessions(sqs, QUEUE_URL)
+
+                still_pending_players = []
+                for event, start_time in pending_players:
+                    request_count += 1
+                    if results_request.handler(event, None)['statusCode'] == 200:
+                        wait_times.append(now - start_time)
+                    else:
+                        still_pending_players.append((event, start_time))
+                pending_players = still_pending_players
+
+        wait_times.sort()
+        player_counts = [game_session['CurrentPlayerSessionCount'] for game_session in gamelift.game_sessions.values()]
+        print(f"{name:>13} | {player_count:>7} | {statistics.mean(wait_times):>13.1f} | "
+              f"{wait_times[len(wait_times) // 2]:>12} | {wait_times[int(len(wait_times) * 0.95)]:>12} | "
+              f"{len(pending_players):>13} | {request_count / player_count:>15.2f} | {len(player_counts):>8} | "
+              f"{player_counts.count(0):>14}")
+
+
+def arrival_rate(elapsed_time):
+    for (start_time, start_rate), (end_time, end_rate) in zip(ARRIVAL_RATE_PROFILE, ARRIVAL_RATE_PROFILE[1:]):
+        if start_time <= elapsed_time < end_time:
+            return start_rate + (end_rate - start_rate) * (elapsed_time - start_time) / (end_time - start_time)
+    return ARRIVAL_RATE_PROFILE[-1][1]
+
+
+def reset_game_session_provisioning(clock):
+    """Runs the game session provisioning function on the simulated clock, from a cold container"""
+    game_session_provisioning.time = SimpleNamespace(time=lambda: clock.now, monotonic=lambda: clock.now,
+                                                     sleep=lambda seconds: None)
+    fleet_aliases.time = SimpleNamespace(monotonic=lambda: clock.now)
+    game_session_provisioning.fleet_locations = FleetLocations(aliases=FleetAliases())
+    game_session_provisioning.creation_pacer = CreationPacer()
+
+
+def provision_game_sessions(sqs, queue_url):
+    """Hands the queued game requests to the game session provisioning function, as its event source mapping does"""
+    while True:
+        event = sqs.receive_event(queue_url, BatchSize=PROVISIONING_BATCH_SIZE, WaitTimeInSeconds=0)
+        if not event['Records']:
+            return
+        game_session_provisioning.handler(event, None)
+
+
+def poisson(rate):
+    """Returns the number of arrivals in a second, for a Poisson process of the rate"""
+    threshold = math.exp(-rate)
+    count = 0
+    product = random.random()
+    while product > threshold:
+        count += 1
+        product *= random.random()
+    return count
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# A player has at most one matchmaking ticket in progress. The game request claims the player's ActiveTicket item of
+# the MatchmakingRequest table with a single conditional write before it starts matchmaking, so that concurrent game
+# requests of the same player cannot both start a ticket. The claim is released when the ticket could not be started,
+# and when its request is updated to a terminal status by the matchmaker event handler or the FlexMatch status poller.
+# A claim whose release is lost expires once its ticket has timed out, and is taken over by the next game request.
+
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+# Player ids are Cognito subs, which never start with '#'
+ACTIVE_TICKET_KEY_PREFIX = '#ActiveTicket#'
+DEFAULT_MATCHMAKING_TIMEOUT_IN_SECONDS = 60
+DEFAULT_PLACEMENT_TIMEOUT_IN_SECONDS = 60
+
+
+def to_active_ticket_key(player_id):
+    return {
+        'PlayerId': f'{ACTIVE_TICKET_KEY_PREFIX}{player_id}',
+        'StartTime': 0
+    }
+
+
+def claim_active_ticket(matchmaking_request_table, player_id, start_time, ticket_timeout):
+    """
+    Claims the active ticket of the player for the matchmaking request starting at `start_time`, unless another
+     request holds an unexpired claim
+    :param ticket_timeout: time in seconds after which the ticket of the request is terminal, whether or not the claim
+     is released
+    :return: True if the claim is taken, False if another matchmaking request of the player is in progress
+    """
+    try:
+        matchmaking_request_table.put_item(
+            Item=dict(to_active_ticket_key(player_id), TicketStartTime=start_time,
+                      ExpirationTime=start_time + ticket_timeout),
+            ConditionExpression=Attr('ExpirationTime').not_exists() | Attr('ExpirationTime').lt(start_time)
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise e
+        return False
+
+
+def release_active_ticket(matchmaking_request_table, player_id, start_time):
+    """Releases the active ticket of the player, unless it was claimed by another matchmaking request since"""
+    try:
+        matchmaking_request_table.delete_item(
+            Key=to_active_ticket_key(player_id),
+            Expected={
+                'TicketStartTime': {
+                    'Value': start_time,
+                    'ComparisonOperator': 'EQ'
+                }
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise e
+        print(f"Active ticket of player: {player_id} is not held by matchmaking request started at: {start_time}")
@@ -0,0 +1,104 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# AWS clients and environment variables are loaded once per lambda container, on first use, and reused by the warm
+# invocations that follow, since building a client costs more than most of the requests made with it. A container runs
+# one invocation at a time, so the state functions keep across invocations, such as their caches, needs no lock. Only
+# state shared with the worker threads of an invocation, such as these clients, is synchronized. Low-level clients are
+# thread-safe and shared by the workers, but boto3 resources are not, so each worker borrows a table of its own.
+
+import boto3
+from botocore.config import Config
+import os
+import queue
+import threading
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10  # botocore default
+
+_lock = threading.Lock()
+_clients = {}
+_tables = {}
+_worker_tables = {}
+_environment_variables = {}
+_MISSING = object()
+
+
+def get_client(service_name, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+    """Returns the client of a service, shared by all invocations and threads of the container"""
+    key = (service_name, max_pool_connections)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = boto3.client(service_name, config=Config(max_pool_connections=max_pool_connections))
+                _clients[key] = client
+    return client
+
+
+def get_table(table_name, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+    """
+    Returns a DynamoDB table, shared by all invocations of the container, to be used from the thread of the invocation
+     only. Worker threads borrow tables of their own, see `get_worker_tables`.
+    """
+    key = (table_name, max_pool_connections)
+    table = _tables.get(key)
+    if table is None:
+        with _lock:
+            table = _tables.get(key)
+            if table is None:
+                table = _create_table(table_name, max_pool_connections)
+                _tables[key] = table
+    return table
+
+
+def get_worker_tables(table_name, worker_count):
+    """
+    Returns a queue of `worker_count` DynamoDB tables, kept for all invocations of the container, from which each of
+     up to `worker_count` concurrent workers borrows a table (see `call_with_worker_table`)
+    """
+    key = (table_name, worker_count)
+    tables = _worker_tables.get(key)
+    if tables is None:
+        with _lock:
+            tables = _worker_tables.get(key)
+            if tables is None:
+                tables = queue.SimpleQueue()
+                for _ in range(worker_count):
+                    tables.put(_create_table(table_name, DEFAULT_MAX_POOL_CONNECTIONS))
+                _worker_tables[key] = tables
+    return tables
+
+
+def call_with_worker_table(tables, function, *args):
+    """Calls `function` with a table borrowed from `tables` followed by `args`, and returns the table afterwards"""
+    table = tables.get()
+    try:
+        return function(table, *args)
+    finally:
+        tables.put(table)
+
+
+def _create_table(table_name, max_pool_connections):
+    dynamodb = boto3.resource('dynamodb', config=Config(max_pool_connections=max_pool_connections))
+    return dynamodb.Table(table_name)
+
+
+def get_environment_variable(name, default=_MISSING):
+    """Returns an environment variable of the function, raising KeyError if it is not set and has no default"""
+    value = _environment_variables.get(name, _MISSING)
+    if value is _MISSING:
+        value = os.environ.get(name, default)
+        if value is _MISSING:
+            raise KeyError(name)
+        _environment_variables[name] = value
+    return value
+
+
+def reset():
+    """Drops the loaded clients and environment variables, so that the next invocation loads them again"""
+    with _lock:
+        _clients.clear()
+        _tables.clear()
+        _worker_tables.clear()
+        _environment_variables.clear()
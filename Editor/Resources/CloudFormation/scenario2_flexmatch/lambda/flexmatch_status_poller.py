@@ -1,11 +1,20 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
-import boto3
-from boto3.dynamodb.conditions import Attr, And
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
-import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import itertools
 import time
+from active_tickets import release_active_ticket
+from aws_clients import call_with_worker_table, get_client, get_environment_variable, get_table, get_worker_tables
+from game_session_connections import put_game_session_connection
+from matchmaking_statistics import DEFAULT_FLUSH_INTERVAL_IN_SECONDS, MatchmakingStatistics, \
+    to_time_to_match_in_seconds
+from matchmaking_tickets import PLACING_TICKET_PROGRESS
+from matchmaking_wait_times import TimeToMatchQuantile
+from polling_policies import BACKOFF_POLICY_NAME, FIXED_INTERVAL_POLICY_NAME, create_polling_policy
 
 NON_TERMINAL_REQUEST_QUERY_LIMIT = 50
 MATCHMAKING_STARTED_STATUS = 'MatchmakingStarted'
@@ -15,6 +24,28 @@ MATCHMAKING_CANCELLED_STATUS = 'MatchmakingCancelled'
 MATCHMAKING_FAILED_STATUS = 'MatchmakingFailed'
 MAX_PARTITION_SIZE = 10
 MIN_TIME_ELAPSED_BEFORE_UPDATE_IN_SECONDS = 30
+TERMINAL_TICKET_STATUSES = ['COMPLETED', 'FAILED', 'TIMED_OUT', 'CANCELLED']
+MIN_REMAINING_TIME_IN_MILLIS = 5 * 1000  # 5 seconds
+# Recorded estimated wait times are only replaced by estimates differing by more than both, see
+# `is_estimated_wait_time_changed`
+MIN_ESTIMATED_WAIT_TIME_CHANGE_IN_SECONDS = 30
+MIN_ESTIMATED_WAIT_TIME_CHANGE_RATIO = 0.25
+# Tickets waiting longer than most recent matches are polled less often by the Backoff policy
+BACKOFF_START_QUANTILE = 0.95
+DEFAULT_PARALLELISM = 4
+DEFAULT_PLACEMENT_TIMEOUT_IN_SECONDS = 60
+UNKNOWN_CONFIGURATION_NAME = 'Unknown'
+# Key of the item holding the poller's sweep times and resume cursor.
+# Player ids are Cognito subs, which never start with '#'
+POLLER_STATE_KEY = {
+    'PlayerId': '#FlexMatchStatusPoller',
+    'StartTime': 0
+}
+
+# Times to match of the tickets completed by the warm container, flushed to the MatchmakingRequest table periodically
+matchmaking_statistics = MatchmakingStatistics()
+# High quantile of the recent times to match of the configuration, read from the flushed statistics
+backoff_start_time_to_match = TimeToMatchQuantile(BACKOFF_START_QUANTILE)
 
 
 def handler(event, context):
@@ -23,115 +54,352 @@ def handler(event, context):
     to regularly poll for ticket status at a low rate.
     See: https://docs.aws.amazon.com/gamelift/latest/flexmatchguide/match-client.html#match-client-track
 
+    Each run sweeps the pending requests, and polls the tickets that are due according to the `PollingPolicy`, their
+    start time and the time of the previous sweep (see `is_poll_due`), so that no write is needed for tickets whose
+    status did not change. Only terminal status transitions, and significant changes of the wait time GameLift
+    estimates for pending tickets (see `is_estimated_wait_time_changed`), are written. The Backoff policy starts
+    backing off once tickets wait longer than most matches of the configuration took recently, according to the
+    matchmaking statistics. Tickets that FlexMatch events
+    reported as being placed are not polled until the placement could have timed out, since their next event is their
+    result (see `is_placing`). If the lambda is about to run out of time, the position of the last polled request is
+    recorded so that the next run resumes the sweep from there.
+
+    Polling is pipelined: up to `Parallelism` DescribeMatchmaking calls are kept in flight, and their results are
+    written to the MatchmakingRequest table by as many concurrent writers.
+
+    The time to match of each ticket this function completes is added to the statistics of its configuration and
+    outcome, which are flushed every `StatisticsFlushIntervalInSeconds` (see `matchmaking_statistics`).
+
     :param event: lambda event, not used by this function
-    :param context: lambda context, not used by this function
+    :param context: lambda context, used to stop polling before the function times out
     :return: None
     """
     lambda_start_time = round(time.time())
 
     print(f"Polling non-terminal matchmaking tickets. Lambda start time: {lambda_start_time}")
 
-    matchmaking_request_table_name = os.environ['MatchmakingRequestTableName']
+    matchmaking_request_table_name = get_environment_variable('MatchmakingRequestTableName')
+    pending_ticket_index_name = get_environment_variable('PendingTicketIndexName')
+    parallelism = int(get_environment_variable('Parallelism', DEFAULT_PARALLELISM))
+    placement_timeout = int(get_environment_variable('PlacementTimeoutInSeconds', DEFAULT_PLACEMENT_TIMEOUT_IN_SECONDS))
+    polling_policy_name = get_environment_variable('PollingPolicy', FIXED_INTERVAL_POLICY_NAME)
 
-    dynamodb = boto3.resource('dynamodb')
-    matchmaking_request_table = dynamodb.Table(matchmaking_request_table_name)
+    # The GameLift client is shared by the describe workers, so its connection pool is sized to the number of
+    # concurrent requests. The update workers each borrow a table, and this thread uses its own.
+    matchmaking_request_table = get_table(matchmaking_request_table_name)
+    worker_tables = get_worker_tables(matchmaking_request_table_name, parallelism)
+    gamelift = get_client('gamelift', max_pool_connections=parallelism)
 
-    gamelift = boto3.client('gamelift')
+    time_to_match_estimate = None
+    if polling_policy_name == BACKOFF_POLICY_NAME:
+        time_to_match_estimate = backoff_start_time_to_match.get(
+            matchmaking_request_table, get_environment_variable('MatchmakingConfigurationName'), lambda_start_time)
+    polling_policy = create_polling_policy(polling_policy_name,
+                                           int(get_environment_variable('MatchmakingTimeoutInSeconds')),
+                                           time_to_match_estimate)
 
-    matchmaking_requests = matchmaking_request_table.scan(
-        Limit=NON_TERMINAL_REQUEST_QUERY_LIMIT,
-        FilterExpression=And(Attr('TicketStatus').eq(MATCHMAKING_STARTED_STATUS),
-                             Attr('LastUpdatedTime').lt(lambda_start_time - MIN_TIME_ELAPSED_BEFORE_UPDATE_IN_SECONDS))
+    poller_state = matchmaking_request_table.get_item(Key=POLLER_STATE_KEY, ConsistentRead=True).get('Item', {})
+    previous_resume_key = poller_state.get('ResumeKey')
+    if previous_resume_key:
+        print(f"Resuming polling after: {previous_resume_key}")
+        sweep_start_time = poller_state['SweepStartTime']
+        previous_sweep_start_time = poller_state.get('PreviousSweepStartTime')
+    else:
+        sweep_start_time = lambda_start_time
+        previous_sweep_start_time = poller_state.get('SweepStartTime')
+
+    stale_matchmaking_requests = query_stale_matchmaking_requests(
+        matchmaking_request_table,
+        pending_ticket_index_name,
+        lambda_start_time - MIN_TIME_ELAPSED_BEFORE_UPDATE_IN_SECONDS,
+        previous_resume_key
     )
+    due_matchmaking_requests = (request for request in stale_matchmaking_requests
+                                if is_poll_due(polling_policy, request, previous_sweep_start_time, lambda_start_time)
+                                and not is_placing(request, placement_timeout, lambda_start_time))
+
+    resume_key = None
+    polled_request_count = 0
+    with ThreadPoolExecutor(max_workers=parallelism) as describe_executor, \
+            ThreadPoolExecutor(max_workers=parallelism) as update_executor:
+        describe_futures = deque()
+        update_futures = set()
+        # The players of a match usually complete in the same run, so the shared connection info is written once
+        recorded_game_session_arns = set()
+
+        def update_described_requests(described_requests):
+            nonlocal update_futures
+            for ticket, matchmaking_request in described_requests:
+                if ticket['Status'] not in TERMINAL_TICKET_STATUSES:
+                    if is_estimated_wait_time_changed(ticket, matchmaking_request):
+                        update_futures.add(update_executor.submit(
+                            call_with_worker_table, worker_tables, update_estimated_wait_time, ticket,
+                            matchmaking_request))
+                    else:
+                        print(f"No updates to ticket: {ticket['TicketId']}. Status: {ticket['Status']}")
+                    continue
+                update_futures.add(update_executor.submit(
+                    call_with_worker_table, worker_tables, update_matchmaking_request, ticket, matchmaking_request,
+                    lambda_start_time, recorded_game_session_arns))
+            # Bound the write backlog so that writes keep up with DescribeMatchmaking calls
+            while len(update_futures) > parallelism * MAX_PARTITION_SIZE:
+                done, update_futures = wait(update_futures, return_when=FIRST_COMPLETED)
+                for update_future in done:
+                    update_future.result()
+
+        for matchmaking_requests in partition(due_matchmaking_requests, MAX_PARTITION_SIZE):
+            describe_futures.append(describe_executor.submit(describe_matchmaking, gamelift, matchmaking_requests))
+            polled_request_count += len(matchmaking_requests)
+            if len(describe_futures) >= parallelism:
+                update_described_requests(describe_futures.popleft().result())
+            if context.get_remaining_time_in_millis() < MIN_REMAINING_TIME_IN_MILLIS:
+                resume_key = to_pending_ticket_index_key(matchmaking_requests[-1])
+                print(f"Running out of time after polling {polled_request_count} matchmaking requests. "
+                      f"Next run resumes after: {resume_key}")
+                break
 
-    if matchmaking_requests['Count'] <= 0:
+        while describe_futures:
+            update_described_requests(describe_futures.popleft().result())
+        for update_future in update_futures:
+            update_future.result()
+
+    if polled_request_count <= 0:
         print("No non-terminal matchmaking requests found")
+    elif resume_key is None:
+        print(f"Polled all {polled_request_count} non-terminal matchmaking requests")
+
+    save_poller_state(matchmaking_request_table, poller_state, {
+        'ResumeKey': resume_key,
+        'SweepStartTime': sweep_start_time,
+        'PreviousSweepStartTime': previous_sweep_start_time
+    })
 
-    for matchmaking_requests in partition(matchmaking_requests['Items'], MAX_PARTITION_SIZE):
-        ticket_id_to_request_mapping = {request['TicketId']: request for request in matchmaking_requests}
-        describe_matchmaking_result = gamelift.describe_matchmaking(
-            TicketIds=list(ticket_id_to_request_mapping.keys())
+    flush_interval = int(get_environment_variable('StatisticsFlushIntervalInSeconds',
+                                                  DEFAULT_FLUSH_INTERVAL_IN_SECONDS))
+    matchmaking_statistics.flush(matchmaking_request_table, lambda_start_time, flush_interval)
+
+
+def query_stale_matchmaking_requests(matchmaking_request_table, pending_ticket_index_name, last_updated_before,
+                                     exclusive_start_key):
+    """
+    Yields the pending matchmaking requests last updated before the given time, least recently updated first,
+    fetching one page at a time as the requests are consumed.
+
+    The pending ticket index is sparse: only requests with a PendingTicketStatus are in it, and the attribute is
+    removed once the request reaches a terminal status. Reads therefore scale with the number of pending tickets
+    rather than the size of the table.
+    """
+    query_parameters = {
+        'IndexName': pending_ticket_index_name,
+        'Limit': NON_TERMINAL_REQUEST_QUERY_LIMIT,
+        'KeyConditionExpression': Key('PendingTicketStatus').eq(MATCHMAKING_STARTED_STATUS)
+        & Key('LastUpdatedTime').lt(last_updated_before)
+    }
+    while True:
+        if exclusive_start_key:
+            query_parameters['ExclusiveStartKey'] = exclusive_start_key
+        matchmaking_requests = matchmaking_request_table.query(**query_parameters)
+        yield from matchmaking_requests['Items']
+        exclusive_start_key = matchmaking_requests.get('LastEvaluatedKey')
+        if not exclusive_start_key:
+            return
+
+
+def is_poll_due(polling_policy, matchmaking_request, previous_sweep_start_time, now):
+    """
+    The polling policy schedules the polls of a ticket by age. A ticket is polled if one of its poll times passed
+    since the previous sweep started, since that sweep covered all poll times before it. The schedule is derived from
+    the start time, so it does not need to be stored per ticket.
+    """
+    start_time = matchmaking_request['StartTime']
+    previous_poll_count = 0
+    if previous_sweep_start_time is not None:
+        previous_poll_count = polling_policy.poll_count(previous_sweep_start_time - start_time)
+    return polling_policy.poll_count(now - start_time) > previous_poll_count
+
+
+def is_placing(matchmaking_request, placement_timeout, now):
+    """
+    A ticket is being placed from the event reporting it until the placement times out. Its result is then reported by
+     an event, so it only needs polling if that event is lost.
+    """
+    return matchmaking_request.get('TicketProgress') == PLACING_TICKET_PROGRESS \
+        and now - matchmaking_request['LastUpdatedTime'] < placement_timeout
+
+
+def describe_matchmaking(gamelift, matchmaking_requests):
+    """Describes the tickets of up to 10 matchmaking requests, returning (ticket, matchmaking request) pairs"""
+    ticket_id_to_request_mapping = {request['TicketId']: request for request in matchmaking_requests}
+    describe_matchmaking_result = gamelift.describe_matchmaking(
+        TicketIds=list(ticket_id_to_request_mapping.keys())
+    )
+    ticket_list = describe_matchmaking_result['TicketList']
+    if len(ticket_list) != len(matchmaking_requests):
+        print(f"Resulting TicketList length: {len(ticket_list)} from DescribeMatchmaking "
+              f"does not match the request size: {len(matchmaking_requests)}")
+    return [(ticket, ticket_id_to_request_mapping[ticket['TicketId']]) for ticket in ticket_list]
+
+
+def update_matchmaking_request(matchmaking_request_table, ticket, matchmaking_request, lambda_start_time,
+                               recorded_game_session_arns):
+    """
+    Records the terminal status of a ticket on its matchmaking request. The connection info of a matched game session
+    is recorded first, unless it is in `recorded_game_session_arns`, so that the request can refer to it. The active
+    ticket of the player is released afterwards.
+    """
+    ticket_id = ticket['TicketId']
+    ticket_status = ticket['Status']
+    matchmaking_request_status = to_matchmaking_request_status(ticket_status)
+    player_id = matchmaking_request['PlayerId']
+    start_time = matchmaking_request['StartTime']
+    try:
+        print(f'Ticket: {ticket_id} status was updated to {ticket_status}')
+        attribute_updates = {
+            'TicketStatus': {
+                'Value': matchmaking_request_status
+            },
+            'PendingTicketStatus': {
+                'Action': 'DELETE'
+            },
+            'TicketProgress': {
+                'Action': 'DELETE'
+            },
+            'LastUpdatedTime': {
+                'Value': lambda_start_time
+            }
+        }
+        if ticket_status == 'COMPLETED':
+            # parse the playerSessionId
+            matched_player_sessions = ticket.get('GameSessionConnectionInfo', {}).get('MatchedPlayerSessions')
+            player_session_id = None
+            if matched_player_sessions is not None and len(matched_player_sessions) == 1:
+                player_session_id = matched_player_sessions[0].get('PlayerSessionId')
+
+            game_session_connection = {
+                'GameSessionArn': str(ticket.get('GameSessionConnectionInfo', {}).get('GameSessionArn')),
+                'IpAddress': ticket.get('GameSessionConnectionInfo', {}).get('IpAddress'),
+                'DnsName': ticket.get('GameSessionConnectionInfo', {}).get('DnsName'),
+                'Port': str(ticket.get('GameSessionConnectionInfo', {}).get('Port'))
+            }
+            if game_session_connection['GameSessionArn'] not in recorded_game_session_arns:
+                put_game_session_connection(matchmaking_request_table, game_session_connection, lambda_start_time)
+                recorded_game_session_arns.add(game_session_connection['GameSessionArn'])
+
+            attribute_updates.update({
+                'GameSessionArn': {
+                    'Value': game_session_connection['GameSessionArn']
+                },
+                'PlayerSessionId': {
+                    'Value' : str(player_session_id)
+                }
+            })
+
+        matchmaking_request_table.update_item(
+            Key={
+                'PlayerId': player_id,
+                'StartTime': start_time
+            },
+            AttributeUpdates=attribute_updates,
+            Expected={
+                'TicketStatus': {
+                    'Value': MATCHMAKING_STARTED_STATUS,
+                    'ComparisonOperator': 'EQ'
+                }
+            }
         )
-        ticket_list = describe_matchmaking_result['TicketList']
-        if len(ticket_list) != len(matchmaking_requests):
-            print(f"Resulting TicketList length: {len(ticket_list)} from DescribeMatchmaking "
-                  f"does not match the request size: {len(matchmaking_requests)}")
-        for ticket in ticket_list:
-            ticket_id = ticket['TicketId']
-            ticket_status = ticket['Status']
-            matchmaking_request_status = to_matchmaking_request_status(ticket_status)
-            matchmaking_request = ticket_id_to_request_mapping[ticket_id]
-            player_id = matchmaking_request['PlayerId']
-            start_time = matchmaking_request['StartTime']
-            last_updated_time = matchmaking_request['LastUpdatedTime']
-            try:
-                attribute_updates = {
-                    'LastUpdatedTime': {
-                        'Value': lambda_start_time
-                    }
+        # The ticket ended up to a poll interval before it was polled
+        end_time = ticket['EndTime'].timestamp() if 'EndTime' in ticket else lambda_start_time
+        matchmaking_statistics.record(ticket.get('ConfigurationName', UNKNOWN_CONFIGURATION_NAME),
+                                      matchmaking_request_status, to_time_to_match_in_seconds(start_time, end_time),
+                                      lambda_start_time)
+        release_active_ticket(matchmaking_request_table, player_id, start_time)
+
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        if error_code == 'ConditionalCheckFailedException':
+            print(f"Ticket: {ticket_id} status has been updated (likely by MatchMakerEventHandler). "
+                  f"No change is made")
+            return
+        raise e
+
+
+def is_estimated_wait_time_changed(ticket, matchmaking_request):
+    """
+    GameLift estimates the wait time per matchmaking configuration, so each change of the estimate would be written to
+     every pending request of the configuration, and to the pending ticket index. The estimate is only recorded again
+     when it moved by more than `MIN_ESTIMATED_WAIT_TIME_CHANGE_IN_SECONDS` and `MIN_ESTIMATED_WAIT_TIME_CHANGE_RATIO`
+     of the recorded estimate, since clients are told to poll again within 15 seconds whatever the estimate.
+    """
+    estimated_wait_time = ticket.get('EstimatedWaitTime')
+    if estimated_wait_time is None:
+        return False
+    recorded_estimated_wait_time = matchmaking_request.get('EstimatedWaitTime')
+    if recorded_estimated_wait_time is None:
+        return True
+    return abs(estimated_wait_time - recorded_estimated_wait_time) \
+        > max(MIN_ESTIMATED_WAIT_TIME_CHANGE_IN_SECONDS,
+              recorded_estimated_wait_time * MIN_ESTIMATED_WAIT_TIME_CHANGE_RATIO)
+
+
+def update_estimated_wait_time(matchmaking_request_table, ticket, matchmaking_request):
+    """
+    Records the wait time GameLift estimates for a pending ticket on its matchmaking request, which the ResultsRequest
+     function uses to tell the client when to poll again
+    """
+    ticket_id = ticket['TicketId']
+    print(f"Ticket: {ticket_id} estimated wait time was updated to {ticket['EstimatedWaitTime']}")
+    try:
+        matchmaking_request_table.update_item(
+            Key={
+                'PlayerId': matchmaking_request['PlayerId'],
+                'StartTime': matchmaking_request['StartTime']
+            },
+            AttributeUpdates={
+                'EstimatedWaitTime': {
+                    'Value': ticket['EstimatedWaitTime']
                 }
-                if ticket_status in ['COMPLETED', 'FAILED', 'TIMED_OUT', 'CANCELLED']:
-                    print(f'Ticket: {ticket_id} status was updated to {ticket_status}')
-                    attribute_updates.update({
-                        'TicketStatus': {
-                            'Value': matchmaking_request_status
-                        }
-                    })
-                    if ticket_status == 'COMPLETED':
-                        # parse the playerSessionId
-                        matched_player_sessions = ticket.get('GameSessionConnectionInfo', {}).get('MatchedPlayerSessions')
-                        player_session_id = None
-                        if matched_player_sessions is not None and len(matched_player_sessions) == 1:
-                            player_session_id = matched_player_sessions[0].get('PlayerSessionId')
-
-                        attribute_updates.update({
-                            'IpAddress': {
-                                'Value': ticket.get('GameSessionConnectionInfo', {}).get('IpAddress')
-                            },
-                            'DnsName': {
-                                'Value': ticket.get('GameSessionConnectionInfo', {}).get('DnsName')
-                            },
-                            'Port': {
-                                'Value': str(ticket.get('GameSessionConnectionInfo', {}).get('Port'))
-                            },
-                            'GameSessionArn': {
-                                'Value': str(ticket.get('GameSessionConnectionInfo', {}).get('GameSessionArn'))
-                            },
-                            'PlayerSessionId': {
-                                'Value' : str(player_session_id)
-                            }
-                        })
-                else:
-                    print(f'No updates to ticket: {ticket_id} compared to '
-                          f'{lambda_start_time - last_updated_time} seconds ago')
-
-                matchmaking_request_table.update_item(
-                    Key={
-                        'PlayerId': player_id,
-                        'StartTime': start_time
-                    },
-                    AttributeUpdates=attribute_updates,
-                    Expected={
-                        'TicketStatus': {
-                            'Value': MATCHMAKING_STARTED_STATUS,
-                            'ComparisonOperator': 'EQ'
-                        }
-                    }
-                )
-
-            except ClientError as e:
-                error_code = e.response['Error']['Code']
-                if error_code == 'ConditionCheckFailedException':
-                    print(f"Ticket: {ticket_id} status has been updated (likely by MatchMakerEventHandler). "
-                          f"No change is made")
-                    continue
-                raise e
+            },
+            Expected={
+                'TicketStatus': {
+                    'Value': MATCHMAKING_STARTED_STATUS,
+                    'ComparisonOperator': 'EQ'
+                }
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            print(f"Ticket: {ticket_id} status has been updated (likely by MatchMakerEventHandler). "
+                  f"No change is made")
+            return
+        raise e
+
+
+def to_pending_ticket_index_key(matchmaking_request):
+    return {k: matchmaking_request[k] for k in ('PendingTicketStatus', 'LastUpdatedTime', 'PlayerId', 'StartTime')}
+
+
+def save_poller_state(matchmaking_request_table, previous_poller_state, poller_state):
+    """Writes the poller state attributes that changed, removing the ones set to None"""
+    attribute_updates = {}
+    for name, value in poller_state.items():
+        if value == previous_poller_state.get(name):
+            continue
+        attribute_updates[name] = {'Action': 'DELETE'} if value is None else {'Value': value}
+    if attribute_updates:
+        matchmaking_request_table.update_item(
+            Key=POLLER_STATE_KEY,
+            AttributeUpdates=attribute_updates
+        )
 
 
-def partition(collection, n):
-    """Yield successive n-sized partitions from collection."""
-    for i in range(0, len(collection), n):
-        yield collection[i:i + n]
+def partition(iterable, n):
+    """Yield successive n-sized partitions from iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, n))
+        if not chunk:
+            return
+        yield chunk
 
 
 def to_matchmaking_request_status(ticket_status):
@@ -1,18 +1,22 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
-import boto3
-from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
 import time
-import os
 import json
 
-DEFAULT_TTL_IN_SECONDS = 10 * 60  # 10 minutes
+from active_tickets import DEFAULT_MATCHMAKING_TIMEOUT_IN_SECONDS, DEFAULT_PLACEMENT_TIMEOUT_IN_SECONDS, \
+    claim_active_ticket, release_active_ticket
+from aws_clients import get_client, get_environment_variable, get_table
+from long_polling import MIN_REMAINING_TIME_IN_MILLIS
+from matchmaking_admission import DEFAULT_MAX_QUEUE_TIME_IN_SECONDS, DEFAULT_START_MATCHMAKING_TPS, \
+    MatchmakingAdmission, get_retry_after_in_seconds, wait_until
+from matchmaking_tickets import MATCHMAKING_REQUEST_TTL_IN_SECONDS, to_ticket_id
+
 MATCHMAKING_STARTED_STATUS = 'MatchmakingStarted'
-MATCHMAKING_SUCCEEDED_STATUS = 'MatchmakingSucceeded'
-MATCHMAKING_TIMED_OUT_STATUS = 'MatchmakingTimedOut'
-MATCHMAKING_CANCELLED_STATUS = 'MatchmakingCancelled'
-MATCHMAKING_FAILED_STATUS = 'MatchmakingFailed'
+
+# Token buckets found empty by the warm container
+matchmaking_admission = MatchmakingAdmission()
 
 
 def handler(event, context):
@@ -20,12 +24,25 @@ def handler(event, context):
     Handles requests to start games from the game client.
      This function records the game request from the client in the MatchmakingRequest table and calls
      GameLift to start matchmaking.
+
+    A player has at most one matchmaking request in progress: the request claims the player's active ticket with a
+     single conditional write before matchmaking starts, and is answered 409 (Conflict) if another request holds it
+     (see `active_tickets`). The claim is released if matchmaking could not be started, and expires once the ticket
+     has timed out, after `MatchmakingTimeoutInSeconds` and `PlacementTimeoutInSeconds`.
+
+    StartMatchmaking calls are admitted within `StartMatchmakingTps` calls per second across all invocations (see
+     `matchmaking_admission`). A request over the budget waits for a later second, up to
+     `StartMatchmakingMaxQueueTimeInSeconds`, and is answered 429 (Too Many Requests) with a Retry-After header if
+     none is left, as is a request GameLift throttles, or whose token could not be taken.
+
     :param event: lambda event, contains the region to player latency mapping in `regionToLatencyMapping` key, as well
      as the player information from the Cognito id tokens.
-    :param context: lambda context, not used by this function
+    :param context: lambda context, used to stop waiting for a StartMatchmaking token before the function times out
     :return:
      - 202 (Accepted) if the matchmaking request is accepted and is now being processed
      - 409 (Conflict) if the another matchmaking request is in progress
+     - 429 (Too Many Requests) if the StartMatchmaking budget is exceeded, with the seconds after which to retry in
+       the Retry-After header
      - 500 (Internal Error) if error occurred when calling GameLift to start matchmaking
     """
     player_id = event["requestContext"]["authorizer"]["claims"]["sub"]
@@ -38,22 +55,23 @@ def handler(event, context):
     else:
         print("No regionToLatencyMapping mapping provided")
 
-    matchmaking_request_table_name = os.environ['MatchmakingRequestTableName']
-    team_name = os.environ['TeamName']
-    matchmaking_configuration_name = os.environ['MatchmakingConfigurationName']
-
-    dynamodb = boto3.resource('dynamodb')
-    matchmaking_request_table = dynamodb.Table(matchmaking_request_table_name)
+    matchmaking_request_table_name = get_environment_variable('MatchmakingRequestTableName')
+    matchmaking_admission_table_name = get_environment_variable('MatchmakingAdmissionTableName')
+    team_name = get_environment_variable('TeamName')
+    matchmaking_configuration_name = get_environment_variable('MatchmakingConfigurationName')
+    start_matchmaking_tps = int(get_environment_variable('StartMatchmakingTps', DEFAULT_START_MATCHMAKING_TPS))
+    max_queue_time = float(get_environment_variable('StartMatchmakingMaxQueueTimeInSeconds',
+                                                    DEFAULT_MAX_QUEUE_TIME_IN_SECONDS))
 
-    gamelift = boto3.client('gamelift')
+    ticket_timeout = int(get_environment_variable('MatchmakingTimeoutInSeconds',
+                                                  DEFAULT_MATCHMAKING_TIMEOUT_IN_SECONDS)) \
+        + int(get_environment_variable('PlacementTimeoutInSeconds', DEFAULT_PLACEMENT_TIMEOUT_IN_SECONDS))
 
-    matchmaking_requests = matchmaking_request_table.query(
-        KeyConditionExpression=Key('PlayerId').eq(player_id),
-        ScanIndexForward=False
-    )
+    matchmaking_request_table = get_table(matchmaking_request_table_name)
+    matchmaking_admission_table = get_table(matchmaking_admission_table_name)
+    gamelift = get_client('gamelift')
 
-    if matchmaking_requests['Count'] > 0 \
-            and not is_matchmaking_request_terminal(matchmaking_requests['Items'][0]):
+    if not claim_active_ticket(matchmaking_request_table, player_id, start_time, ticket_timeout):
         # A existing matchmaking request in progress
         return {
             'headers': {
@@ -62,6 +80,25 @@ def handler(event, context):
             'statusCode': 409  # Conflict
         }
 
+    if context is not None:
+        max_queue_time = max(0.0, min(max_queue_time,
+                                      (context.get_remaining_time_in_millis() - MIN_REMAINING_TIME_IN_MILLIS) / 1000))
+    now = time.time()
+    try:
+        admission_time = matchmaking_admission.admit(matchmaking_admission_table, matchmaking_configuration_name,
+                                                     start_matchmaking_tps, now, max_queue_time)
+    except Exception as ex:
+        # Admitting the request regardless would let spikes through exactly when the table is overloaded
+        print(f'Error occurred when admitting StartMatchmaking, shedding it. Exception: {ex}')
+        release_claim(matchmaking_request_table, player_id, start_time)
+        return to_too_many_requests_response(get_retry_after_in_seconds(time.time(), 0))
+    if admission_time is None:
+        print(f"StartMatchmaking budget exceeded. PlayerId: {player_id}")
+        release_claim(matchmaking_request_table, player_id, start_time)
+        return to_too_many_requests_response(get_retry_after_in_seconds(now, max_queue_time))
+    wait_until(admission_time)
+
+    ticket_id = None
     try:
         player = {
             'PlayerId': player_id,
@@ -72,7 +109,8 @@ def handler(event, context):
 
         start_matchmaking_request = {
             "ConfigurationName": matchmaking_configuration_name,
-            "Players": [player]
+            "Players": [player],
+            "TicketId": to_ticket_id(player_id, start_time)
         }
         print(f"Starting matchmaking in GameLift. Request: {start_matchmaking_request}")
         start_matchmaking_result = gamelift.start_matchmaking(**start_matchmaking_request)
@@ -85,8 +123,9 @@ def handler(event, context):
                 'PlayerId': player_id,
                 'StartTime': start_time,
                 'LastUpdatedTime': start_time,
-                'ExpirationTime': start_time + DEFAULT_TTL_IN_SECONDS,
+                'ExpirationTime': start_time + MATCHMAKING_REQUEST_TTL_IN_SECONDS,
                 'TicketStatus': ticket_status,
+                'PendingTicketStatus': ticket_status,
                 'TicketId': ticket_id
             }
         )
@@ -99,6 +138,13 @@ def handler(event, context):
             'statusCode': 202
         }
     except Exception as ex:
+        if ticket_id is None:
+            # The claim is kept for a started ticket, even if its request could not be recorded
+            release_claim(matchmaking_request_table, player_id, start_time)
+        if isinstance(ex, ClientError) and ex.response['Error']['Code'] == 'ThrottlingException':
+            # Other callers of StartMatchmaking in the account use up its rate
+            print(f'GameLift throttled StartMatchmaking. PlayerId: {player_id}')
+            return to_too_many_requests_response(get_retry_after_in_seconds(time.time(), 0))
         print(f'Error occurred when calling GameLift to start matchmaking. Exception: {ex}')
         return {
             # Error occurred when enqueuing matchmaking request
@@ -109,13 +155,22 @@ def handler(event, context):
         }
 
 
-def is_matchmaking_request_terminal(matchmaking_request):
-    return matchmaking_request['TicketStatus'] in [
-        MATCHMAKING_SUCCEEDED_STATUS,
-        MATCHMAKING_TIMED_OUT_STATUS,
-        MATCHMAKING_CANCELLED_STATUS,
-        MATCHMAKING_FAILED_STATUS
-    ]
+def to_too_many_requests_response(retry_after_in_seconds):
+    return {
+        'headers': {
+            'Content-Type': 'text/plain',
+            'Retry-After': str(retry_after_in_seconds)
+        },
+        'statusCode': 429  # Too Many Requests
+    }
+
+
+def release_claim(matchmaking_request_table, player_id, start_time):
+    """Releases the active ticket claimed by the request, which expires with the ticket if this fails"""
+    try:
+        release_active_ticket(matchmaking_request_table, player_id, start_time)
+    except Exception as ex:
+        print(f'Error occurred when releasing active ticket. PlayerId: {player_id}. Exception: {ex}')
 
 
 def get_region_to_latency_mapping(event):
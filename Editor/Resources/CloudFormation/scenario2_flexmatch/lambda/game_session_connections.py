@@ -0,0 +1,55 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# The connection info of a matched game session is shared by all players of the match, so it is stored once in a
+# GameSessionConnection item of the MatchmakingRequest table, and the requests of the players only refer to it by
+# their GameSessionArn. The item key cannot collide with a request, since player ids are Cognito subs.
+#
+# The requests referring to a game session started before it was matched, so the connection info, which expires as
+# long after it is recorded as the requests after they start, outlives them. It is only ever put with a later
+# expiration time, so that a late write of the same game session cannot make it expire first.
+
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from matchmaking_tickets import MATCHMAKING_REQUEST_TTL_IN_SECONDS
+
+GAME_SESSION_CONNECTION_KEY_PREFIX = '#GameSessionConnection#'
+GAME_SESSION_CONNECTION_ATTRIBUTES = ['IpAddress', 'DnsName', 'Port']
+
+
+def to_game_session_connection_key(game_session_arn):
+    return {
+        'PlayerId': f'{GAME_SESSION_CONNECTION_KEY_PREFIX}{game_session_arn}',
+        'StartTime': 0
+    }
+
+
+def put_game_session_connection(matchmaking_request_table, game_session_connection, now):
+    """
+    Records the connection info of a game session, which is the same for every player of the match
+    :param game_session_connection: mapping of GameSessionArn, IpAddress, DnsName and Port
+    """
+    item = to_game_session_connection_key(game_session_connection['GameSessionArn'])
+    expiration_time = now + MATCHMAKING_REQUEST_TTL_IN_SECONDS
+    item['ExpirationTime'] = expiration_time
+    for attribute in GAME_SESSION_CONNECTION_ATTRIBUTES:
+        item[attribute] = game_session_connection[attribute]
+    try:
+        matchmaking_request_table.put_item(
+            Item=item,
+            ConditionExpression=Attr('ExpirationTime').not_exists() | Attr('ExpirationTime').lt(expiration_time)
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise e
+        print(f"Connection info of game session: {game_session_connection['GameSessionArn']} is already recorded")
+
+
+def get_game_session_connection(matchmaking_request_table, game_session_arn):
+    """Returns the connection info of a game session, or None if it is not found"""
+    result = matchmaking_request_table.get_item(
+        Key=to_game_session_connection_key(game_session_arn),
+        ProjectionExpression=', '.join(GAME_SESSION_CONNECTION_ATTRIBUTES)
+    )
+    return result.get('Item')
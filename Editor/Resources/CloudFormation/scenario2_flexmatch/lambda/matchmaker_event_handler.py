@@ -1,107 +1,327 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
-import boto3
-from boto3.dynamodb.conditions import Key
-import os
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import json
 import time
 
+from active_tickets import release_active_ticket
+from aws_clients import call_with_worker_table, get_environment_variable, get_table, get_worker_tables
+from game_session_connections import put_game_session_connection
+from matchmaking_statistics import DEFAULT_FLUSH_INTERVAL_IN_SECONDS, MatchmakingStatistics, to_configuration_name, \
+    to_time_to_match_in_seconds
+from matchmaking_tickets import ACCEPTANCE_REQUIRED_TICKET_PROGRESS, PLACING_TICKET_PROGRESS, \
+    SEARCHING_TICKET_PROGRESS, to_matchmaking_request_key
+
 MATCHMAKING_STARTED_STATUS = 'MatchmakingStarted'
 MATCHMAKING_SUCCEEDED_STATUS = 'MatchmakingSucceeded'
 MATCHMAKING_TIMED_OUT_STATUS = 'MatchmakingTimedOut'
 MATCHMAKING_CANCELLED_STATUS = 'MatchmakingCancelled'
 MATCHMAKING_FAILED_STATUS = 'MatchmakingFailed'
+POTENTIAL_MATCH_CREATED_EVENT_TYPE = 'PotentialMatchCreated'
+ACCEPT_MATCH_COMPLETED_EVENT_TYPE = 'AcceptMatchCompleted'
+ACCEPTED_MATCH_ACCEPTANCE = 'Accepted'
+SQS_EVENT_SOURCE = 'aws:sqs'
+DEFAULT_PARALLELISM = 8
+UNKNOWN_CONFIGURATION_NAME = 'Unknown'
+
+# Times to match of the tickets completed by the warm container, flushed to the MatchmakingRequest table periodically
+matchmaking_statistics = MatchmakingStatistics()
 
 
 def handler(event, context):
     """
-    Handles game session event from GameLift FlexMatch. This function parses the event messages and updates all
-     related requests in the the MatchmakingPlacement DynamoDB table,
+    Handles game session events from GameLift FlexMatch. This function parses the event messages of all records in
+     the batch and updates all related requests in the the MatchmakingPlacement DynamoDB table,
      which will be looked up to fulfill game client's Results Requests.
-    :param event: lambda event containing game session event from GameLift queue
+
+    The connection info of each matched game session is written once, before the tickets of the match refer to it.
+     The tickets are updated by up to `Parallelism` concurrent writers, so that large matches become available to the
+     game clients in about the time of a single update.
+
+    Intermediate events that change the progress of a pending ticket are recorded in its TicketProgress attribute
+     (see `to_ticket_progress`), which the FlexMatch status poller uses to skip tickets being placed, and the
+     ResultsRequest function to have clients poll sooner.
+
+    The active ticket claimed by the game request of each ticket this function completes is released, so that the
+     player can start another game (see `active_tickets`).
+
+    The time to match of each ticket this function completes is added to the statistics of its configuration and
+     outcome, which are flushed every `StatisticsFlushIntervalInSeconds` (see `matchmaking_statistics`).
+
+    :param event: lambda event containing a batch of game session events from the MatchmakerEvent queue, or a game
+     session event from the MatchmakerEvent topic when the function is subscribed to it directly
     :param context: lambda context, not used by this function
-    :return: None
+    :return: the batch item failures, listing the message ids of the records to retry
     """
     lambda_start_time = round(time.time())
-    message = json.loads(event['Records'][0]['Sns']['Message'])
-    print(f'Handling FlexMatch event. StartTime: {lambda_start_time}. Message: {message}')
+    records = event['Records']
+    print(f'Handling FlexMatch events. StartTime: {lambda_start_time}. RecordCount: {len(records)}')
+
+    # Game sessions and tickets of all records are collected first, so that those found in several records are
+    # written once
+    game_session_connections = {}
+    ticket_updates = {}
+    ticket_configuration_names = {}
+    ticket_end_times = {}
+    failed_message_ids = set()
+    for record in records:
+        message_id = get_message_id(record)
+        try:
+            message = json.loads(get_message_body(record))
+            print(f'Handling FlexMatch event. MessageId: {message_id}. Message: {message}')
+            game_session_connection = to_game_session_connection(message)
+            if game_session_connection:
+                game_session_connections.setdefault(game_session_connection['GameSessionArn'],
+                                                    (game_session_connection, []))[1].append(message_id)
+            configuration_name = to_configuration_name(message['resources'][0]) if message.get('resources') \
+                else UNKNOWN_CONFIGURATION_NAME
+            event_time = to_event_time(message, lambda_start_time)
+            for ticket_id, attribute_updates in to_ticket_updates(message, lambda_start_time):
+                ticket_configuration_names[ticket_id] = configuration_name
+                previous_ticket_update = ticket_updates.get(ticket_id)
+                # Progress is replaced by any later event of the ticket, but a terminal status is final
+                if previous_ticket_update is None or 'TicketStatus' not in previous_ticket_update[0]:
+                    message_ids = previous_ticket_update[1] if previous_ticket_update else []
+                    ticket_updates[ticket_id] = (attribute_updates, message_ids)
+                    ticket_end_times[ticket_id] = event_time
+                ticket_updates[ticket_id][1].append(message_id)
+        except Exception as ex:
+            print(f'Error occurred when parsing FlexMatch event. MessageId: {message_id}. Exception: {ex}')
+            failed_message_ids.add(message_id)
+
+    if ticket_updates:
+        matchmaking_request_table_name = get_environment_variable('MatchmakingRequestTableName')
+        parallelism = int(get_environment_variable('Parallelism', DEFAULT_PARALLELISM))
+
+        # The workers each borrow a table, and this thread uses its own
+        matchmaking_request_table = get_table(matchmaking_request_table_name)
+        worker_tables = get_worker_tables(matchmaking_request_table_name, parallelism)
+
+        with ThreadPoolExecutor(max_workers=min(parallelism, len(ticket_updates))) as executor:
+            put_futures = {
+                executor.submit(call_with_worker_table, worker_tables, put_game_session_connection,
+                                game_session_connection, lambda_start_time): (game_session_arn, message_ids)
+                for game_session_arn, (game_session_connection, message_ids) in game_session_connections.items()
+            }
+            failed_game_session_arns = set()
+            for put_future, (game_session_arn, message_ids) in put_futures.items():
+                try:
+                    put_future.result()
+                except Exception as ex:
+                    print(f'Error occurred when recording game session: {game_session_arn}. Exception: {ex}')
+                    failed_game_session_arns.add(game_session_arn)
+                    failed_message_ids.update(message_ids)
+
+            update_futures = {
+                executor.submit(call_with_worker_table, worker_tables, update_matchmaking_request, ticket_id,
+                                attribute_updates):
+                    (ticket_id, message_ids)
+                for ticket_id, (attribute_updates, message_ids) in ticket_updates.items()
+                if attribute_updates.get('GameSessionArn', {}).get('Value') not in failed_game_session_arns
+            }
+            for update_future, (ticket_id, message_ids) in update_futures.items():
+                try:
+                    updated = update_future.result()
+                except Exception as ex:
+                    print(f'Error occurred when updating ticket: {ticket_id}. Exception: {ex}')
+                    failed_message_ids.update(message_ids)
+                    continue
+                ticket_status = ticket_updates[ticket_id][0].get('TicketStatus', {}).get('Value')
+                if updated and ticket_status is not None:
+                    start_time = to_matchmaking_request_key(ticket_id)['StartTime']
+                    matchmaking_statistics.record(ticket_configuration_names[ticket_id], ticket_status,
+                                                  to_time_to_match_in_seconds(start_time, ticket_end_times[ticket_id]),
+                                                  lambda_start_time)
+
+        flush_interval = int(get_environment_variable('StatisticsFlushIntervalInSeconds',
+                                                      DEFAULT_FLUSH_INTERVAL_IN_SECONDS))
+        matchmaking_statistics.flush(matchmaking_request_table, lambda_start_time, flush_interval)
+
+    if failed_message_ids and not is_sqs_event(event):
+        # SNS invokes the function asynchronously, and retries the invocation only when it fails
+        raise RuntimeError(f'Failed to process FlexMatch events: {sorted(failed_message_ids)}')
+
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in sorted(failed_message_ids)]
+    }
 
+
+def to_ticket_updates(message, lambda_start_time):
+    """
+    Returns the (ticket id, attribute updates) pairs for the tickets of a FlexMatch event, or no pairs if the event
+     neither is terminal nor changes the progress of the tickets
+    """
     status_type = message['detail']['type']
 
     if status_type not in [MATCHMAKING_SUCCEEDED_STATUS, MATCHMAKING_TIMED_OUT_STATUS, MATCHMAKING_CANCELLED_STATUS,
                            MATCHMAKING_FAILED_STATUS]:
-        print(f'Received non-terminal status type: {status_type}. Skip processing.')
-        return
+        ticket_progress = to_ticket_progress(message['detail'])
+        if ticket_progress is None:
+            print(f'Received non-terminal status type: {status_type}. Skip processing.')
+            return []
+        return [(ticket['ticketId'], {
+            'TicketProgress': {
+                'Value': ticket_progress
+            },
+            'LastUpdatedTime': {
+                'Value': lambda_start_time
+            }
+        }) for ticket in message['detail']['tickets']]
 
     tickets = message['detail']['tickets']
-    ip_address = message['detail']['gameSessionInfo'].get('ipAddress')
-    dns_name = message['detail']['gameSessionInfo'].get('dnsName')
-    port = str(message['detail']['gameSessionInfo'].get('port'))
     game_session_arn = str(message['detail']['gameSessionInfo'].get('gameSessionArn'))
     players = message['detail']['gameSessionInfo']['players']
     players_map = {player.get('playerId'):player.get('playerSessionId') for player in players}
 
-    ticket_id_index_name = os.environ['TicketIdIndexName']
-
-    matchmaking_request_table_name = os.environ['MatchmakingRequestTableName']
-    dynamodb = boto3.resource('dynamodb')
-    matchmaking_request_table = dynamodb.Table(matchmaking_request_table_name)
-
+    ticket_updates = []
     for ticket in tickets:
         ticket_id = ticket['ticketId']
-        matchmaking_requests = matchmaking_request_table.query(
-            IndexName=ticket_id_index_name,
-            KeyConditionExpression=Key('TicketId').eq(ticket_id)
-        )
-
-        if matchmaking_requests['Count'] <= 0:
-            print(f"Cannot find matchmaking request with ticket id: {ticket_id}")
-            continue
-
-        matchmaking_request_status = matchmaking_requests['Items'][0]['TicketStatus']
-        player_id = matchmaking_requests['Items'][0]['PlayerId']
-        player_session_id = players_map.get(player_id)
-        print(f'Processing Ticket: {ticket_id}, PlayerId: {player_id}, PlayerSessionId: {player_session_id}')
-        matchmaking_request_start_time = matchmaking_requests['Items'][0]['StartTime']
-
-        if matchmaking_request_status != MATCHMAKING_STARTED_STATUS:
-            print(f"Unexpected TicketStatus on matchmaking request. Expected: 'MatchmakingStarted'. "
-                  f"Found: {matchmaking_request_status}")
-            continue
-
         attribute_updates = {
             'TicketStatus': {
                 'Value': status_type
             },
+            'PendingTicketStatus': {
+                'Action': 'DELETE'
+            },
+            'TicketProgress': {
+                'Action': 'DELETE'
+            },
             'LastUpdatedTime': {
                 'Value': lambda_start_time
             }
         }
 
         if status_type == MATCHMAKING_SUCCEEDED_STATUS:
+            matchmaking_request_key = to_matchmaking_request_key(ticket_id)
+            player_id = matchmaking_request_key['PlayerId'] if matchmaking_request_key else None
             attribute_updates.update({
-                'IpAddress': {
-                    'Value': ip_address
-                },
-                'DnsName': {
-                    'Value': dns_name
-                },
-                'Port': {
-                    'Value': port
-                },
                 'GameSessionArn': {
                     'Value': game_session_arn
                 },
                 'PlayerSessionId': {
-                    'Value': player_session_id
+                    'Value': players_map.get(player_id)
                 }
             })
 
+        ticket_updates.append((ticket_id, attribute_updates))
+    return ticket_updates
+
+
+def to_event_time(message, default):
+    """
+    Returns the epoch seconds FlexMatch sent the event at, rather than when it was delivered, which SQS batching and
+     redeliveries delay, or the default if the event has no time
+    """
+    if 'time' not in message:
+        return default
+    # FlexMatch events are timestamped in UTC, with a Z suffix fromisoformat does not parse
+    return datetime.fromisoformat(message['time'].replace('Z', '+00:00')).timestamp()
+
+
+def to_ticket_progress(event_detail):
+    """
+    Returns the progress of the tickets of an intermediate FlexMatch event, or None if the event does not change it.
+     Tickets start searching when they are created, so MatchmakingSearching events are only recorded as the outcome of
+     a rejected match, and AcceptMatch events, sent as each player accepts, are not recorded at all.
+    """
+    status_type = event_detail['type']
+    if status_type == POTENTIAL_MATCH_CREATED_EVENT_TYPE:
+        if event_detail.get('acceptanceRequired'):
+            return ACCEPTANCE_REQUIRED_TICKET_PROGRESS
+        return PLACING_TICKET_PROGRESS
+    if status_type == ACCEPT_MATCH_COMPLETED_EVENT_TYPE:
+        if event_detail.get('acceptance') == ACCEPTED_MATCH_ACCEPTANCE:
+            return PLACING_TICKET_PROGRESS
+        return SEARCHING_TICKET_PROGRESS
+    return None
+
+
+def to_game_session_connection(message):
+    """Returns the connection info of the game session matched in a FlexMatch event, or None if there is no match"""
+    if message['detail']['type'] != MATCHMAKING_SUCCEEDED_STATUS:
+        return None
+
+    game_session_info = message['detail']['gameSessionInfo']
+    return {
+        'GameSessionArn': str(game_session_info.get('gameSessionArn')),
+        'IpAddress': game_session_info.get('ipAddress'),
+        'DnsName': game_session_info.get('dnsName'),
+        'Port': str(game_session_info.get('port'))
+    }
+
+
+def update_matchmaking_request(matchmaking_request_table, ticket_id, attribute_updates):
+    """
+    Returns whether the matchmaking request of the ticket was updated, rather than found already terminal. The active
+     ticket of the player is released once the request is terminal, also when it was found already terminal, since the
+     event may be redelivered after the release of the update failed.
+    """
+    matchmaking_request_key = to_matchmaking_request_key(ticket_id)
+
+    if matchmaking_request_key is None:
+        # Tickets started before ticket ids embedded the request key are updated by the FlexMatch status poller
+        print(f"Cannot find matchmaking request key in ticket id: {ticket_id}. Skip processing.")
+        return False
+
+    player_id = matchmaking_request_key['PlayerId']
+    player_session_id = attribute_updates.get('PlayerSessionId', {}).get('Value')
+    print(f'Processing Ticket: {ticket_id}, PlayerId: {player_id}, PlayerSessionId: {player_session_id}')
+
+    try:
         matchmaking_request_table.update_item(
-            Key={
-                'PlayerId': player_id,
-                'StartTime': matchmaking_request_start_time
-            },
-            AttributeUpdates=attribute_updates
+            Key=matchmaking_request_key,
+            AttributeUpdates=attribute_updates,
+            Expected={
+                'TicketId': {
+                    'Value': ticket_id,
+                    'ComparisonOperator': 'EQ'
+                },
+                'TicketStatus': {
+                    'Value': MATCHMAKING_STARTED_STATUS,
+                    'ComparisonOperator': 'EQ'
+                }
+            }
         )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            print(f"Cannot find matchmaking request with ticket id: {ticket_id} "
+                  f"and TicketStatus: 'MatchmakingStarted'. Skip processing.")
+            if 'TicketStatus' in attribute_updates and is_terminal(matchmaking_request_table, matchmaking_request_key,
+                                                                   ticket_id):
+                release_active_ticket(matchmaking_request_table, player_id, matchmaking_request_key['StartTime'])
+            return False
+        raise e
+    if 'TicketStatus' in attribute_updates:
+        release_active_ticket(matchmaking_request_table, player_id, matchmaking_request_key['StartTime'])
+    return True
+
+
+def is_terminal(matchmaking_request_table, matchmaking_request_key, ticket_id):
+    """Returns whether the matchmaking request of the ticket has a terminal status"""
+    matchmaking_request = matchmaking_request_table.get_item(
+        Key=matchmaking_request_key,
+        ProjectionExpression='TicketId, TicketStatus',
+        ConsistentRead=True
+    ).get('Item')
+    return matchmaking_request is not None and matchmaking_request.get('TicketId') == ticket_id \
+        and matchmaking_request.get('TicketStatus') != MATCHMAKING_STARTED_STATUS
+
+
+def is_sqs_event(event):
+    return all(record.get('eventSource') == SQS_EVENT_SOURCE for record in event['Records'])
+
+
+def get_message_id(record):
+    if record.get('eventSource') == SQS_EVENT_SOURCE:
+        return record['messageId']
+    return record['Sns']['MessageId']
+
+
+def get_message_body(record):
+    # The MatchmakerEvent queue subscription uses raw message delivery, so the body is the FlexMatch event itself
+    if record.get('eventSource') == SQS_EVENT_SOURCE:
+        return record['body']
+    return record['Sns']['Message']
@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# StartMatchmaking calls are admitted within a budget of transactions per second, shared by all the invocations of the
+# game request function, so that launch spikes are shaped to the rate GameLift accepts instead of being throttled.
+# Each second of a matchmaking configuration is a bucket of `budget` tokens, an item of the on-demand
+# MatchmakingAdmission table counting the tokens taken. A token is taken with a single conditional write, an atomic
+# counter that creates the bucket of the second if it does not exist yet, and fails if the bucket is empty. The
+# buckets are kept apart from the provisioned MatchmakingRequest table, so that spikes of game requests are not
+# throttled by its write capacity. A request takes a token of the current second, or else waits for a token of the
+# next seconds, up to a maximum queue time, and is shed with a Retry-After once those are taken as well.
+
+from botocore.exceptions import ClientError
+import math
+import time
+
+DEFAULT_START_MATCHMAKING_TPS = 10
+DEFAULT_MAX_QUEUE_TIME_IN_SECONDS = 1
+# Token buckets are only read within their second, then expire
+TOKEN_BUCKET_TTL_IN_SECONDS = 60
+
+
+class MatchmakingAdmission:
+    """
+    Token buckets of the seconds a warm container found empty, so that its next requests skip them instead of
+     writing to them again
+    """
+
+    def __init__(self):
+        self._empty_buckets = set()
+
+    def admit(self, matchmaking_admission_table, configuration_name, budget, now, max_queue_time):
+        """
+        Takes a StartMatchmaking token of the current second, or else of the first of the next seconds within
+         `max_queue_time` with one left.
+        :return: the time the token can be used from, `now` or the start of a later second, or None if there is none
+        """
+        first_second = math.floor(now)
+        for second in range(first_second, math.floor(now + max_queue_time) + 1):
+            if (configuration_name, second) in self._empty_buckets:
+                continue
+            if take_token(matchmaking_admission_table, configuration_name, second, budget):
+                return max(now, second)
+            # Buckets of the seconds before this one are no longer taken from
+            self._empty_buckets = {(name, empty_second) for name, empty_second in self._empty_buckets
+                                   if empty_second >= first_second} | {(configuration_name, second)}
+        return None
+
+
+def take_token(matchmaking_admission_table, configuration_name, second, budget):
+    """
+    Takes a token from the bucket of the second, starting the bucket if it is the first token of the second
+    :return: False if the budget of the second is all taken
+    """
+    try:
+        matchmaking_admission_table.update_item(
+            Key={
+                'ConfigurationName': configuration_name,
+                'Second': second
+            },
+            AttributeUpdates={
+                'TokenCount': {
+                    'Value': 1,
+                    'Action': 'ADD'
+                },
+                'ExpirationTime': {
+                    'Value': second + TOKEN_BUCKET_TTL_IN_SECONDS
+                }
+            },
+            # Only a new bucket has no expiration time yet
+            Expected={
+                'TokenCount': {
+                    'Value': budget,
+                    'ComparisonOperator': 'LT'
+                },
+                'ExpirationTime': {
+                    'ComparisonOperator': 'NULL'
+                }
+            },
+            ConditionalOperator='OR'
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise e
+        return False
+
+
+def get_retry_after_in_seconds(now, max_queue_time):
+    """Returns the whole seconds after which a shed request can be retried, once the seconds it queued for passed"""
+    return max(1, math.ceil(math.floor(now + max_queue_time) + 1 - now))
+
+
+def wait_until(admission_time):
+    delay = admission_time - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
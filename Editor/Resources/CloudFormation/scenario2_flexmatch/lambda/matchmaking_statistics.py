@@ -0,0 +1,170 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Time to match statistics, kept per matchmaking configuration and outcome in the MatchmakingRequest table. Each item
+# holds the histogram of the times to match of the tickets that reached the outcome during a time window, and functions
+# add the tickets they complete to it with atomic counters, so that any number of them can flush concurrently.
+
+from boto3.dynamodb.conditions import Key
+import math
+import threading
+
+# Player ids are Cognito subs, which never start with '#'
+MATCHMAKING_STATISTICS_KEY_PREFIX = '#MatchmakingStatistics#'
+WINDOW_IN_SECONDS = 5 * 60  # 5 minutes
+RETENTION_IN_SECONDS = 24 * 60 * 60  # 1 day
+DEFAULT_FLUSH_INTERVAL_IN_SECONDS = 60
+# Quantiles are estimated within this relative error, with buckets whose bounds grow by a constant factor
+RELATIVE_ACCURACY = 0.05
+BUCKET_GROWTH_FACTOR = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Times to match are capped, which bounds the number of buckets to about 80
+MAX_TIME_TO_MATCH_IN_SECONDS = 3600
+MAX_BUCKET_INDEX = math.ceil(math.log(MAX_TIME_TO_MATCH_IN_SECONDS) / math.log(BUCKET_GROWTH_FACTOR))
+BUCKET_ATTRIBUTE_PREFIX = 'B'
+
+
+class TimeToMatchSketch:
+    """
+    Histogram of times to match in buckets of exponentially growing width, from which quantiles are estimated within
+     `RELATIVE_ACCURACY`, in bounded memory.
+    :param bucket_counts: mapping of bucket index to the number of times to match in the bucket
+    """
+
+    def __init__(self, bucket_counts=None):
+        self.bucket_counts = dict(bucket_counts or {})
+
+    def add(self, time_to_match_in_seconds, count=1):
+        bucket_index = to_bucket_index(time_to_match_in_seconds)
+        self.bucket_counts[bucket_index] = self.bucket_counts.get(bucket_index, 0) + count
+
+    def merge(self, other):
+        for bucket_index, count in other.bucket_counts.items():
+            self.bucket_counts[bucket_index] = self.bucket_counts.get(bucket_index, 0) + count
+
+    def count(self):
+        return sum(self.bucket_counts.values())
+
+    def quantile(self, q):
+        """Returns the estimated q-quantile of the times to match in seconds, or None if the sketch is empty"""
+        rank = q * (self.count() - 1)
+        cumulative_count = 0
+        for bucket_index in sorted(self.bucket_counts):
+            cumulative_count += self.bucket_counts[bucket_index]
+            if cumulative_count > rank:
+                return from_bucket_index(bucket_index)
+        return None
+
+
+class MatchmakingStatistics:
+    """
+    Times to match recorded by a warm container since its last flush, per configuration and outcome. They are kept in
+     memory and flushed once the oldest of them is `flush_interval` old, so that a busy container writes each
+     statistics item at most once per interval, and a container recycled before it flushes loses at most an interval
+     of them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sketches = {}
+        self._oldest_record_time = None
+
+    def record(self, configuration_name, outcome, time_to_match_in_seconds, now):
+        with self._lock:
+            self._sketches.setdefault((configuration_name, outcome), TimeToMatchSketch()).add(time_to_match_in_seconds)
+            if self._oldest_record_time is None:
+                self._oldest_record_time = now
+
+    def flush(self, matchmaking_request_table, now, flush_interval=DEFAULT_FLUSH_INTERVAL_IN_SECONDS):
+        """
+        Adds the recorded times to match to the statistics item of the current window, if the oldest of them is due.
+         Sketches that fail to be written are kept for the next flush.
+        """
+        with self._lock:
+            if self._oldest_record_time is None or now - self._oldest_record_time < flush_interval:
+                return
+            sketches = self._sketches
+            self._sketches = {}
+            self._oldest_record_time = None
+
+        window_start_time = now - now % WINDOW_IN_SECONDS
+        for (configuration_name, outcome), sketch in sketches.items():
+            try:
+                add_time_to_match_sketch(matchmaking_request_table, configuration_name, outcome, window_start_time,
+                                         sketch)
+            except Exception as ex:
+                print(f'Error occurred when flushing time to match statistics of {configuration_name} {outcome}. '
+                      f'Exception: {ex}')
+                with self._lock:
+                    self._sketches.setdefault((configuration_name, outcome), TimeToMatchSketch()).merge(sketch)
+                    if self._oldest_record_time is None:
+                        self._oldest_record_time = now
+
+
+def add_time_to_match_sketch(matchmaking_request_table, configuration_name, outcome, window_start_time, sketch):
+    attribute_updates = {
+        f'{BUCKET_ATTRIBUTE_PREFIX}{bucket_index}': {
+            'Value': count,
+            'Action': 'ADD'
+        } for bucket_index, count in sketch.bucket_counts.items()
+    }
+    attribute_updates['ExpirationTime'] = {
+        'Value': window_start_time + RETENTION_IN_SECONDS
+    }
+    matchmaking_request_table.update_item(
+        Key={
+            'PlayerId': to_matchmaking_statistics_key(configuration_name, outcome),
+            'StartTime': window_start_time
+        },
+        AttributeUpdates=attribute_updates
+    )
+
+
+def get_time_to_match_sketch(matchmaking_request_table, configuration_name, outcome, since):
+    """Returns the sketch of the times to match of the tickets that reached the outcome in the windows since a time"""
+    query_parameters = {
+        'KeyConditionExpression': Key('PlayerId').eq(to_matchmaking_statistics_key(configuration_name, outcome))
+        & Key('StartTime').gt(since - WINDOW_IN_SECONDS)
+    }
+    sketch = TimeToMatchSketch()
+    while True:
+        statistics_items = matchmaking_request_table.query(**query_parameters)
+        for statistics_item in statistics_items['Items']:
+            sketch.merge(TimeToMatchSketch({
+                int(name[len(BUCKET_ATTRIBUTE_PREFIX):]): int(count) for name, count in statistics_item.items()
+                if name.startswith(BUCKET_ATTRIBUTE_PREFIX) and name[len(BUCKET_ATTRIBUTE_PREFIX):].isdigit()
+            }))
+        if 'LastEvaluatedKey' not in statistics_items:
+            return sketch
+        query_parameters['ExclusiveStartKey'] = statistics_items['LastEvaluatedKey']
+
+
+def to_matchmaking_statistics_key(configuration_name, outcome):
+    return f'{MATCHMAKING_STATISTICS_KEY_PREFIX}{configuration_name}#{outcome}'
+
+
+def to_time_to_match_in_seconds(start_time, end_time):
+    """
+    Returns the whole seconds a ticket took to reach its outcome, rounded the same way by every function recording it
+    :param start_time: epoch seconds the matchmaking request was started at
+    :param end_time: epoch seconds the ticket reached its outcome at, as reported by FlexMatch
+    """
+    return max(0, round(end_time - int(start_time)))
+
+
+def to_configuration_name(configuration_arn):
+    """Returns the name of a matchmaking configuration from its ARN"""
+    return configuration_arn.rpartition('/')[2]
+
+
+def to_bucket_index(time_to_match_in_seconds):
+    if time_to_match_in_seconds <= 1:
+        return 0
+    bucket_index = math.ceil(math.log(time_to_match_in_seconds) / math.log(BUCKET_GROWTH_FACTOR))
+    return min(bucket_index, MAX_BUCKET_INDEX)
+
+
+def from_bucket_index(bucket_index):
+    """Returns the value of a bucket, the point of least relative error to its bounds"""
+    if bucket_index == 0:
+        return 1
+    return 2 * BUCKET_GROWTH_FACTOR ** bucket_index / (BUCKET_GROWTH_FACTOR + 1)
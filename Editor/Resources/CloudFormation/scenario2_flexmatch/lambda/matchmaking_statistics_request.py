@@ -0,0 +1,74 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import time
+
+from aws_clients import get_environment_variable, get_table
+from matchmaking_statistics import RETENTION_IN_SECONDS, get_time_to_match_sketch
+
+DEFAULT_PERIOD_IN_SECONDS = 60 * 60  # 1 hour
+OUTCOMES = ['MatchmakingSucceeded', 'MatchmakingTimedOut', 'MatchmakingCancelled', 'MatchmakingFailed']
+QUANTILES = {
+    'P50': 0.5,
+    'P95': 0.95,
+    'P99': 0.99
+}
+
+
+def handler(event, context):
+    """
+    Handles requests to describe the time to match of recent matchmaking requests.
+     This function reads the time to match statistics flushed by the MatchmakerEventHandler and FlexMatchStatusPoller
+     functions, and returns their count and percentiles per outcome, for the matchmaking configuration of the game.
+    :param event: lambda event, contains the period to describe in seconds in the optional `periodInSeconds` key,
+     up to the statistics retention of a day
+    :param context: lambda context, not used by this function
+    :return:
+     - 200 (OK) with the "ConfigurationName", the "PeriodInSeconds", and the "Count", "P50", "P95" and "P99" times to
+      match in seconds of each outcome in "Outcomes"
+    """
+    now = round(time.time())
+    period = get_period_in_seconds(event)
+
+    matchmaking_request_table_name = get_environment_variable('MatchmakingRequestTableName')
+    matchmaking_configuration_name = get_environment_variable('MatchmakingConfigurationName')
+    matchmaking_request_table = get_table(matchmaking_request_table_name)
+
+    print(f'Handling matchmaking statistics request. Configuration: {matchmaking_configuration_name}, '
+          f'Period: {period}')
+
+    outcomes = {}
+    for outcome in OUTCOMES:
+        sketch = get_time_to_match_sketch(matchmaking_request_table, matchmaking_configuration_name, outcome,
+                                          now - period)
+        outcomes[outcome] = {'Count': sketch.count()}
+        for name, q in QUANTILES.items():
+            quantile = sketch.quantile(q)
+            outcomes[outcome][name] = round(quantile, 1) if quantile is not None else None
+
+    return {
+        'body': json.dumps({
+            'ConfigurationName': matchmaking_configuration_name,
+            'PeriodInSeconds': period,
+            'Outcomes': outcomes
+        }),
+        'headers': {
+            'Content-Type': 'text/plain'
+        },
+        'statusCode': 200
+    }
+
+
+def get_period_in_seconds(event):
+    request_body = event.get("body")
+    if not request_body:
+        return DEFAULT_PERIOD_IN_SECONDS
+
+    try:
+        period = int(json.loads(request_body).get('periodInSeconds', DEFAULT_PERIOD_IN_SECONDS))
+    except (AttributeError, TypeError, ValueError):
+        print(f"Error parsing request body: {request_body}")
+        return DEFAULT_PERIOD_IN_SECONDS
+
+    return max(1, min(period, RETENTION_IN_SECONDS))
@@ -0,0 +1,30 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Matchmaking ticket ids embed the key of their MatchmakingRequest item, so that the item of a ticket in a FlexMatch
+# event can be updated directly, without looking it up by ticket id first. Player ids are Cognito subs, which never
+# contain the separator.
+TICKET_ID_SEPARATOR = '.'
+# MatchmakingRequest items expire this long after they start
+MATCHMAKING_REQUEST_TTL_IN_SECONDS = 10 * 60  # 10 minutes
+
+
+def to_ticket_id(player_id, start_time):
+    return f'{player_id}{TICKET_ID_SEPARATOR}{start_time}'
+
+
+def to_matchmaking_request_key(ticket_id):
+    """Returns the MatchmakingRequest item key embedded in a ticket id, or None if the ticket id has no key"""
+    player_id, separator, start_time = ticket_id.rpartition(TICKET_ID_SEPARATOR)
+    if not separator or not start_time.isdigit():
+        return None
+    return {
+        'PlayerId': player_id,
+        'StartTime': int(start_time)
+    }
+
+# Progress of a pending ticket, recorded from the intermediate FlexMatch events in the TicketProgress attribute of its
+# MatchmakingRequest item. Tickets without progress are searching for a match.
+SEARCHING_TICKET_PROGRESS = 'Searching'
+ACCEPTANCE_REQUIRED_TICKET_PROGRESS = 'AcceptanceRequired'
+PLACING_TICKET_PROGRESS = 'Placing'
@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import math
+
+from matchmaking_statistics import get_time_to_match_sketch
+
+DEFAULT_RETRY_AFTER_IN_SECONDS = 5
+MIN_RETRY_AFTER_IN_SECONDS = 1
+MAX_RETRY_AFTER_IN_SECONDS = 15
+# Placements usually complete within seconds of the match
+PLACING_RETRY_AFTER_IN_SECONDS = 1
+# Share of the ticket age to wait between polls once the expected time to match has passed
+OVERDUE_RETRY_AFTER_RATIO = 0.1
+MIN_TIME_TO_MATCH_SAMPLE_COUNT = 5
+MATCHMAKING_SUCCEEDED_STATUS = 'MatchmakingSucceeded'
+# Times to match of the tickets that succeeded within this period make up the estimates
+DEFAULT_TIME_TO_MATCH_PERIOD_IN_SECONDS = 15 * 60  # 15 minutes
+# Matchmaking statistics are flushed about every minute, so estimates are read again as often
+DEFAULT_TIME_TO_MATCH_TTL_IN_SECONDS = 60
+
+
+class TimeToMatchQuantile:
+    """
+    Quantile of the times to match of the tickets of a matchmaking configuration that succeeded recently, read from the
+     matchmaking statistics flushed by the MatchmakerEventHandler and FlexMatchStatusPoller functions (see
+     `matchmaking_statistics`). The warm container keeps it for `ttl_in_seconds`, so that the statistics are read about
+     once per flush rather than on every request.
+    :param q: quantile of the times to match, between 0 and 1
+    :param period_in_seconds: period of the times to match the quantile is estimated from
+    :param min_sample_count: number of times to match needed in the period before there is an estimate
+    """
+
+    def __init__(self, q, ttl_in_seconds=DEFAULT_TIME_TO_MATCH_TTL_IN_SECONDS,
+                 period_in_seconds=DEFAULT_TIME_TO_MATCH_PERIOD_IN_SECONDS,
+                 min_sample_count=MIN_TIME_TO_MATCH_SAMPLE_COUNT):
+        self.q = q
+        self.ttl_in_seconds = ttl_in_seconds
+        self.period_in_seconds = period_in_seconds
+        self.min_sample_count = min_sample_count
+        self._estimate = None
+        self._read_time = None
+
+    def get(self, matchmaking_request_table, configuration_name, now):
+        """Returns the estimated time to match in seconds, or None if too few tickets succeeded recently"""
+        if self._read_time is not None and now - self._read_time < self.ttl_in_seconds:
+            return self._estimate
+        try:
+            sketch = get_time_to_match_sketch(matchmaking_request_table, configuration_name,
+                                              MATCHMAKING_SUCCEEDED_STATUS, now - self.period_in_seconds)
+            self._estimate = sketch.quantile(self.q) if sketch.count() >= self.min_sample_count else None
+        except Exception as ex:
+            # The previous estimate is kept until the next read
+            print(f'Error occurred when reading time to match statistics of {configuration_name}. Exception: {ex}')
+        self._read_time = now
+        return self._estimate
+
+
+def get_retry_after_in_seconds(ticket_age, estimated_wait_time=None, time_to_match_estimate=None, placing=False):
+    """
+    Returns the whole seconds a client should wait before polling again for the result of a pending ticket.
+
+    The ticket is not expected to match before the lowest of the estimates, and clients poll again right after it.
+     Once it has passed, the wait grows with the age of the ticket, as long running tickets are as likely to time out
+     as to match in the next few seconds.
+    :param ticket_age: seconds since the ticket was started
+    :param estimated_wait_time: seconds to match estimated by GameLift for the ticket, if any
+    :param time_to_match_estimate: seconds to match estimated from recent matches, if any
+    :param placing: whether the ticket was matched and its game session is being placed
+    """
+    if placing:
+        return PLACING_RETRY_AFTER_IN_SECONDS
+
+    estimates = [estimate for estimate in (estimated_wait_time, time_to_match_estimate) if estimate is not None]
+    if not estimates:
+        return DEFAULT_RETRY_AFTER_IN_SECONDS
+
+    retry_after = min(estimates) - ticket_age
+    if retry_after <= 0:
+        retry_after = ticket_age * OVERDUE_RETRY_AFTER_RATIO
+    return max(MIN_RETRY_AFTER_IN_SECONDS, min(MAX_RETRY_AFTER_IN_SECONDS, math.ceil(retry_after)))
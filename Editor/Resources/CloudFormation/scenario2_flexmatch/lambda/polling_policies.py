@@ -0,0 +1,74 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import bisect
+
+FIXED_INTERVAL_POLICY_NAME = 'FixedInterval'
+BACKOFF_POLICY_NAME = 'Backoff'
+DEFAULT_INITIAL_INTERVAL_IN_SECONDS = 30
+DEFAULT_BACKOFF_MULTIPLIER = 2
+# Two runs of the poller, which is scheduled every minute, so that a ticket whose events are lost is detected within
+# minutes however long it waits
+DEFAULT_MAX_INTERVAL_IN_SECONDS = 2 * 60  # 2 minutes
+DEFAULT_FINAL_WINDOW_IN_SECONDS = 60
+DEFAULT_FINAL_INTERVAL_IN_SECONDS = 30
+
+
+class FixedIntervalPollingPolicy:
+    """Polls a ticket at a fixed interval after it started"""
+
+    def __init__(self, interval_in_seconds=DEFAULT_INITIAL_INTERVAL_IN_SECONDS):
+        self.interval_in_seconds = interval_in_seconds
+
+    def poll_count(self, age_in_seconds):
+        """Returns the number of polls scheduled for a ticket up to the given age"""
+        return max(0, int(age_in_seconds // self.interval_in_seconds))
+
+
+class BackoffPollingPolicy:
+    """
+    Polls a ticket at the initial interval until `backoff_start_in_seconds`, by when most tickets matched, then at
+    intervals growing exponentially with the number of polls, so that long waiting tickets are polled less often.
+    Within the final window before the matchmaking timeout, and after it while the match is being placed, the ticket is
+    polled at the final interval again, since it is then likely to reach a terminal status.
+    """
+
+    def __init__(self, timeout_in_seconds, initial_interval_in_seconds=DEFAULT_INITIAL_INTERVAL_IN_SECONDS,
+                 multiplier=DEFAULT_BACKOFF_MULTIPLIER, max_interval_in_seconds=DEFAULT_MAX_INTERVAL_IN_SECONDS,
+                 final_window_in_seconds=DEFAULT_FINAL_WINDOW_IN_SECONDS,
+                 final_interval_in_seconds=DEFAULT_FINAL_INTERVAL_IN_SECONDS, backoff_start_in_seconds=None):
+        self.timeout_in_seconds = timeout_in_seconds
+        self.final_interval_in_seconds = final_interval_in_seconds
+        final_window_start = max(timeout_in_seconds - final_window_in_seconds, initial_interval_in_seconds)
+
+        # Poll ages are precomputed up to the timeout, so poll_count is a binary search
+        self._poll_ages = []
+        poll_age = initial_interval_in_seconds
+        interval = initial_interval_in_seconds
+        while poll_age < final_window_start:
+            self._poll_ages.append(poll_age)
+            if backoff_start_in_seconds is None or poll_age >= backoff_start_in_seconds:
+                interval = min(interval * multiplier, max_interval_in_seconds)
+            poll_age += interval
+        poll_age = final_window_start
+        while poll_age <= timeout_in_seconds:
+            self._poll_ages.append(poll_age)
+            poll_age += final_interval_in_seconds
+
+    def poll_count(self, age_in_seconds):
+        """Returns the number of polls scheduled for a ticket up to the given age"""
+        if age_in_seconds <= self.timeout_in_seconds:
+            return bisect.bisect_right(self._poll_ages, age_in_seconds)
+        return len(self._poll_ages) + int((age_in_seconds - self.timeout_in_seconds) // self.final_interval_in_seconds)
+
+
+def create_polling_policy(policy_name, timeout_in_seconds, time_to_match_estimate=None):
+    """
+    :param time_to_match_estimate: seconds by when most recent tickets matched, if known, after which the Backoff policy
+     starts backing off
+    """
+    if policy_name == FIXED_INTERVAL_POLICY_NAME:
+        return FixedIntervalPollingPolicy()
+    if policy_name == BACKOFF_POLICY_NAME:
+        return BackoffPollingPolicy(timeout_in_seconds, backoff_start_in_seconds=time_to_match_estimate)
+    raise ValueError(f'Unknown polling policy: {policy_name}')
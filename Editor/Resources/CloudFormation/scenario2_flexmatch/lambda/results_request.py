@@ -1,13 +1,34 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
-import boto3
-import os
 import json
+import time
 from boto3.dynamodb.conditions import Key
 
+from aws_clients import get_environment_variable, get_table
+from game_session_connections import GAME_SESSION_CONNECTION_ATTRIBUTES, get_game_session_connection
+from long_polling import DEFAULT_MAX_WAIT_TIME_IN_SECONDS, get_wait_time_in_seconds, poll_until
+from lru_cache import LruCache
+from matchmaking_tickets import PLACING_TICKET_PROGRESS
+from matchmaking_wait_times import TimeToMatchQuantile, get_retry_after_in_seconds
+
 MATCHMAKING_STARTED_STATUS = 'MatchmakingStarted'
 MATCHMAKING_SUCCEEDED_STATUS = 'MatchmakingSucceeded'
+GAME_SESSION_CONNECTION_CACHE_SIZE = 1000
+# Most matches take longer than the estimate, so that clients are rarely told to wait past their result
+TIME_TO_MATCH_ESTIMATE_QUANTILE = 0.1
+# Attributes of the latest matchmaking request used to answer the results request, including the connection info of
+# requests that succeeded before it was stored per game session
+MATCHMAKING_REQUEST_RESULT_ATTRIBUTES = ['StartTime', 'TicketStatus', 'TicketProgress', 'EstimatedWaitTime',
+                                         'PlayerSessionId', 'GameSessionArn',
+                                         *GAME_SESSION_CONNECTION_ATTRIBUTES]
+PENDING_MATCHMAKING_REQUEST_ATTRIBUTES = ['StartTime', 'TicketStatus', 'TicketProgress', 'EstimatedWaitTime']
+
+# The connection info of a game session never changes, so it is cached across the invocations of a warm container,
+# where the players of a match polling for their results share it
+game_session_connection_cache = LruCache(GAME_SESSION_CONNECTION_CACHE_SIZE)
+# Low quantile of the recent times to match of the configuration, used to tell clients when to poll again
+time_to_match_estimate = TimeToMatchQuantile(TIME_TO_MATCH_ESTIMATE_QUANTILE)
 
 
 def handler(event, context):
@@ -15,30 +36,71 @@ def handler(event, context):
     Handles requests to describe the game session connection information after a StartGame request.
      This function will look up the MatchmakingRequest table to find a the latest matchmaking request
      by the player, and return its game connection information if any.
-    :param event: lambda event, contains the region to player latency mapping in `regionToLatencyMapping` key, as well
-     as the player information from the Cognito id tokens.
-    :param context: lambda context, not used by this function
+
+    Clients can opt in to long polling by sending `waitTimeInSeconds` in the request body, up to
+     `MaxWaitTimeInSeconds`. While the request is in progress, the function then re-reads its status with backoff
+     until it is terminal or the wait time runs out, and answers 204 (No Content) only then.
+
+    204 (No Content) answers carry a `Retry-After` header, the seconds until the result is likely, estimated from the
+     age of the ticket, the wait time GameLift estimated for it, and the recent times to match of the matchmaking
+     configuration in the matchmaking statistics (see `matchmaking_wait_times`). Clients of tickets being placed are
+     told to poll again shortly.
+
+    :param event: lambda event, contains the region to player latency mapping in `regionToLatencyMapping` key, and the
+     optional wait time in `waitTimeInSeconds` key, as well as the player information from the Cognito id tokens.
+    :param context: lambda context, used to stop waiting before the function times out
     :return:
      - 200 (OK) if the game connection is ready, along with server info: "IpAddress", "Port", "DnsName"
-     - 204 (No Content) if the requested game is still in progress of matchmaking
-     - 404 (Not Found) if no game has been started by the player, or if all started game were expired
+     - 204 (No Content) if the requested game is still in progress of matchmaking, with a "Retry-After" header
+     - 404 (Not Found) if no game has been started by the player, or if all started game were expired, including a
+       matched game whose connection info already expired
      - 500 (Internal Error) if errors occurred during matchmaking or placement
     """
     player_id = event["requestContext"]["authorizer"]["claims"]["sub"]
     print(f'Handling request result request. PlayerId: {player_id}')
 
-    matchmaking_request_table_name = os.environ['MatchmakingRequestTableName']
+    matchmaking_request_table_name = get_environment_variable('MatchmakingRequestTableName')
+    matchmaking_configuration_name = get_environment_variable('MatchmakingConfigurationName')
+    matchmaking_request_table = get_table(matchmaking_request_table_name)
+
+    start_time, response = describe_latest_matchmaking_request(matchmaking_request_table,
+                                                               matchmaking_configuration_name, player_id)
 
-    dynamodb = boto3.resource('dynamodb')
-    matchmaking_request_table = dynamodb.Table(matchmaking_request_table_name)
+    max_wait_time = float(get_environment_variable('MaxWaitTimeInSeconds', DEFAULT_MAX_WAIT_TIME_IN_SECONDS))
+    wait_time = get_wait_time_in_seconds(event, max_wait_time)
+    if response['statusCode'] == 204 and wait_time > 0:
+        print(f"Waiting up to {wait_time} seconds for matchmaking request started at: {start_time}")
+        pending_matchmaking_request = poll_until(
+            lambda: get_pending_matchmaking_request(matchmaking_request_table, player_id, start_time),
+            lambda request: request.get('TicketStatus') != MATCHMAKING_STARTED_STATUS,
+            wait_time,
+            context
+        )
+        if pending_matchmaking_request.get('TicketStatus') == MATCHMAKING_STARTED_STATUS:
+            response = to_pending_response(matchmaking_request_table, matchmaking_configuration_name,
+                                           pending_matchmaking_request, time.time())
+        else:
+            start_time, response = describe_latest_matchmaking_request(matchmaking_request_table,
+                                                                       matchmaking_configuration_name, player_id)
+    return response
 
+
+def describe_latest_matchmaking_request(matchmaking_request_table, matchmaking_configuration_name, player_id):
+    """
+    Returns the start time of the latest matchmaking request of the player, or None if there is none, and the response
+     describing its result
+    """
+    # Only the latest request of the player is read, so that each poll costs a single small item regardless of the
+    # length of the player's history
     matchmaking_requests = matchmaking_request_table.query(
         KeyConditionExpression=Key('PlayerId').eq(player_id),
-        ScanIndexForward=False
+        ScanIndexForward=False,
+        Limit=1,
+        ProjectionExpression=', '.join(MATCHMAKING_REQUEST_RESULT_ATTRIBUTES)
     )
 
     if matchmaking_requests['Count'] <= 0:
-        return {
+        return None, {
             'headers': {
                 'Content-Type': 'text/plain'
             },
@@ -46,6 +108,7 @@ def handler(event, context):
         }
 
     latest_matchmaking_request = matchmaking_requests['Items'][0]
+    start_time = latest_matchmaking_request['StartTime']
 
     print(f'Current Matchmaking Request: {latest_matchmaking_request}')
 
@@ -53,17 +116,26 @@ def handler(event, context):
 
     if matchmaking_request_status == MATCHMAKING_STARTED_STATUS:
         # still waiting for ticket to be processed
-        return {
-            'headers': {
-                'Content-Type': 'text/plain'
-            },
-            'statusCode': 204
-        }
+        return start_time, to_pending_response(matchmaking_request_table, matchmaking_configuration_name,
+                                               latest_matchmaking_request, time.time())
     elif matchmaking_request_status == MATCHMAKING_SUCCEEDED_STATUS:
+        game_session_connection = get_cached_game_session_connection(matchmaking_request_table,
+                                                                     latest_matchmaking_request)
+        if game_session_connection is None:
+            # Expired items are deleted in no particular order, so the request may be read after its game session
+            print(f"Cannot find connection info of game session: {latest_matchmaking_request['GameSessionArn']}")
+            return start_time, {
+                'headers': {
+                    'Content-Type': 'text/plain'
+                },
+                'statusCode': 404
+            }
+
         game_session_connection_info = \
-            dict((k, latest_matchmaking_request[k]) for k in ('IpAddress', 'Port', 'DnsName', 'PlayerSessionId', 'GameSessionArn'))
+            dict((k, latest_matchmaking_request[k]) for k in ('PlayerSessionId', 'GameSessionArn'))
+        game_session_connection_info.update(game_session_connection)
         print(game_session_connection_info)
-        return {
+        return start_time, {
             'body': json.dumps(game_session_connection_info),
             'headers': {
                 'Content-Type': 'text/plain'
@@ -74,9 +146,53 @@ def handler(event, context):
         # We count MatchmakingCancelled as internal error also because cancelling placement requests is not
         # in the current implementation, so it should never happen.
         print(f'Received non-successful terminal status {matchmaking_request_status}, responding with 500 error.')
-        return {
+        return start_time, {
             'headers': {
                 'Content-Type': 'text/plain'
             },
             'statusCode': 500
         }
+
+
+def to_pending_response(matchmaking_request_table, matchmaking_configuration_name, matchmaking_request, now):
+    """Returns the response to a poll for a pending matchmaking request, telling the client when to poll again"""
+    estimated_wait_time = matchmaking_request.get('EstimatedWaitTime')
+    retry_after = get_retry_after_in_seconds(
+        now - int(matchmaking_request['StartTime']),
+        int(estimated_wait_time) if estimated_wait_time is not None else None,
+        time_to_match_estimate.get(matchmaking_request_table, matchmaking_configuration_name, now),
+        matchmaking_request.get('TicketProgress') == PLACING_TICKET_PROGRESS
+    )
+    return {
+        'headers': {
+            'Content-Type': 'text/plain',
+            'Retry-After': str(retry_after)
+        },
+        'statusCode': 204
+    }
+
+
+def get_pending_matchmaking_request(matchmaking_request_table, player_id, start_time):
+    """Returns the status of a matchmaking request, reading only the attributes needed to answer while it is pending"""
+    return matchmaking_request_table.get_item(
+        Key={
+            'PlayerId': player_id,
+            'StartTime': start_time
+        },
+        ProjectionExpression=', '.join(PENDING_MATCHMAKING_REQUEST_ATTRIBUTES)
+    ).get('Item', {})
+
+
+def get_cached_game_session_connection(matchmaking_request_table, matchmaking_request):
+    """Returns the connection info of the game session a succeeded matchmaking request refers to"""
+    if 'IpAddress' in matchmaking_request:
+        # Requests succeeded before the connection info was stored per game session hold their own copy
+        return dict((k, matchmaking_request[k]) for k in GAME_SESSION_CONNECTION_ATTRIBUTES)
+
+    game_session_arn = matchmaking_request['GameSessionArn']
+    game_session_connection = game_session_connection_cache.get(game_session_arn)
+    if game_session_connection is None:
+        game_session_connection = get_game_session_connection(matchmaking_request_table, game_session_arn)
+        if game_session_connection is not None:
+            game_session_connection_cache.put(game_session_arn, game_session_connection)
+    return game_session_connection
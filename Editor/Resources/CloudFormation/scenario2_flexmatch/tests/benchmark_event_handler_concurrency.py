@@ -0,0 +1,102 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/benchmark_event_handler_concurrency.py`
+#
+# Measures the wall time of the matchmaker event handler for a single MatchmakingSucceeded event, against a local
+# DynamoDB stand-in with injected latency, for increasing match sizes and numbers of concurrent writers.
+
+import contextlib
+from datetime import datetime, timezone
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LocalBoto3, LocalDynamoDbResource, LocalTable
+from matchmaking_tickets import to_ticket_id
+import aws_clients
+import matchmaker_event_handler
+
+TABLE_NAME = 'BenchmarkMatchmakingRequestTable'
+TICKET_COUNTS = [2, 10, 50]
+WORKER_COUNTS = [1, 4, 8, 16]
+DYNAMODB_LATENCY_IN_SECONDS = 0.01
+REPETITIONS = 5
+
+
+def main():
+    os.environ['MatchmakingRequestTableName'] = TABLE_NAME
+
+    print(f"DynamoDB latency: {DYNAMODB_LATENCY_IN_SECONDS * 1000:.0f} ms, mean of {REPETITIONS} events")
+    print(f"{'Tickets':>8} | {'Workers':>8} | {'Wall time/event (ms)':>20} | {'Speedup':>8}")
+    for ticket_count in TICKET_COUNTS:
+        serial_wall_time = None
+        for worker_count in WORKER_COUNTS:
+            os.environ['Parallelism'] = str(worker_count)
+            wall_time = 0
+            for _ in range(REPETITIONS):
+                table, event = create_stand_ins(ticket_count)
+                aws_clients.reset()
+                aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])})
+
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = matchmaker_event_handler.handler(event, None)
+                wall_time += (time.perf_counter() - start) / REPETITIONS
+                assert not result['batchItemFailures']
+
+            serial_wall_time = serial_wall_time or wall_time
+            print(f"{ticket_count:>8} | {worker_count:>8} | {wall_time * 1000:>20.1f} | "
+                  f"{serial_wall_time / wall_time:>7.1f}x")
+
+
+def create_stand_ins(ticket_count):
+    table = LocalTable(TABLE_NAME, 'PlayerId', 'StartTime', latency_in_seconds=DYNAMODB_LATENCY_IN_SECONDS)
+    start_time = round(time.time()) - 30
+    players = []
+    tickets = []
+    for i in range(ticket_count):
+        player_id = f'player-{i}'
+        ticket_id = to_ticket_id(player_id, start_time)
+        table.load_items([{
+            'PlayerId': player_id,
+            'StartTime': start_time,
+            'LastUpdatedTime': start_time,
+            'ExpirationTime': start_time + 600,
+            'TicketStatus': matchmaker_event_handler.MATCHMAKING_STARTED_STATUS,
+            'PendingTicketStatus': matchmaker_event_handler.MATCHMAKING_STARTED_STATUS,
+            'TicketId': ticket_id
+        }])
+        players.append({'playerId': player_id, 'playerSessionId': f'psess-{i}'})
+        tickets.append({'ticketId': ticket_id})
+
+    message = {
+        'time': datetime.fromtimestamp(start_time + 20, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+        'detail': {
+            'type': matchmaker_event_handler.MATCHMAKING_SUCCEEDED_STATUS,
+            'tickets': tickets,
+            'gameSessionInfo': {
+                'gameSessionArn': 'arn:aws:gamelift:us-west-2::gamesession/fleet-1/gsess-1',
+                'ipAddress': '192.0.2.1',
+                'port': 7777,
+                'players': players
+            }
+        }
+    }
+    event = {
+        'Records': [{
+            'eventSource': matchmaker_event_handler.SQS_EVENT_SOURCE,
+            'messageId': 'message-1',
+            'body': json.dumps(message)
+        }]
+    }
+    return table, event
+
+
+if __name__ == '__main__':
+    main()
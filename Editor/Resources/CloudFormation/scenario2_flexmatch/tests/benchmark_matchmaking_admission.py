@@ -0,0 +1,134 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/benchmark_matchmaking_admission.py`
+#
+# Replays a launch spike of players starting games, each in its own thread calling the game request lambda function
+# until its matchmaking starts, against local GameLift and DynamoDB stand-ins. GameLift throttles the StartMatchmaking
+# calls over its rate. It compares calling StartMatchmaking on every request with admitting the calls within a budget
+# of that rate, and reports the calls GameLift throttled, the requests shed with a Retry-After, the rate at which
+# matchmaking started during the spike, and the time players took to start matchmaking. The budget is also run against
+# an admission table throttled below it, where requests whose token cannot be taken are shed rather than admitted.
+# Clients retry after the Retry-After of a 429 (Too Many Requests), and after a second on any other error.
+
+import contextlib
+import io
+import math
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalLambdaContext, LocalTable
+from matchmaking_admission import MatchmakingAdmission
+import aws_clients
+import game_request
+
+TABLE_NAME = 'BenchmarkMatchmakingRequestTable'
+ADMISSION_TABLE_NAME = 'BenchmarkMatchmakingAdmissionTable'
+CONFIGURATION_NAME = 'BenchmarkMatchmakingConfiguration'
+PLAYER_COUNT = 300
+SPIKE_DURATION_IN_SECONDS = 3
+# StartMatchmaking calls per second GameLift accepts, and budget of the game request function
+GAMELIFT_START_MATCHMAKING_TPS = 20
+START_MATCHMAKING_TPS_BUDGET = 20
+GAMELIFT_LATENCY_IN_SECONDS = 0.05
+DYNAMODB_LATENCY_IN_SECONDS = 0.005
+ERROR_RETRY_DELAY_IN_SECONDS = 1
+LAMBDA_TIMEOUT_IN_SECONDS = 3
+# Write capacity of the throttled admission table, as the 5 WCU of the MatchmakingRequest table
+THROTTLED_WRITE_CAPACITY_UNITS = 5
+
+
+class UnboundedAdmission:
+    """Admits every StartMatchmaking call right away"""
+
+    def admit(self, matchmaking_request_table, configuration_name, budget, now, max_queue_time):
+        return now
+
+
+def main():
+    os.environ['MatchmakingAdmissionTableName'] = ADMISSION_TABLE_NAME
+    os.environ['MatchmakingConfigurationName'] = CONFIGURATION_NAME
+    os.environ['MatchmakingRequestTableName'] = TABLE_NAME
+    os.environ['StartMatchmakingTps'] = str(START_MATCHMAKING_TPS_BUDGET)
+    os.environ['TeamName'] = 'BenchmarkTeam'
+
+    print(f"{PLAYER_COUNT} players within {SPIKE_DURATION_IN_SECONDS}s, GameLift StartMatchmaking rate: "
+          f"{GAMELIFT_START_MATCHMAKING_TPS}/s, budget: {START_MATCHMAKING_TPS_BUDGET}/s")
+    print(f"{'Admission':>16} | {'Requests':>8} | {'Throttled (500 before)':>22} | {'Answered 429':>12} | "
+          f"{'Started/s':>9} | {'Max started in 1s':>17} | {'Mean start (s)':>14} | {'p95 start (s)':>13} | "
+          f"{'Admission writes/token':>22}")
+    for name, admission, write_capacity_units in [
+            ('none', UnboundedAdmission(), None),
+            ('budget', MatchmakingAdmission(), None),
+            ('budget, 5 WCU', MatchmakingAdmission(), THROTTLED_WRITE_CAPACITY_UNITS)]:
+        random.seed(0)
+        game_request.matchmaking_admission = admission
+        gamelift = LocalGameLift(GAMELIFT_LATENCY_IN_SECONDS, start_matchmaking_tps=GAMELIFT_START_MATCHMAKING_TPS)
+        table = LocalTable(TABLE_NAME, 'PlayerId', 'StartTime', latency_in_seconds=DYNAMODB_LATENCY_IN_SECONDS)
+        admission_table = LocalTable(ADMISSION_TABLE_NAME, 'ConfigurationName', 'Second',
+                                     latency_in_seconds=DYNAMODB_LATENCY_IN_SECONDS,
+                                     write_capacity_units=write_capacity_units)
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table, admission_table])},
+                                       clients={'gamelift': gamelift})
+
+        spike_start_time = time.time() + 0.1
+        players = [Player(f'player-{i}', spike_start_time + random.uniform(0, SPIKE_DURATION_IN_SECONDS))
+                   for i in range(PLAYER_COUNT)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for player in players:
+                player.start()
+            for player in players:
+                player.join()
+
+        ticket_start_times = [ticket['StartTime'] for ticket in gamelift.tickets.values()]
+        started_per_second = {}
+        for ticket_start_time in ticket_start_times:
+            second = math.floor(ticket_start_time)
+            started_per_second[second] = started_per_second.get(second, 0) + 1
+        start_rate = len(ticket_start_times) / (max(ticket_start_times) - min(ticket_start_times))
+        start_delays = sorted(player.start_delay for player in players)
+        admission_write_count = admission_table.request_counts.get('UpdateItem', 0)
+        print(f"{name:>16} | {sum(player.request_count for player in players):>8} | "
+              f"{gamelift.request_counts.get('ThrottledStartMatchmaking', 0):>22} | "
+              f"{sum(player.retry_after_count for player in players):>12} | {start_rate:>9.1f} | "
+              f"{max(started_per_second.values()):>17} | {statistics.mean(start_delays):>14.2f} | "
+              f"{start_delays[int(len(start_delays) * 0.95)]:>13.2f} | "
+              f"{admission_write_count / len(ticket_start_times):>22.2f}")
+
+
+class Player(threading.Thread):
+    """Game client starting a game at `start_time`, and retrying until its matchmaking starts"""
+
+    def __init__(self, player_id, start_time):
+        super().__init__()
+        self.event = {'requestContext': {'authorizer': {'claims': {'sub': player_id}}}}
+        self.start_time = start_time
+        self.start_delay = None
+        self.request_count = 0
+        self.retry_after_count = 0
+
+    def run(self):
+        time.sleep(max(0.0, self.start_time - time.time()))
+        while True:
+            self.request_count += 1
+            response = game_request.handler(self.event, LocalLambdaContext(LAMBDA_TIMEOUT_IN_SECONDS))
+            if response['statusCode'] == 202:
+                self.start_delay = time.time() - self.start_time
+                return
+            if response['statusCode'] == 429:
+                self.retry_after_count += 1
+                time.sleep(int(response['headers']['Retry-After']))
+            else:
+                time.sleep(ERROR_RETRY_DELAY_IN_SECONDS)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/benchmark_matchmaking_statistics.py`
+#
+# Records an hour of simulated matchmaking results in the time to match statistics of several warm containers, flushes
+# them to a local DynamoDB stand-in, and compares the percentiles returned by the matchmaking statistics request lambda
+# function with the exact ones. It also reports the write units spent flushing, per completed ticket.
+
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LocalBoto3, LocalDynamoDbResource, LocalTable
+from matchmaking_statistics import MAX_BUCKET_INDEX, MatchmakingStatistics
+import aws_clients
+import matchmaking_statistics_request
+
+TABLE_NAME = 'BenchmarkMatchmakingRequestTable'
+CONFIGURATION_NAME = 'BenchmarkMatchmakingConfiguration'
+CONTAINER_COUNT = 10
+DURATION_IN_SECONDS = 60 * 60  # 1 hour
+TICKETS_PER_SECOND = [1, 10, 100]
+MEDIAN_TIME_TO_MATCH_IN_SECONDS = 20
+MATCHMAKING_TIMEOUT_IN_SECONDS = 60
+FLUSH_INTERVAL_IN_SECONDS = 60
+
+
+def main():
+    os.environ['MatchmakingRequestTableName'] = TABLE_NAME
+    os.environ['MatchmakingConfigurationName'] = CONFIGURATION_NAME
+
+    print(f"Buckets per configuration and outcome: at most {MAX_BUCKET_INDEX + 1}")
+    print(f"{'Tickets/s':>9} | {'Outcome':>20} | {'Count':>7} | {'p50 exact/sketch':>16} | {'p95 exact/sketch':>16} | "
+          f"{'p99 exact/sketch':>16} | {'WCU/ticket':>10}")
+    for tickets_per_second in TICKETS_PER_SECOND:
+        random.seed(0)
+        table = LocalTable(TABLE_NAME, 'PlayerId', 'StartTime')
+        containers = [MatchmakingStatistics() for _ in range(CONTAINER_COUNT)]
+        times_to_match = {}
+        start_time = 1_700_000_000 - 1_700_000_000 % 3600
+        for now in range(start_time, start_time + DURATION_IN_SECONDS):
+            container = random.choice(containers)
+            for _ in range(tickets_per_second):
+                outcome, time_to_match = complete_ticket()
+                times_to_match.setdefault(outcome, []).append(time_to_match)
+                container.record(CONFIGURATION_NAME, outcome, time_to_match, now)
+            container.flush(table, now, FLUSH_INTERVAL_IN_SECONDS)
+        for container in containers:
+            container.flush(table, start_time + DURATION_IN_SECONDS, 0)
+        write_units = table.consumed_write_units
+
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])})
+        matchmaking_statistics_request.time = SimpleNamespace(time=lambda: start_time + DURATION_IN_SECONDS)
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = matchmaking_statistics_request.handler({'body': json.dumps({'periodInSeconds': 3600})}, None)
+        outcomes = json.loads(response['body'])['Outcomes']
+
+        ticket_count = sum(len(values) for values in times_to_match.values())
+        for outcome, values in sorted(times_to_match.items()):
+            values.sort()
+            statistics = outcomes[outcome]
+            assert statistics['Count'] == len(values)
+            print(f"{tickets_per_second:>9} | {outcome:>20} | {len(values):>7} | "
+                  f"{format_percentile(values, 0.5, statistics['P50']):>16} | "
+                  f"{format_percentile(values, 0.95, statistics['P95']):>16} | "
+                  f"{format_percentile(values, 0.99, statistics['P99']):>16} | {write_units / ticket_count:>10.4f}")
+
+
+def complete_ticket():
+    time_to_match = round(random.lognormvariate(math.log(MEDIAN_TIME_TO_MATCH_IN_SECONDS), 0.5))
+    if time_to_match >= MATCHMAKING_TIMEOUT_IN_SECONDS:
+        return 'MatchmakingTimedOut', MATCHMAKING_TIMEOUT_IN_SECONDS
+    if random.random() < 0.01:
+        return 'MatchmakingCancelled', random.randint(1, time_to_match + 1)
+    return 'MatchmakingSucceeded', time_to_match
+
+
+def format_percentile(sorted_values, q, estimate):
+    exact = sorted_values[math.ceil(q * (len(sorted_values) - 1))]
+    return f"{exact:>7} {estimate:>8.1f}"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/benchmark_poller_concurrency.py`
+#
+# Measures the throughput of the FlexMatch status poller against local DynamoDB and GameLift stand-ins with injected
+# latency, for an increasing number of concurrent workers.
+
+import contextlib
+from datetime import datetime, timezone
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalIndex, LocalLambdaContext, LocalTable
+import aws_clients
+import flexmatch_status_poller
+
+TABLE_NAME = 'BenchmarkMatchmakingRequestTable'
+PENDING_TICKET_INDEX_NAME = 'pending-ticket-index'
+PENDING_TICKET_COUNT = 500
+WORKER_COUNTS = [1, 2, 4, 8, 16]
+DYNAMODB_LATENCY_IN_SECONDS = 0.01
+GAMELIFT_LATENCY_IN_SECONDS = 0.1
+
+
+def main():
+    os.environ['MatchmakingRequestTableName'] = TABLE_NAME
+    os.environ['PendingTicketIndexName'] = PENDING_TICKET_INDEX_NAME
+    os.environ['MatchmakingTimeoutInSeconds'] = '600'
+
+    print(f"{PENDING_TICKET_COUNT} pending tickets, DynamoDB latency: {DYNAMODB_LATENCY_IN_SECONDS * 1000:.0f} ms, "
+          f"GameLift latency: {GAMELIFT_LATENCY_IN_SECONDS * 1000:.0f} ms")
+    print(f"{'Workers':>8} | {'Wall time (s)':>14} | {'Tickets/s':>10}")
+    for worker_count in WORKER_COUNTS:
+        os.environ['Parallelism'] = str(worker_count)
+        table, gamelift = create_stand_ins()
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])},
+                                       clients={'gamelift': gamelift})
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            flexmatch_status_poller.handler({}, LocalLambdaContext(timeout_in_seconds=600))
+        wall_time = time.perf_counter() - start
+
+        print(f"{worker_count:>8} | {wall_time:>14.2f} | {PENDING_TICKET_COUNT / wall_time:>10.1f}")
+
+
+def create_stand_ins():
+    table = LocalTable(TABLE_NAME, 'PlayerId', 'StartTime', indexes={
+        PENDING_TICKET_INDEX_NAME: LocalIndex('PendingTicketStatus', 'LastUpdatedTime',
+                                              ['EstimatedWaitTime', 'TicketId', 'TicketProgress'])
+    }, latency_in_seconds=DYNAMODB_LATENCY_IN_SECONDS)
+    gamelift = LocalGameLift(latency_in_seconds=GAMELIFT_LATENCY_IN_SECONDS)
+    start_time = round(time.time()) - 120
+    for i in range(PENDING_TICKET_COUNT):
+        ticket_id = f'ticket-{i}'
+        table.load_items([{
+            'PlayerId': f'player-{i}',
+            'StartTime': start_time,
+            'LastUpdatedTime': start_time,
+            'ExpirationTime': start_time + 600,
+            'TicketStatus': flexmatch_status_poller.MATCHMAKING_STARTED_STATUS,
+            'PendingTicketStatus': flexmatch_status_poller.MATCHMAKING_STARTED_STATUS,
+            'TicketId': ticket_id
+        }])
+        if i % 2:
+            gamelift.add_ticket(ticket_id, status='SEARCHING')
+        else:
+            # DescribeMatchmaking timestamps are parsed into datetimes by boto3
+            gamelift.add_ticket(ticket_id, status='COMPLETED', EndTime=datetime.fromtimestamp(start_time + 60,
+                                                                                              timezone.utc))
+    return table, gamelift
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/benchmark_poller_reads.py`
+#
+# Compares the DynamoDB read units consumed by the FlexMatch status poller when finding pending tickets with a Scan of
+# the MatchmakingRequest table versus a Query of the sparse pending ticket index, against a local DynamoDB stand-in.
+
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from boto3.dynamodb.conditions import And, Attr, Key
+from local_aws import LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalIndex, LocalLambdaContext, LocalTable
+import aws_clients
+import flexmatch_status_poller
+
+TABLE_NAME = 'BenchmarkMatchmakingRequestTable'
+PENDING_TICKET_INDEX_NAME = 'pending-ticket-index'
+TABLE_SIZES = [1000, 100000, 1000000]
+PENDING_TICKET_COUNT = 100
+NOW = round(time.time())
+
+
+def main():
+    os.environ['MatchmakingRequestTableName'] = TABLE_NAME
+    os.environ['PendingTicketIndexName'] = PENDING_TICKET_INDEX_NAME
+    os.environ['MatchmakingTimeoutInSeconds'] = '600'
+    random.seed(0)
+
+    print(f"{'Items':>10} | {'Scan (Limit=50)':>24} | {'Full scan':>10} | {'Poller run':>24} | "
+          f"{'Full index query':>16}")
+    print(f"{'':>10} | {'RCU':>8} {'pending found':>15} | {'RCU':>10} | {'RCU':>8} {'tickets polled':>15} | "
+          f"{'RCU':>16}")
+    for table_size in TABLE_SIZES:
+        table, gamelift = create_stand_ins(table_size)
+
+        table.reset_metrics()
+        limited_scan_result = table.scan(Limit=flexmatch_status_poller.NON_TERMINAL_REQUEST_QUERY_LIMIT,
+                                         FilterExpression=pending_filter_expression())
+        limited_scan_read_units = table.consumed_read_units
+
+        table.reset_metrics()
+        paginate(table.scan, FilterExpression=pending_filter_expression())
+        full_scan_read_units = table.consumed_read_units
+
+        table.reset_metrics()
+        paginate(table.query, IndexName=PENDING_TICKET_INDEX_NAME,
+                 KeyConditionExpression=pending_key_condition_expression())
+        full_query_read_units = table.consumed_read_units
+
+        table.reset_metrics()
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])},
+                                       clients={'gamelift': gamelift})
+        with contextlib.redirect_stdout(io.StringIO()):
+            flexmatch_status_poller.handler({}, LocalLambdaContext(timeout_in_seconds=50))
+        poller_read_units = table.consumed_read_units
+        tickets_polled = gamelift.request_counts.get('DescribeMatchmaking', 0) * \
+            flexmatch_status_poller.MAX_PARTITION_SIZE
+
+        print(f"{table_size:>10} | {limited_scan_read_units:>8} {limited_scan_result['Count']:>15} | "
+              f"{full_scan_read_units:>10} | {poller_read_units:>8} {tickets_polled:>15} | {full_query_read_units:>16}")
+
+
+def create_stand_ins(table_size):
+    table = LocalTable(TABLE_NAME, 'PlayerId', 'StartTime', indexes={
+        PENDING_TICKET_INDEX_NAME: LocalIndex('PendingTicketStatus', 'LastUpdatedTime',
+                                              ['EstimatedWaitTime', 'TicketId', 'TicketProgress'])
+    })
+    gamelift = LocalGameLift()
+    pending_positions = set(random.sample(range(table_size), PENDING_TICKET_COUNT))
+    table.load_items(create_matchmaking_request(position in pending_positions, gamelift)
+                     for position in range(table_size))
+    return table, gamelift
+
+
+def create_matchmaking_request(is_pending, gamelift):
+    start_time = NOW - random.randint(60, 600)
+    request = {
+        'PlayerId': str(uuid.uuid4()),
+        'StartTime': start_time,
+        'LastUpdatedTime': start_time,
+        'ExpirationTime': start_time + 600,
+        'TicketId': str(uuid.uuid4())
+    }
+    if is_pending:
+        request['TicketStatus'] = flexmatch_status_poller.MATCHMAKING_STARTED_STATUS
+        request['PendingTicketStatus'] = flexmatch_status_poller.MATCHMAKING_STARTED_STATUS
+        gamelift.add_ticket(request['TicketId'])
+    else:
+        request.update({
+            'TicketStatus': flexmatch_status_poller.MATCHMAKING_SUCCEEDED_STATUS,
+            'IpAddress': '192.0.2.10',
+            'DnsName': 'ec2-192-0-2-10.us-west-2.compute.amazonaws.com',
+            'Port': '33430',
+            'GameSessionArn': 'arn:aws:gamelift:us-west-2::gamesession/fleet-1234/gsess-1234',
+            'PlayerSessionId': 'psess-' + request['TicketId']
+        })
+    return request
+
+
+def pending_filter_expression():
+    return And(Attr('TicketStatus').eq(flexmatch_status_poller.MATCHMAKING_STARTED_STATUS),
+               Attr('LastUpdatedTime').lt(NOW - flexmatch_status_poller.MIN_TIME_ELAPSED_BEFORE_UPDATE_IN_SECONDS))
+
+
+def pending_key_condition_expression():
+    return Key('PendingTicketStatus').eq(flexmatch_status_poller.MATCHMAKING_STARTED_STATUS) \
+        & Key('LastUpdatedTime').lt(NOW - flexmatch_status_poller.MIN_TIME_ELAPSED_BEFORE_UPDATE_IN_SECONDS)
+
+
+def paginate(operation, **kwargs):
+    response = operation(**kwargs)
+    while 'LastEvaluatedKey' in response:
+        response = operation(ExclusiveStartKey=response['LastEvaluatedKey'], **kwargs)
+
+
+if __name__ == '__main__':
+    main()
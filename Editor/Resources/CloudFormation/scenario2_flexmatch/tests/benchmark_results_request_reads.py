@@ -0,0 +1,119 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/benchmark_results_request_reads.py`
+#
+# Compares the cost of a results request poll for players with long request histories, between reading the whole
+# history and reading only the latest request. Read units are measured against a local DynamoDB stand-in. Latency is
+# measured with a real boto3 table whose HTTP requests are answered locally with the same page, so it covers the
+# client side transfer and parsing of the response, but not the network or the DynamoDB service time.
+
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeSerializer
+from local_aws import LocalBoto3, LocalDynamoDbResource, LocalHttpEndpoint, LocalTable
+from matchmaking_tickets import to_ticket_id
+import aws_clients
+import results_request
+
+TABLE_NAME = 'BenchmarkMatchmakingRequestTable'
+HISTORY_LENGTHS = [1, 10, 100, 1000]
+PLAYER_ID = 'player-1'
+LATENCY_SAMPLE_COUNT = 100
+
+
+def main():
+    os.environ['MatchmakingConfigurationName'] = 'BenchmarkMatchmakingConfiguration'
+    os.environ['MatchmakingRequestTableName'] = TABLE_NAME
+
+    print(f"{'History':>8} | {'Full history RCU':>16} | {'Latest request RCU':>18} | "
+          f"{'Full history (ms)':>17} | {'Latest request (ms)':>19}")
+    for history_length in HISTORY_LENGTHS:
+        table = create_table(history_length)
+        full_history_query = {
+            'KeyConditionExpression': Key('PlayerId').eq(PLAYER_ID),
+            'ScanIndexForward': False
+        }
+        full_history_page = table.query(**full_history_query)
+        full_history_read_units = table.consumed_read_units
+
+        table.reset_metrics()
+        aws_clients.reset()
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])})
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = results_request.handler({'requestContext': {'authorizer': {'claims': {'sub': PLAYER_ID}}}},
+                                               None)
+        assert response['statusCode'] == 204
+        latest_request_read_units = table.consumed_read_units
+
+        latest_request_query = {
+            **full_history_query,
+            'Limit': 1,
+            'ProjectionExpression': ', '.join(results_request.MATCHMAKING_REQUEST_RESULT_ATTRIBUTES)
+        }
+        latest_request_page = table.query(**latest_request_query)
+
+        print(f"{history_length:>8} | {full_history_read_units:>16.1f} | {latest_request_read_units:>18.1f} | "
+              f"{measure_query_latency(full_history_query, full_history_page):>17.2f} | "
+              f"{measure_query_latency(latest_request_query, latest_request_page):>19.2f}")
+
+
+def create_table(history_length):
+    table = LocalTable(TABLE_NAME, 'PlayerId', 'StartTime')
+    now = round(time.time())
+    for i in range(history_length):
+        start_time = now - (history_length - i) * 300
+        latest = i == history_length - 1
+        item = {
+            'PlayerId': PLAYER_ID,
+            'StartTime': start_time,
+            'LastUpdatedTime': start_time + 30,
+            'ExpirationTime': start_time + 600,
+            'TicketStatus': results_request.MATCHMAKING_STARTED_STATUS if latest
+            else results_request.MATCHMAKING_SUCCEEDED_STATUS,
+            'TicketId': to_ticket_id(PLAYER_ID, start_time)
+        }
+        if latest:
+            item['PendingTicketStatus'] = results_request.MATCHMAKING_STARTED_STATUS
+        else:
+            item['GameSessionArn'] = f'arn:aws:gamelift:us-west-2::gamesession/fleet-1234/gsess-{i}'
+            item['PlayerSessionId'] = f'psess-{i}'
+        table.load_items([item])
+    return table
+
+
+def measure_query_latency(query, page):
+    """Returns the mean latency in milliseconds of a real boto3 query answered locally with the given page"""
+    serializer = TypeSerializer()
+    response = {
+        'Count': page['Count'],
+        'ScannedCount': page['ScannedCount'],
+        'Items': [{name: serializer.serialize(value) for name, value in item.items()} for item in page['Items']]
+    }
+    if 'LastEvaluatedKey' in page:
+        response['LastEvaluatedKey'] = {name: serializer.serialize(value)
+                                        for name, value in page['LastEvaluatedKey'].items()}
+    LocalHttpEndpoint({'Query': response}).attach(boto3)
+    table = boto3.resource('dynamodb').Table(TABLE_NAME)
+    table.query(**query)
+
+    latencies = []
+    for _ in range(LATENCY_SAMPLE_COUNT):
+        start = time.perf_counter()
+        table.query(**query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(latencies)
+
+
+if __name__ == '__main__':
+    main()
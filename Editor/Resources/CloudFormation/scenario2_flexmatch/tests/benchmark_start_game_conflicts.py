@@ -0,0 +1,229 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/benchmark_start_game_conflicts.py`
+#
+# Sends concurrent start game requests for each player, as impatient clients retrying do, to the game request lambda
+# function against local GameLift and DynamoDB stand-ins with injected latency. It compares checking the latest
+# request of the player before starting matchmaking, as the game request did before it claimed the active ticket of
+# the player, with claiming it, and reports the tickets started per player and the table requests per game request.
+# The tickets are then completed by the matchmaker event handler, completed again with their event redelivered after
+# the release of their claims failed, and completed again without releasing their claims, as when a release is lost,
+# and each player starts a game after each, once the ticket would have timed out after the lost releases, which must be
+# accepted every time.
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LocalBoto3, LocalDynamoDbResource, LocalGameLift, LocalTable
+from matchmaking_tickets import to_ticket_id
+import aws_clients
+import game_request
+import matchmaker_event_handler
+
+TABLE_NAME = 'BenchmarkMatchmakingRequestTable'
+ADMISSION_TABLE_NAME = 'BenchmarkMatchmakingAdmissionTable'
+CONFIGURATION_NAME = 'BenchmarkMatchmakingConfiguration'
+PLAYER_COUNT = 100
+REQUESTS_PER_PLAYER = 4
+# Requests of a player are sent within this window, around the time their start time is rounded to the next second, so
+# that some of them start in different seconds
+REQUEST_WINDOW_IN_SECONDS = 0.5
+GAMELIFT_LATENCY_IN_SECONDS = 0.2
+DYNAMODB_LATENCY_IN_SECONDS = 0.005
+# Claims expire after both timeouts, which are longer than the request window
+MATCHMAKING_TIMEOUT_IN_SECONDS = 1
+PLACEMENT_TIMEOUT_IN_SECONDS = 1
+TERMINAL_TICKET_STATUSES = ['MatchmakingSucceeded', 'MatchmakingTimedOut', 'MatchmakingCancelled',
+                            'MatchmakingFailed']
+
+
+class UnboundedAdmission:
+    """Admits every StartMatchmaking call right away, see benchmark_matchmaking_admission.py for the budget"""
+
+    def admit(self, matchmaking_request_table, configuration_name, budget, now, max_queue_time):
+        return now
+
+
+def main():
+    os.environ['MatchmakingAdmissionTableName'] = ADMISSION_TABLE_NAME
+    os.environ['MatchmakingConfigurationName'] = CONFIGURATION_NAME
+    os.environ['MatchmakingRequestTableName'] = TABLE_NAME
+    os.environ['MatchmakingTimeoutInSeconds'] = str(MATCHMAKING_TIMEOUT_IN_SECONDS)
+    os.environ['PlacementTimeoutInSeconds'] = str(PLACEMENT_TIMEOUT_IN_SECONDS)
+    os.environ['TeamName'] = 'BenchmarkTeam'
+    game_request.matchmaking_admission = UnboundedAdmission()
+
+    print(f"{PLAYER_COUNT} players sending {REQUESTS_PER_PLAYER} concurrent requests within "
+          f"{REQUEST_WINDOW_IN_SECONDS}s")
+    print(f"{'Check':>6} | {'202':>5} | {'409':>5} | {'500':>5} | {'StartMatchmaking calls':>22} | {'Tickets':>7} | "
+          f"{'Players with duplicates':>23} | {'Table requests/request':>22} | {'202 after completion':>20} | "
+          f"{'202 after redelivery':>20} | {'202 after lost release':>22}")
+    for name, start_game in [('query', start_game_after_query), ('claim', start_game_after_claim)]:
+        random.seed(0)
+        gamelift = LocalGameLift(GAMELIFT_LATENCY_IN_SECONDS)
+        table = LocalTable(TABLE_NAME, 'PlayerId', 'StartTime', latency_in_seconds=DYNAMODB_LATENCY_IN_SECONDS)
+        aws_clients.reset()
+        admission_table = LocalTable(ADMISSION_TABLE_NAME, 'ConfigurationName', 'Second')
+        aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table, admission_table])},
+                                       clients={'gamelift': gamelift})
+        player_ids = [f'player-{i}' for i in range(PLAYER_COUNT)]
+
+        spike_start_time = math.floor(time.time()) + 1.5 - REQUEST_WINDOW_IN_SECONDS / 2
+        requests = [StartGameRequest(start_game, player_id,
+                                     spike_start_time + random.uniform(0, REQUEST_WINDOW_IN_SECONDS))
+                    for player_id in player_ids for _ in range(REQUESTS_PER_PLAYER)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_all(requests)
+        table_request_count = sum(table.request_counts.values())
+        start_matchmaking_count = gamelift.request_counts.get('StartMatchmaking', 0)
+        status_codes = [request.status_code for request in requests]
+        tickets_per_player = {}
+        for ticket in gamelift.tickets.values():
+            player_id = ticket['Players'][0]['PlayerId']
+            tickets_per_player[player_id] = tickets_per_player.get(player_id, 0) + 1
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            complete_tickets(table, gamelift)
+            accepted_after_completion = start_games(start_game, player_ids)
+            complete_tickets(table, gamelift, redeliver=True)
+            accepted_after_redelivery = start_games(start_game, player_ids)
+            complete_tickets(table, gamelift, release=False)
+            accepted_after_lost_release = start_games(start_game, player_ids)
+
+        print(f"{name:>6} | {status_codes.count(202):>5} | {status_codes.count(409):>5} | "
+              f"{status_codes.count(500):>5} | {start_matchmaking_count:>22} | {sum(tickets_per_player.values()):>7} | "
+              f"{sum(1 for count in tickets_per_player.values() if count > 1):>23} | "
+              f"{table_request_count / len(requests):>22.2f} | {accepted_after_completion:>20} | "
+              f"{accepted_after_redelivery:>20} | {accepted_after_lost_release:>22}")
+        if start_game is start_game_after_claim:
+            assert all(count == 1 for count in tickets_per_player.values()), "Expect a single ticket per player"
+            assert accepted_after_completion == PLAYER_COUNT and accepted_after_redelivery == PLAYER_COUNT \
+                and accepted_after_lost_release == PLAYER_COUNT, \
+                "Expect all players to start a game once their ticket is terminal"
+
+
+def start_game_after_claim(event):
+    return game_request.handler(event, None)['statusCode']
+
+
+def start_game_after_query(event):
+    """Checks the latest request of the player, then starts matchmaking, as the game request did before the claim"""
+    player_id = event['requestContext']['authorizer']['claims']['sub']
+    start_time = round(time.time())
+    table = aws_clients.get_table(TABLE_NAME)
+    matchmaking_requests = table.query(
+        KeyConditionExpression=Key('PlayerId').eq(player_id),
+        ScanIndexForward=False,
+        Limit=1,
+        ProjectionExpression='TicketStatus'
+    )
+    if matchmaking_requests['Count'] > 0 \
+            and matchmaking_requests['Items'][0]['TicketStatus'] not in TERMINAL_TICKET_STATUSES:
+        return 409
+    try:
+        ticket_id = aws_clients.get_client('gamelift').start_matchmaking(
+            ConfigurationName=CONFIGURATION_NAME,
+            Players=[{'PlayerId': player_id}],
+            TicketId=to_ticket_id(player_id, start_time)
+        )['MatchmakingTicket']['TicketId']
+    except ClientError:
+        return 500
+    table.put_item(Item={
+        'PlayerId': player_id,
+        'StartTime': start_time,
+        'TicketStatus': game_request.MATCHMAKING_STARTED_STATUS,
+        'TicketId': ticket_id
+    })
+    return 202
+
+
+def complete_tickets(table, gamelift, release=True, redeliver=False):
+    """
+    Times out the pending tickets, with the matchmaker event handler, or else by updating their requests directly, as
+     when the release of their claim is lost, and waiting for the claims to expire
+    :param redeliver: whether the requests are updated directly first, as when the release failed after the update,
+     before the event is redelivered to the matchmaker event handler
+    """
+    ticket_ids = [ticket_id for ticket_id, ticket in gamelift.tickets.items() if ticket['Status'] == 'QUEUED']
+    for ticket_id in ticket_ids:
+        gamelift.tickets[ticket_id]['Status'] = 'TIMED_OUT'
+    if redeliver:
+        time_out_requests(table, ticket_ids)
+    if release:
+        message = {
+            'detail': {
+                'type': matchmaker_event_handler.MATCHMAKING_TIMED_OUT_STATUS,
+                'tickets': [{'ticketId': ticket_id} for ticket_id in ticket_ids],
+                'gameSessionInfo': {
+                    'players': []
+                }
+            }
+        }
+        event = {
+            'Records': [{
+                'eventSource': matchmaker_event_handler.SQS_EVENT_SOURCE,
+                'messageId': 'message-1',
+                'body': json.dumps(message)
+            }]
+        }
+        assert not matchmaker_event_handler.handler(event, None)['batchItemFailures']
+    else:
+        time_out_requests(table, ticket_ids)
+        time.sleep(MATCHMAKING_TIMEOUT_IN_SECONDS + PLACEMENT_TIMEOUT_IN_SECONDS)
+    # Tickets of the next games start in a later second
+    time.sleep(1)
+
+
+def time_out_requests(table, ticket_ids):
+    for item in table.scan()['Items']:
+        if item.get('TicketId') in ticket_ids:
+            table.update_item(
+                Key={'PlayerId': item['PlayerId'], 'StartTime': item['StartTime']},
+                AttributeUpdates={'TicketStatus': {'Value': matchmaker_event_handler.MATCHMAKING_TIMED_OUT_STATUS}}
+            )
+
+
+def start_games(start_game, player_ids):
+    """Starts a game for each player at once, returning the number of requests accepted"""
+    requests = [StartGameRequest(start_game, player_id, time.time()) for player_id in player_ids]
+    run_all(requests)
+    return sum(1 for request in requests if request.status_code == 202)
+
+
+def run_all(requests):
+    for request in requests:
+        request.start()
+    for request in requests:
+        request.join()
+
+
+class StartGameRequest(threading.Thread):
+    """Start game request of a game client, sent at `send_time`"""
+
+    def __init__(self, start_game, player_id, send_time):
+        super().__init__()
+        self.start_game = start_game
+        self.event = {'requestContext': {'authorizer': {'claims': {'sub': player_id}}}}
+        self.send_time = send_time
+        self.status_code = None
+
+    def run(self):
+        time.sleep(max(0.0, self.send_time - time.time()))
+        self.status_code = self.start_game(self.event)
+
+
+if __name__ == '__main__':
+    main()
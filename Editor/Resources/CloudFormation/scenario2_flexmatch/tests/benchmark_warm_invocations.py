@@ -0,0 +1,68 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/benchmark_warm_invocations.py`
+#
+# Measures the per-invocation latency of the results request lambda function, which game clients poll continuously,
+# when every invocation builds its AWS clients, and when warm invocations reuse the clients built by the first one.
+# Real boto3 clients are used, with their HTTP requests answered locally, so the latency excludes the network.
+
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from local_aws import LocalHttpEndpoint
+import aws_clients
+import results_request
+
+TABLE_NAME = 'BenchmarkMatchmakingRequestTable'
+INVOCATION_COUNT = 200
+EVENT = {'requestContext': {'authorizer': {'claims': {'sub': 'player-1'}}}}
+
+
+def main():
+    os.environ['MatchmakingConfigurationName'] = 'BenchmarkMatchmakingConfiguration'
+    os.environ['MatchmakingRequestTableName'] = TABLE_NAME
+    start_time = round(time.time())
+    LocalHttpEndpoint({
+        'Query': {
+            'Count': 1,
+            'ScannedCount': 1,
+            'Items': [{
+                'PlayerId': {'S': 'player-1'},
+                'StartTime': {'N': str(start_time)},
+                'LastUpdatedTime': {'N': str(start_time)},
+                'ExpirationTime': {'N': str(start_time + 600)},
+                'TicketStatus': {'S': results_request.MATCHMAKING_STARTED_STATUS},
+                'TicketId': {'S': f'player-1.{start_time}'}
+            }]
+        }
+    }).attach(aws_clients.boto3)
+
+    print(f"{INVOCATION_COUNT} invocations of results_request")
+    print(f"{'Clients':>16} | {'Mean (ms)':>10} | {'p50 (ms)':>10} | {'p99 (ms)':>10}")
+    for name, reuse_clients in [('per invocation', False), ('per container', True)]:
+        aws_clients.reset()
+        latencies = []
+        for _ in range(INVOCATION_COUNT):
+            if not reuse_clients:
+                aws_clients.reset()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = results_request.handler(EVENT, None)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response['statusCode'] == 204
+        # The first invocation builds the clients in both cases
+        latencies = latencies[1:]
+        print(f"{name:>16} | {statistics.mean(latencies):>10.2f} | {statistics.median(latencies):>10.2f} | "
+              f"{sorted(latencies)[int(len(latencies) * 0.99)]:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
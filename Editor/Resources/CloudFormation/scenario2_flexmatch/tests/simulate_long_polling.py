@@ -0,0 +1,179 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/simulate_long_polling.py`
+#
+# Replays games of players polling for their matchmaking result against the results request lambda function, with a
+# local DynamoDB stand-in and a simulated clock, and compares short polling clients, clients following the Retry-After
+# header of 204 (No Content) answers, and long polling clients. It reports per game the requests made to the API, the
+# table reads, the time spent in the function, and the delay between the match and the client receiving its result.
+
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import statistics
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common', 'tests'))
+
+from game_session_connections import put_game_session_connection
+from local_aws import LocalBoto3, LocalDynamoDbResource, LocalTable
+from lru_cache import LruCache
+from matchmaking_statistics import TimeToMatchSketch, add_time_to_match_sketch
+from matchmaking_tickets import to_ticket_id
+from matchmaking_wait_times import TimeToMatchQuantile
+import aws_clients
+import long_polling
+import results_request
+
+TABLE_NAME = 'SimulationMatchmakingRequestTable'
+CONFIGURATION_NAME = 'SimulationMatchmakingConfiguration'
+GAME_COUNT = 2000
+# Times to match of the other players, in the matchmaking statistics the estimate is read from
+STATISTICS_SAMPLE_COUNT = 1000
+MEDIAN_TIME_TO_MATCH_IN_SECONDS = 20
+# Wait time GameLift estimates for the tickets, recorded on the requests by the FlexMatch status poller
+ESTIMATED_WAIT_TIME_IN_SECONDS = 25
+FUNCTION_TIMEOUT_IN_SECONDS = 28
+PLAYER_ID = 'player-1'
+
+
+class Client:
+    """
+    Polling behavior of a game client
+    :param initial_delay: seconds between starting a game and the first poll
+    :param poll_interval: seconds between a 204 (No Content) answer and the next poll, or None to follow its
+     Retry-After header
+    :param wait_time: seconds the client asks the function to wait for its result, 0 for short polling
+    """
+
+    def __init__(self, name, initial_delay, poll_interval, wait_time):
+        self.name = name
+        self.initial_delay = initial_delay
+        self.poll_interval = poll_interval
+        self.wait_time = wait_time
+
+
+CLIENTS = [
+    Client('poll every 1s', initial_delay=0, poll_interval=1, wait_time=0),
+    # Sample game client: first poll 15 seconds after starting a game, then every 5 seconds until connected
+    Client('sample client', initial_delay=15, poll_interval=5, wait_time=0),
+    Client('Retry-After', initial_delay=0, poll_interval=None, wait_time=0),
+    Client('long poll 10s', initial_delay=0, poll_interval=0, wait_time=10),
+    Client('long poll 20s', initial_delay=0, poll_interval=0, wait_time=20),
+]
+
+
+def main():
+    os.environ['MatchmakingConfigurationName'] = CONFIGURATION_NAME
+    os.environ['MatchmakingRequestTableName'] = TABLE_NAME
+    os.environ['MaxWaitTimeInSeconds'] = str(long_polling.DEFAULT_MAX_WAIT_TIME_IN_SECONDS)
+    print(f"{'Client':>13} | {'Requests/game':>13} | {'Reads/game':>10} | {'Function s/game':>15} | "
+          f"{'Mean delay (s)':>14} | {'p99 delay (s)':>13}")
+    for client in CLIENTS:
+        result = simulate(client)
+        delays = sorted(result['delays'])
+        print(f"{client.name:>13} | {result['requests'] / GAME_COUNT:>13.2f} | {result['reads'] / GAME_COUNT:>10.2f} | "
+              f"{result['function_time'] / GAME_COUNT:>15.2f} | {statistics.mean(delays):>14.2f} | "
+              f"{delays[int(len(delays) * 0.99)]:>13.2f}")
+
+
+def simulate(client):
+    random.seed(0)
+    table = LocalTable(TABLE_NAME, 'PlayerId', 'StartTime')
+    aws_clients.reset()
+    aws_clients.boto3 = LocalBoto3(resources={'dynamodb': LocalDynamoDbResource([table])})
+    results_request.game_session_connection_cache = LruCache(results_request.GAME_SESSION_CONNECTION_CACHE_SIZE)
+    # The statistics cover the whole simulation, and do not change during it, so they are read once
+    results_request.time_to_match_estimate = TimeToMatchQuantile(results_request.TIME_TO_MATCH_ESTIMATE_QUANTILE,
+                                                                 ttl_in_seconds=GAME_COUNT * 1000,
+                                                                 period_in_seconds=GAME_COUNT * 1000)
+    sketch = TimeToMatchSketch()
+    for _ in range(STATISTICS_SAMPLE_COUNT):
+        sketch.add(random.lognormvariate(math.log(MEDIAN_TIME_TO_MATCH_IN_SECONDS), 0.5))
+    add_time_to_match_sketch(table, CONFIGURATION_NAME, results_request.MATCHMAKING_SUCCEEDED_STATUS, 0, sketch)
+    table.reset_metrics()
+
+    clock = SimpleNamespace(now=0.0)
+    game = {}
+
+    def advance(seconds):
+        clock.now += seconds
+        if not game['matched'] and clock.now >= game['match_time']:
+            complete_matchmaking(table, game['start_time'], game['match_time'])
+            game['matched'] = True
+
+    fake_time = SimpleNamespace(time=lambda: clock.now, monotonic=lambda: clock.now, sleep=advance)
+    results_request.time = fake_time
+    long_polling.time = fake_time
+
+    event = {'requestContext': {'authorizer': {'claims': {'sub': PLAYER_ID}}}}
+    if client.wait_time > 0:
+        event['body'] = json.dumps({'waitTimeInSeconds': client.wait_time})
+
+    result = {'requests': 0, 'function_time': 0.0, 'delays': []}
+    for i in range(GAME_COUNT):
+        # Games are far enough apart that a poll never sees the result of the previous one
+        start_time = i * 1000
+        clock.now = start_time
+        game.update(start_time=start_time, matched=False,
+                    match_time=start_time + random.lognormvariate(math.log(MEDIAN_TIME_TO_MATCH_IN_SECONDS), 0.5))
+        start_matchmaking(table, start_time)
+        advance(client.initial_delay)
+        while True:
+            invocation_start = clock.now
+            deadline = invocation_start + FUNCTION_TIMEOUT_IN_SECONDS
+            context = SimpleNamespace(get_remaining_time_in_millis=lambda: max(0, round((deadline - clock.now) * 1000)))
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = results_request.handler(event, context)
+            result['requests'] += 1
+            result['function_time'] += clock.now - invocation_start
+            if response['statusCode'] != 204:
+                assert response['statusCode'] == 200
+                result['delays'].append(clock.now - game['match_time'])
+                break
+            if client.poll_interval is None:
+                advance(int(response['headers']['Retry-After']))
+            else:
+                advance(client.poll_interval)
+
+    result['reads'] = table.request_counts.get('Query', 0) + table.request_counts.get('GetItem', 0)
+    return result
+
+
+def start_matchmaking(table, start_time):
+    table.put_item(Item={
+        'PlayerId': PLAYER_ID,
+        'StartTime': start_time,
+        'TicketStatus': results_request.MATCHMAKING_STARTED_STATUS,
+        'TicketId': to_ticket_id(PLAYER_ID, start_time),
+        'EstimatedWaitTime': ESTIMATED_WAIT_TIME_IN_SECONDS
+    })
+
+
+def complete_matchmaking(table, start_time, now):
+    game_session_arn = f"arn:aws:gamelift:us-west-2::gamesession/fleet-1/{PLAYER_ID}.{start_time}"
+    put_game_session_connection(table, {
+        'GameSessionArn': game_session_arn,
+        'IpAddress': '192.0.2.1',
+        'DnsName': 'ec2-192-0-2-1.us-west-2.compute.amazonaws.com',
+        'Port': '7777'
+    }, round(now))
+    table.update_item(
+        Key={'PlayerId': PLAYER_ID, 'StartTime': start_time},
+        AttributeUpdates={
+            'TicketStatus': {'Value': results_request.MATCHMAKING_SUCCEEDED_STATUS},
+            'LastUpdatedTime': {'Value': math.ceil(now)},
+            'GameSessionArn': {'Value': game_session_arn},
+            'PlayerSessionId': {'Value': f"psess-{PLAYER_ID}.{start_time}"}
+        }
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Usage: `python3 scenario2_flexmatch/tests/simulate_polling_policies.py`
+#
+# Simulates the FlexMatch status poller schedule with each polling policy, and reports the DescribeMatchmaking calls
+# per matched player and the delay until the poller detects a terminal ticket. The simulation assumes that the
+# FlexMatch events are lost, so it measures the worst case detection delay when the poller is the only signal.
+
+import math
+import os
+import random
+import statistics
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from polling_policies import BackoffPollingPolicy, FixedIntervalPollingPolicy
+import flexmatch_status_poller
+
+SIMULATION_DURATION_IN_SECONDS = 4 * 60 * 60  # 4 hours
+POLLER_RATE_IN_SECONDS = 60
+TICKET_COUNT = 5000
+# (matchmaking timeout, median time to match) pairs, from a busy to a sparsely populated game
+SCENARIOS_IN_SECONDS = [(60, 30), (600, 90), (1800, 600)]
+
+
+def main():
+    random.seed(0)
+    print(f"{'Timeout':>8} | {'Median':>6} | {'Policy':>14} | {'Polls/ticket':>12} | {'Calls/matched player':>20} | "
+          f"{'Match detection delay (s)':>25} | {'Timeout detection delay (s)':>27}")
+    print(f"{'':>8} | {'':>6} | {'':>14} | {'':>12} | {'':>20} | {'mean':>12} {'p95':>12} | {'mean':>13} {'p95':>13}")
+    for timeout, median_time_to_match in SCENARIOS_IN_SECONDS:
+        tickets = create_tickets(timeout, median_time_to_match)
+        # The poller reads the P95 time to match of the matched tickets from the matchmaking statistics
+        times_to_match = [end_time - start_time for start_time, end_time, matched in tickets if matched]
+        policies = [
+            ('FixedInterval', FixedIntervalPollingPolicy()),
+            ('Backoff', BackoffPollingPolicy(timeout)),
+            ('Backoff P95', BackoffPollingPolicy(timeout, backoff_start_in_seconds=percentile(times_to_match, 95)))
+        ]
+        for policy_name, policy in policies:
+            result = simulate(policy, tickets)
+            print(f"{timeout:>8} | {median_time_to_match:>6} | {policy_name:>14} | "
+                  f"{result['polls'] / len(tickets):>12.2f} | "
+                  f"{result['calls'] / len(result['match_delays']):>20.3f} | "
+                  f"{statistics.mean(result['match_delays']):>12.1f} {percentile(result['match_delays'], 95):>12.1f} | "
+                  f"{statistics.mean(result['timeout_delays']):>13.1f} "
+                  f"{percentile(result['timeout_delays'], 95):>13.1f}")
+
+
+def create_tickets(timeout, median_time_to_match):
+    """Returns (start time, end time, matched) tuples with log-normally distributed times to match"""
+    tickets = []
+    for _ in range(TICKET_COUNT):
+        start_time = random.randint(0, SIMULATION_DURATION_IN_SECONDS)
+        time_to_match = random.lognormvariate(math.log(median_time_to_match), 1)
+        matched = time_to_match < timeout
+        tickets.append((start_time, start_time + round(min(time_to_match, timeout)), matched))
+    return tickets
+
+
+def simulate(policy, tickets):
+    pending_tickets = sorted(tickets)
+    result = {'polls': 0, 'calls': 0, 'match_delays': [], 'timeout_delays': []}
+    previous_sweep_start_time = None
+    now = random.randint(0, POLLER_RATE_IN_SECONDS)
+    while pending_tickets:
+        stale_before = now - flexmatch_status_poller.MIN_TIME_ELAPSED_BEFORE_UPDATE_IN_SECONDS
+        due_tickets = [ticket for ticket in pending_tickets if ticket[0] < stale_before
+                       and flexmatch_status_poller.is_poll_due(policy, {'StartTime': ticket[0]},
+                                                               previous_sweep_start_time, now)]
+        result['polls'] += len(due_tickets)
+        result['calls'] += math.ceil(len(due_tickets) / flexmatch_status_poller.MAX_PARTITION_SIZE)
+        detected_tickets = set()
+        for start_time, end_time, matched in due_tickets:
+            if end_time <= now:
+                result['match_delays' if matched else 'timeout_delays'].append(now - end_time)
+                detected_tickets.add((start_time, end_time, matched))
+        pending_tickets = [ticket for ticket in pending_tickets if ticket not in detected_tickets]
+        previous_sweep_start_time = now
+        now += POLLER_RATE_IN_SECONDS
+    return result
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(len(ordered) * p / 100) - 1)]
+
+
+if __name__ == '__main__':
+    main()